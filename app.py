@@ -1,35 +1,69 @@
-"""Main Flask application."""
+"""Main Flask application.
+
+Development: python app.py (Flask dev server, FLASK_DEBUG).
+Production:  gunicorn -c gunicorn.conf.py app:app (see gunicorn.conf.py for workers and preloading).
+"""
 from flask import Flask, render_template
-from flask_cors import CORS
-from backend.routes import api
 from config.config import Config
 
-app = Flask(__name__, 
-            template_folder='frontend/templates',
-            static_folder='frontend/static')
-app.config.from_object(Config)
 
-# Enable CORS for API endpoints
-CORS(app)
+def create_app(config_object=Config) -> Flask:
+    """Build the app: config, JSON provider, CORS, API blueprint and the request hooks."""
+    from flask_cors import CORS
+    from backend.routes import api
+    from backend.instrumentation import init_instrumentation
+    from backend.json_provider import AppJSONProvider
+    from backend.http_caching import init_http_caching
+    from backend.logging_config import configure_logging
+    from backend.profiling import init_profiling
+
+    # Root log handler, level and format (LOG_LEVEL / LOG_FORMAT)
+    configure_logging()
+
+    app = Flask(__name__,
+                template_folder='frontend/templates',
+                static_folder='frontend/static')
+    app.config.from_object(config_object)
+    # orjson-backed JSON (ISO datetimes, Decimal, NumPy, pre-encoded GeoJSON pass-through)
+    app.json = AppJSONProvider(app)
+
+    # Enable CORS for API endpoints
+    CORS(app)
+
+    # Register API blueprint
+    app.register_blueprint(api)
+
+    # Per-request timing, query counts and /api/_metrics aggregates
+    init_instrumentation(app)
 
-# Register API blueprint
-app.register_blueprint(api)
+    # ?profile=1 HTML profiles and request counting for /api/_profile sessions
+    init_profiling(app)
 
-@app.route('/')
-def index():
-    """Serve the main map interface."""
-    return render_template('index.html', 
-                         google_maps_api_key=Config.GOOGLE_MAPS_API_KEY)
+    # Cache-Control, ETags / 304s and gzip/brotli. after_request hooks run in reverse registration
+    # order, so this runs before the profiling hook replaces the response with the ?profile=1 page
+    init_http_caching(app)
 
-@app.route('/test')
-def test():
-    """Test connection page."""
-    return render_template('test.html')
+    @app.route('/')
+    def index():
+        """Serve the main map interface."""
+        return render_template('index.html',
+                               google_maps_api_key=config_object.GOOGLE_MAPS_API_KEY)
+
+    @app.route('/test')
+    def test():
+        """Test connection page."""
+        return render_template('test.html')
+
+    return app
+
+
+app = create_app()
 
 if __name__ == '__main__':
     # Initialize database on first run
     from backend.database import init_db
+    from backend.profiling import install_signal_toggle
     init_db()
-    
-    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)
+    install_signal_toggle()
 
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)
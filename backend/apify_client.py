@@ -1,8 +1,13 @@
 """Apify API client for Zillow School Scraper."""
+import logging
 import requests
 import time
 from typing import Dict, List, Optional, Tuple
 from config.config import Config
+from backend.logging_config import LogSampler
+
+logger = logging.getLogger(__name__)
+_missing_coordinates = LogSampler(logger, 50)
 
 
 class ApifySchoolClient:
@@ -11,11 +16,44 @@ class ApifySchoolClient:
     BASE_URL = "https://api.apify.com/v2"
     ACTOR_ID = "axlymxp~zillow-school-scraper"  # Format: username~actorName
     
-    def __init__(self, api_token: str = None):
-        """Initialize Apify client."""
+    def __init__(self, api_token: str = None, base_url: str = None):
+        """Initialize Apify client. base_url overrides Config.APIFY_BASE_URL (e.g. a local fake server)."""
         self.api_token = api_token or Config.APIFY_API_TOKEN
         if not self.api_token:
             raise ValueError("Apify API token is required")
+        self.BASE_URL = (base_url or getattr(Config, 'APIFY_BASE_URL', None) or self.BASE_URL).rstrip('/')
+    
+    @staticmethod
+    def build_bounds_input(
+        north_lat: float,
+        south_lat: float,
+        east_lng: float,
+        west_lng: float,
+        min_rating: int = 1,
+        include_elementary: bool = True,
+        include_middle: bool = True,
+        include_high: bool = True,
+        include_public: bool = True,
+        include_private: bool = False,
+        include_charter: bool = True,
+        include_unrated: bool = False
+    ) -> Dict:
+        """Build the actor input for a bounding-box query."""
+        # Note: The API expects longitude/latitude as STRINGS, not numbers!
+        return {
+            "eastLongitude": str(east_lng),
+            "westLongitude": str(west_lng),
+            "northLatitude": str(north_lat),
+            "southLatitude": str(south_lat),
+            "minRating": int(min_rating),
+            "includeElementary": bool(include_elementary),
+            "includeMiddle": bool(include_middle),
+            "includeHigh": bool(include_high),
+            "includePublic": bool(include_public),
+            "includePrivate": bool(include_private),
+            "includeCharter": bool(include_charter),
+            "includeUnrated": bool(include_unrated)
+        }
     
     def get_schools_by_bounds(
         self,
@@ -53,28 +91,33 @@ class ApifySchoolClient:
             List of school dictionaries with ratings and details
         """
         # Prepare input for Apify actor
-        # Note: The API expects longitude/latitude as STRINGS, not numbers!
-        input_data = {
-            "eastLongitude": str(east_lng),
-            "westLongitude": str(west_lng),
-            "northLatitude": str(north_lat),
-            "southLatitude": str(south_lat),
-            "minRating": int(min_rating),
-            "includeElementary": bool(include_elementary),
-            "includeMiddle": bool(include_middle),
-            "includeHigh": bool(include_high),
-            "includePublic": bool(include_public),
-            "includePrivate": bool(include_private),
-            "includeCharter": bool(include_charter),
-            "includeUnrated": bool(include_unrated)
-        }
+        input_data = self.build_bounds_input(
+            north_lat, south_lat, east_lng, west_lng,
+            min_rating=min_rating,
+            include_elementary=include_elementary,
+            include_middle=include_middle,
+            include_high=include_high,
+            include_public=include_public,
+            include_private=include_private,
+            include_charter=include_charter,
+            include_unrated=include_unrated,
+        )
         
-        print(f"DEBUG: Apify input data: {input_data}")
+        logger.debug("Apify input data: %s", input_data)
         
         # Start the actor run
+        run_id = self.start_run(input_data)
+        if not run_id:
+            return []
+        
+        # Wait for the run to complete and get results
+        return self._wait_for_results(run_id)
+    
+    def start_run(self, input_data: Dict) -> Optional[str]:
+        """Start an actor run and return its run ID (None if the run could not be started)."""
         run_response = self._start_actor_run(input_data)
         if not run_response:
-            return []
+            return None
         
         # Apify API returns data in 'data' key, or directly as 'id'
         run_id = None
@@ -84,11 +127,21 @@ class ApifySchoolClient:
             run_id = run_response['id']
         
         if not run_id:
-            print(f"Could not extract run ID from response: {run_response}")
-            return []
-        
-        # Wait for the run to complete and get results
-        return self._wait_for_results(run_id)
+            logger.warning("Could not extract run ID from response: %s", run_response)
+        return run_id
+    
+    def get_run_status(self, run_id: str) -> Optional[str]:
+        """
+        Return the actor run status ('READY', 'RUNNING', 'SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT', ...).
+        Raises requests.exceptions.RequestException on HTTP errors.
+        """
+        url = f"{self.BASE_URL}/actor-runs/{run_id}?token={self.api_token}"
+        headers = {
+            "Authorization": f"Bearer {self.api_token}"
+        }
+        response = requests.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        return response.json().get('data', {}).get('status')
     
     def _start_actor_run(self, input_data: Dict) -> Optional[Dict]:
         """Start an Apify actor run."""
@@ -109,31 +162,29 @@ class ApifySchoolClient:
             url_with_token = f"{url}?token={self.api_token}"
             
             try:
-                print(f"DEBUG: Trying actor ID: {actor_id}")
-                print(f"DEBUG: URL: {url_with_token}")
-                print(f"DEBUG: Input data: {input_data}")
+                # url, not url_with_token: the token must not end up in logs
+                logger.debug("Starting actor %s: POST %s input=%s", actor_id, url, input_data)
                 response = requests.post(url_with_token, json=input_data, headers=headers, timeout=30)
                 
-                print(f"DEBUG: Response status: {response.status_code}")
-                print(f"DEBUG: Response headers: {dict(response.headers)}")
+                logger.debug("Actor %s response status %s, headers %s", actor_id, response.status_code, response.headers)
                 
                 if response.status_code in [200, 201]:  # 201 = Created (run started)
-                    print(f"DEBUG: Success with actor ID: {actor_id}")
+                    logger.debug("Started run with actor ID %s", actor_id)
                     return response.json()
                 elif response.status_code == 400:
                     # Try to get error details
                     try:
                         error_data = response.json()
-                        print(f"DEBUG: 400 Error details: {error_data}")
+                        logger.warning("Apify 400 for actor %s: %s", actor_id, error_data)
                     except:
-                        print(f"DEBUG: 400 Error text: {response.text[:500]}")
+                        logger.warning("Apify 400 for actor %s: %s", actor_id, response.text[:500])
                     # Try next format only if this one failed
                     if actor_id != actor_ids_to_try[-1]:
                         continue
                     else:
                         return None
                 else:
-                    print(f"DEBUG: Response status {response.status_code}, text: {response.text[:500]}")
+                    logger.warning("Apify status %s for actor %s: %s", response.status_code, actor_id, response.text[:500])
                     # Only try next format if not the last one
                     if actor_id != actor_ids_to_try[-1]:
                         continue
@@ -141,68 +192,66 @@ class ApifySchoolClient:
                         response.raise_for_status()
                     
             except requests.exceptions.RequestException as e:
-                print(f"DEBUG: Exception with {actor_id}: {e}")
-                if hasattr(e, 'response') and e.response is not None:
+                logger.debug("Exception with actor %s: %s", actor_id, e)
+                if hasattr(e, 'response') and e.response is not None and logger.isEnabledFor(logging.DEBUG):
                     try:
-                        print(f"DEBUG: Error response: {e.response.json()}")
+                        logger.debug("Error response: %s", e.response.json())
                     except:
-                        print(f"DEBUG: Error response text: {e.response.text[:500]}")
+                        logger.debug("Error response text: %s", e.response.text[:500])
                 # Only try next format if not the last one
                 if actor_id != actor_ids_to_try[-1]:
                     continue
                 else:
-                    print(f"Error starting Apify actor run: {e}")
+                    logger.error("Error starting Apify actor run: %s", e)
                     return None
         
         return None
     
     def _wait_for_results(self, run_id: str, max_wait: int = 300, poll_interval: int = 5) -> List[Dict]:
         """Wait for actor run to complete and fetch results."""
-        url = f"{self.BASE_URL}/actor-runs/{run_id}?token={self.api_token}"
-        headers = {
-            "Authorization": f"Bearer {self.api_token}"
-        }
-        
         start_time = time.time()
         
         while time.time() - start_time < max_wait:
             try:
                 # Check run status
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                run_data = response.json().get('data', {})
-                status = run_data.get('status')
+                status = self.get_run_status(run_id)
                 
                 if status == 'SUCCEEDED':
                     # Fetch results
                     return self._fetch_results(run_id)
                 elif status in ['FAILED', 'ABORTED', 'TIMED-OUT']:
-                    print(f"Actor run {run_id} failed with status: {status}")
+                    logger.warning("Actor run %s failed with status: %s", run_id, status)
                     return []
                 
                 # Still running, wait and check again
                 time.sleep(poll_interval)
                 
             except requests.exceptions.RequestException as e:
-                print(f"Error checking actor run status: {e}")
+                logger.error("Error checking actor run status: %s", e)
                 return []
         
-        print(f"Actor run {run_id} timed out after {max_wait} seconds")
+        logger.warning("Actor run %s timed out after %s seconds", run_id, max_wait)
         return []
     
-    def _fetch_results(self, run_id: str) -> List[Dict]:
-        """Fetch results from completed actor run."""
+    def fetch_results(self, run_id: str) -> List[Dict]:
+        """
+        Return the dataset items of a completed actor run.
+        Raises requests.exceptions.RequestException on HTTP errors.
+        """
         url = f"{self.BASE_URL}/actor-runs/{run_id}/dataset/items?token={self.api_token}"
         headers = {
             "Authorization": f"Bearer {self.api_token}"
         }
-        
+        response = requests.get(url, headers=headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+    
+    def _fetch_results(self, run_id: str) -> List[Dict]:
+        """Fetch results from completed actor run ([] on errors)."""
         try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            return self.fetch_results(run_id)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching actor results: {e}")
+            logger.error("Error fetching actor results: %s", e)
             return []
     
     def get_schools_by_address(
@@ -241,8 +290,8 @@ class ApifySchoolClient:
         east_lng = lng + lng_offset
         west_lng = lng - lng_offset
         
-        print(f"[ZONED SCHOOLS / Apify] get_schools_by_address: address={address!r}, box radius={radius_miles} mi")
-        print(f"[ZONED SCHOOLS / Apify] Bounding box: N={north_lat:.4f} S={south_lat:.4f} E={east_lng:.4f} W={west_lng:.4f}")
+        logger.debug("get_schools_by_address: address=%r, box radius=%s mi, N=%.4f S=%.4f E=%.4f W=%.4f",
+                     address, radius_miles, north_lat, south_lat, east_lng, west_lng)
         
         # Get all schools in the area
         schools = self.get_schools_by_bounds(
@@ -261,10 +310,10 @@ class ApifySchoolClient:
         )
         
         if not schools:
-            print("[ZONED SCHOOLS / Apify] get_schools_by_address: No schools returned from Apify in this box.")
+            logger.info("get_schools_by_address: no schools returned from Apify for %r", address)
             return None, None, None
         
-        print(f"[ZONED SCHOOLS / Apify] get_schools_by_address: Got {len(schools)} schools in box; picking CLOSEST to (lat={lat}, lng={lng}) per level.")
+        logger.debug("get_schools_by_address: %d schools in box; picking closest to (%s, %s) per level", len(schools), lat, lng)
         
         # Find closest schools of each type
         elementary = self._find_closest_school(schools, 'elementary', lat, lng)
@@ -275,7 +324,8 @@ class ApifySchoolClient:
             if not s:
                 return None
             return s.get('name') or s.get('schoolName') or s.get('title') or '(no name)'
-        print(f"[ZONED SCHOOLS / Apify] CLOSEST selection: elementary={_name(elementary)!r}, middle={_name(middle)!r}, high={_name(high)!r}")
+        logger.info("Apify closest schools for %r: elementary=%r, middle=%r, high=%r",
+                    address, _name(elementary), _name(middle), _name(high))
         
         return elementary, middle, high
     
@@ -288,11 +338,10 @@ class ApifySchoolClient:
     ) -> Optional[Dict]:
         """Find the closest school of a specific level."""
         if not schools:
-            print(f"DEBUG: No schools provided for level {school_level}")
+            logger.debug("No schools provided for level %s", school_level)
             return None
         
-        print(f"DEBUG: Looking for {school_level} schools. Total schools: {len(schools)}")
-        print(f"DEBUG: First school sample: {schools[0] if schools else 'None'}")
+        logger.debug("Looking for %s schools among %d (first: %s)", school_level, len(schools), schools[0])
         
         # Filter schools by level - try multiple possible field names
         level_key = school_level.lower()
@@ -327,10 +376,10 @@ class ApifySchoolClient:
                 filtered.append(s)
         
         if not filtered:
-            print(f"DEBUG: No {school_level} schools found after filtering")
+            logger.debug("No %s schools found after filtering", school_level)
             return None
         
-        print(f"DEBUG: Found {len(filtered)} {school_level} schools")
+        logger.debug("Found %d %s schools", len(filtered), school_level)
         
         # Find closest by distance
         closest = None
@@ -358,7 +407,7 @@ class ApifySchoolClient:
                         continue
             
             if school_lat is None or school_lng is None:
-                print(f"DEBUG: School missing coordinates: {school}")
+                _missing_coordinates("School missing coordinates: %s", school.get('name') or school.get('schoolName'))
                 continue
             
             # Calculate simple distance (Haversine would be more accurate but this works)
@@ -369,8 +418,8 @@ class ApifySchoolClient:
                 closest = school
         
         if closest:
-            print(f"DEBUG: Closest {school_level} school: {closest}")
+            logger.debug("Closest %s school: %s", school_level, closest)
         else:
-            print(f"DEBUG: No closest {school_level} school found (all missing coordinates)")
+            logger.debug("No closest %s school found (all missing coordinates)", school_level)
         
         return closest
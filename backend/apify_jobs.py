@@ -0,0 +1,279 @@
+"""
+Concurrent Apify run scheduling with a resumable local job ledger (used by bulk_import_schools.py).
+
+The actor caps results per query (~50), so an optional QuadtreePlanner splits any box whose
+run comes back at or near the cap into four quadrants and queues them; sparse boxes are never split.
+"""
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from backend.apify_client import ApifySchoolClient
+
+# Region states stored in the ledger
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_TERMINAL_FAILURES = ('FAILED', 'ABORTED', 'TIMED-OUT')
+
+Region = Tuple[str, float, float, float, float]  # (name, north, south, east, west)
+
+
+class ImportLedger:
+    """
+    SQLite ledger of import regions: state (pending/running/done/failed), run id and result count.
+    Survives crashes so a restarted import resumes where it left off.
+    """
+
+    def __init__(self, path: str = 'data/apify_import_ledger.sqlite'):
+        self.path = path
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS regions (
+                name TEXT PRIMARY KEY,
+                north REAL NOT NULL,
+                south REAL NOT NULL,
+                east REAL NOT NULL,
+                west REAL NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                run_id TEXT,
+                result_count INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at TEXT
+            )
+        """)
+        # Columns added after the first ledger version
+        existing = {r[1] for r in self.conn.execute("PRAGMA table_info(regions)")}
+        for col, col_type in (('saved_count', 'INTEGER'), ('parent', 'TEXT'),
+                              ('depth', 'INTEGER NOT NULL DEFAULT 0'), ('split', 'INTEGER NOT NULL DEFAULT 0')):
+            if col not in existing:
+                self.conn.execute(f"ALTER TABLE regions ADD COLUMN {col} {col_type}")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add_regions(self, regions: List[Region], parent: Optional[str] = None, depth: int = 0) -> int:
+        """Register regions as pending. Regions already in the ledger keep their state. Returns number added."""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO regions (name, north, south, east, west, state, parent, depth, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+            [(name, n, s, e, w, parent, depth, _now()) for name, n, s, e, w in regions],
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def regions(self, state: Optional[str] = None) -> List[sqlite3.Row]:
+        """Return ledger rows (optionally only those in one state), in insertion order."""
+        if state:
+            return self.conn.execute("SELECT * FROM regions WHERE state = ? ORDER BY rowid", (state,)).fetchall()
+        return self.conn.execute("SELECT * FROM regions ORDER BY rowid").fetchall()
+
+    def get(self, name: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM regions WHERE name = ?", (name,)).fetchone()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of regions per state."""
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM regions GROUP BY state").fetchall()
+        return {r[0]: r[1] for r in rows}
+
+    def reset_failed(self) -> int:
+        """Move failed regions back to pending so they are retried."""
+        cur = self.conn.execute(
+            "UPDATE regions SET state = 'pending', run_id = NULL, error = NULL, updated_at = ? WHERE state = 'failed'",
+            (_now(),),
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def mark_running(self, name: str, run_id: str) -> None:
+        self._update(name, state=RUNNING, run_id=run_id, error=None, attempts_inc=True)
+
+    def mark_done(self, name: str, result_count: int, saved_count: Optional[int] = None) -> None:
+        self._update(name, state=DONE, result_count=result_count, saved_count=saved_count, error=None)
+
+    def mark_split(self, name: str) -> None:
+        """Record that this box was saturated and its quadrants were queued."""
+        self._update(name, split=1)
+
+    def unsplit_saturated(self, planner: 'QuadtreePlanner') -> List[sqlite3.Row]:
+        """Done regions that are saturated but whose quadrants were never queued (crash between the two)."""
+        rows = self.conn.execute("SELECT * FROM regions WHERE state = 'done' AND split = 0").fetchall()
+        return [r for r in rows if planner.should_split(r, r['result_count'] or 0)]
+
+    def mark_failed(self, name: str, error: str) -> None:
+        self._update(name, state=FAILED, error=error)
+
+    def _update(self, name: str, attempts_inc: bool = False, **fields) -> None:
+        sets = [f"{k} = ?" for k in fields] + ["updated_at = ?"]
+        values = list(fields.values()) + [_now()]
+        if attempts_inc:
+            sets.append("attempts = attempts + 1")
+        self.conn.execute(f"UPDATE regions SET {', '.join(sets)} WHERE name = ?", values + [name])
+        self.conn.commit()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class QuadtreePlanner:
+    """
+    Adaptive region planning: a box whose run returns at or near the actor's result cap was
+    probably truncated, so it is split into four quadrants (recursively, down to min_span degrees
+    or max_depth). Boxes under the threshold are complete and are not split further.
+    """
+
+    QUADRANTS = ('NW', 'NE', 'SW', 'SE')
+
+    def __init__(self, cap: int = 50, near_cap: float = 0.9, min_span: float = 0.02, max_depth: int = 8):
+        self.cap = cap
+        self.threshold = max(1, int(cap * near_cap))
+        self.min_span = min_span
+        self.max_depth = max_depth
+
+    def should_split(self, region, result_count: int) -> bool:
+        """region: ledger row (needs north/south/east/west/depth)."""
+        if result_count < self.threshold or (region['depth'] or 0) >= self.max_depth:
+            return False
+        lat_span = region['north'] - region['south']
+        lng_span = region['east'] - region['west']
+        return max(lat_span, lng_span) / 2 >= self.min_span
+
+    def quadrants(self, name: str, north: float, south: float, east: float, west: float) -> List[Region]:
+        mid_lat = (north + south) / 2
+        mid_lng = (east + west) / 2
+        boxes = (
+            (north, mid_lat, mid_lng, west),   # NW
+            (north, mid_lat, east, mid_lng),   # NE
+            (mid_lat, south, mid_lng, west),   # SW
+            (mid_lat, south, east, mid_lng),   # SE
+        )
+        return [(f"{name} / {q}", n, s, e, w) for q, (n, s, e, w) in zip(self.QUADRANTS, boxes)]
+
+
+class ApifyRunScheduler:
+    """
+    Launch actor runs for ledger regions concurrently (bounded by max_concurrent) and poll
+    all running runs from a single loop. Completed runs are handed to on_results(name, schools),
+    which returns the number of schools saved; the ledger stores both the raw result count and the saved count.
+    With a planner, saturated boxes are split and their quadrants join the same queue.
+    """
+
+    def __init__(
+        self,
+        client: ApifySchoolClient,
+        ledger: ImportLedger,
+        on_results: Callable[[str, List[Dict]], int],
+        max_concurrent: int = 5,
+        poll_interval: float = 5.0,
+        run_timeout: float = 600.0,
+        planner: Optional[QuadtreePlanner] = None,
+    ):
+        self.client = client
+        self.ledger = ledger
+        self.on_results = on_results
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.poll_interval = poll_interval
+        self.run_timeout = run_timeout
+        self.planner = planner
+
+    def _split(self, region) -> List[Region]:
+        """Queue the quadrants of a saturated region. Returns the newly added ones."""
+        quads = self.planner.quadrants(region['name'], region['north'], region['south'], region['east'], region['west'])
+        self.ledger.add_regions(quads, parent=region['name'], depth=(region['depth'] or 0) + 1)
+        self.ledger.mark_split(region['name'])
+        return quads
+
+    def run(self) -> Dict[str, int]:
+        """Process every pending region (and resume regions left running). Returns final ledger counts."""
+        # Runs started before a crash keep going on Apify's side: resume polling them
+        running: Dict[str, Tuple[str, float]] = {
+            r['name']: (r['run_id'], time.monotonic()) for r in self.ledger.regions(RUNNING) if r['run_id']
+        }
+        for r in self.ledger.regions(RUNNING):
+            if not r['run_id']:
+                self.ledger.mark_failed(r['name'], 'run id missing')
+        if running:
+            print(f"Resuming {len(running)} run(s) already in progress")
+        if self.planner:
+            for r in self.ledger.unsplit_saturated(self.planner):
+                self._split(r)
+        pending = [
+            (r['name'], r['north'], r['south'], r['east'], r['west']) for r in self.ledger.regions(PENDING)
+        ]
+        total = len(pending) + len(running)
+        finished = 0
+
+        while pending or running:
+            # Fill the concurrency budget
+            while pending and len(running) < self.max_concurrent:
+                name, north, south, east, west = pending.pop(0)
+                input_data = self.client.build_bounds_input(north, south, east, west)
+                run_id = self.client.start_run(input_data)
+                if not run_id:
+                    self.ledger.mark_failed(name, 'could not start actor run')
+                    finished += 1
+                    print(f"[{finished}/{total}] FAILED to start: {name}")
+                    continue
+                self.ledger.mark_running(name, run_id)
+                running[name] = (run_id, time.monotonic())
+                print(f"Started {name} (run {run_id}); {len(running)} running, {len(pending)} pending")
+
+            if not running:
+                continue
+            time.sleep(self.poll_interval)
+
+            for name, (run_id, started) in list(running.items()):
+                try:
+                    status = self.client.get_run_status(run_id)
+                except requests.exceptions.RequestException as e:
+                    # Transient status errors: keep polling until the run times out
+                    print(f"Error checking run {run_id} for {name}: {e}")
+                    status = None
+                if status == 'SUCCEEDED':
+                    del running[name]
+                    finished += 1
+                    try:
+                        schools = self.client.fetch_results(run_id)
+                    except requests.exceptions.RequestException as e:
+                        # Left FAILED (not DONE with 0 results) so --retry-failed picks it up
+                        self.ledger.mark_failed(name, f'fetching results failed: {e}')
+                        print(f"[{finished}/{total}] FAILED fetching results for {name}: {e}")
+                        continue
+                    try:
+                        count = self.on_results(name, schools)
+                        self.ledger.mark_done(name, len(schools), count)
+                        print(f"[{finished}/{total}] Done: {name} ({len(schools)} results, {count} saved)")
+                        region = self.ledger.get(name)
+                        if self.planner and self.planner.should_split(region, len(schools)):
+                            quads = self._split(region)
+                            pending.extend(quads)
+                            total += len(quads)
+                            print(f"  {name} hit the result cap; split into {len(quads)} quadrants")
+                    except Exception as e:
+                        self.ledger.mark_failed(name, f'saving results failed: {e}')
+                        print(f"[{finished}/{total}] FAILED saving {name}: {e}")
+                elif status in _TERMINAL_FAILURES:
+                    del running[name]
+                    finished += 1
+                    self.ledger.mark_failed(name, f'run {status}')
+                    print(f"[{finished}/{total}] FAILED: {name} (run {run_id} {status})")
+                elif time.monotonic() - started > self.run_timeout:
+                    del running[name]
+                    finished += 1
+                    self.ledger.mark_failed(name, f'run not finished after {self.run_timeout:.0f}s')
+                    print(f"[{finished}/{total}] FAILED: {name} (timed out waiting for run {run_id})")
+
+        return self.ledger.counts()
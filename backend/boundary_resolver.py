@@ -0,0 +1,220 @@
+"""
+Remote zip boundary lookup for zips the local store doesn't have.
+
+All providers (OpenDataSoft, boundaries.io, GitHub mirrors, three TIGERweb vintages) are queried at
+once on a shared thread pool; the first valid polygon wins and is written through to
+data/zip_boundaries/{zip}.geojson. The whole lookup is bounded by an overall deadline, concurrent
+lookups of the same zip share one attempt, and misses are remembered in a small SQLite table
+(long TTL when every provider answered "not found", short TTL when some timed out or errored).
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from config.config import Config
+from backend.boundary_store import normalize_zip5, to_feature_collection
+from backend.http_caching import write_precompressed
+from backend.tigerweb_client import TIGERWEB_SERVICES, TigerwebZctaClient
+from backend.ttl_cache import Coalescer, TTLCache
+
+BOUNDARIES_DIR = Path('data/zip_boundaries')
+
+_ODS_URL = "https://public.opendatasoft.com/api/explore/v2.1/catalog/datasets/us-zip-code-labels-and-boundaries/records"
+
+# Result sources for a miss
+MISS = 'miss'
+CACHED_MISS = 'cached_miss'
+
+
+class _NotFound(Exception):
+    """Provider answered and has no boundary for this zip."""
+
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _polygon_fc(data, zip_code: str) -> Dict:
+    """Normalize a provider payload to a FeatureCollection with a polygon, or raise _NotFound."""
+    fc = to_feature_collection(data, zip_code) if isinstance(data, dict) else None
+    if fc:
+        geom = (fc['features'][0] or {}).get('geometry') or {}
+        if geom.get('type') in ('Polygon', 'MultiPolygon') and geom.get('coordinates'):
+            return fc
+    raise _NotFound()
+
+
+def _get_json(url: str, timeout: float, params: Optional[Dict] = None):
+    response = _session().get(url, params=params, timeout=timeout)
+    if response.status_code == 404:
+        raise _NotFound()
+    response.raise_for_status()
+    return response.json()
+
+
+def _opendatasoft(field: str) -> Callable[[str, float], Dict]:
+    def provider(zip_code: str, timeout: float) -> Dict:
+        data = _get_json(_ODS_URL, timeout, {'where': f'{field}="{zip_code}"', 'limit': 1, 'select': f'{field},geo_shape'})
+        for record in data.get('results') or []:
+            fields = (record.get('record') or {}).get('fields') or record
+            if fields.get('geo_shape'):
+                return _polygon_fc(fields['geo_shape'], zip_code)
+        raise _NotFound()
+    return provider
+
+
+def _boundaries_io(zip_code: str, timeout: float) -> Dict:
+    api_key = getattr(Config, 'BOUNDARIES_IO_API_KEY', None)
+    if api_key:
+        data = _get_json("https://boundaries.io/api/v1/boundary", timeout,
+                         {'zipcode': zip_code, 'api_key': api_key, 'format': 'geojson'})
+    else:
+        data = _get_json(f"https://boundaries-io.herokuapp.com/zip/{zip_code}", timeout)
+    return _polygon_fc(data, zip_code)
+
+
+def _github(path: str) -> Callable[[str, float], Dict]:
+    def provider(zip_code: str, timeout: float) -> Dict:
+        url = "https://raw.githubusercontent.com/OpenDataDE/State-zip-code-GeoJSON/master/" + path.format(
+            zip=zip_code, first=zip_code[0])
+        return _polygon_fc(_get_json(url, timeout), zip_code)
+    return provider
+
+
+def _tigerweb(service: str) -> Callable[[str, float], Dict]:
+    def provider(zip_code: str, timeout: float) -> Dict:
+        client = TigerwebZctaClient(services=(service,), timeout=timeout, retries=0)
+        found = client.fetch([zip_code])
+        if zip_code not in found:
+            raise _NotFound()
+        return found[zip_code]
+    return provider
+
+
+PROVIDERS: List[Tuple[str, Callable[[str, float], Dict]]] = [
+    ('opendatasoft', _opendatasoft('zcta5ce10')),
+    ('opendatasoft_zip', _opendatasoft('zip_code')),
+    ('boundaries_io', _boundaries_io),
+    ('github', _github('{first}/{zip}_polygon.geojson')),
+    ('github_zcta5', _github('zcta5/{zip}_polygon.geojson')),
+] + [(f'tigerweb_{service}', _tigerweb(service)) for service in TIGERWEB_SERVICES]
+
+
+class MissCache(TTLCache):
+    """Zips no provider could resolve, each with an expiry time and the reason."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        super().__init__(path, 'misses', 'zip_code', extra_columns='reason TEXT', busy_timeout=busy_timeout)
+
+    def is_missing(self, zip_code: str) -> bool:
+        return zip_code in self.get_values([zip_code])
+
+    def record(self, zip_code: str, ttl: float, reason: str) -> None:
+        self.set_value(zip_code, None, ttl, reason=reason)
+
+    def clear(self, zip_code: str) -> None:
+        self.delete(zip_code)
+
+
+class BoundaryResolver:
+    """Race remote boundary providers for a zip under an overall deadline (see module docstring)."""
+
+    def __init__(
+        self,
+        providers: Optional[List[Tuple[str, Callable[[str, float], Dict]]]] = None,
+        deadline: Optional[float] = None,
+        miss_cache: Optional[MissCache] = None,
+        miss_ttl: Optional[float] = None,
+        retry_ttl: Optional[float] = None,
+        max_workers: int = 16,
+        boundaries_dir: Path = BOUNDARIES_DIR,
+    ):
+        self.providers = providers if providers is not None else PROVIDERS
+        self.deadline = deadline if deadline is not None else Config.BOUNDARY_RESOLVE_DEADLINE
+        self.miss_cache = miss_cache or MissCache(Config.BOUNDARY_MISS_CACHE)
+        self.miss_ttl = miss_ttl if miss_ttl is not None else Config.BOUNDARY_MISS_TTL
+        self.retry_ttl = retry_ttl if retry_ttl is not None else Config.BOUNDARY_RETRY_TTL
+        self.boundaries_dir = Path(boundaries_dir)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='boundary')
+        self._inflight = Coalescer()
+
+    def resolve(self, zip_code: str) -> Tuple[Optional[Dict], str]:
+        """Returns (FeatureCollection, provider name) or (None, MISS / CACHED_MISS)."""
+        zip_code = normalize_zip5(zip_code)
+        if zip_code is None:
+            return None, MISS
+        if self.miss_cache.is_missing(zip_code):
+            return None, CACHED_MISS
+        try:
+            return self._inflight.coalesce(zip_code, lambda: self._race(zip_code), timeout=self.deadline + 1)
+        except FutureTimeoutError:
+            return None, MISS
+
+    def _race(self, zip_code: str) -> Tuple[Optional[Dict], str]:
+        started = time.monotonic()
+        futures = {self.pool.submit(fn, zip_code, self.deadline): name for name, fn in self.providers}
+        pending = set(futures)
+        inconclusive = []
+        while pending:
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    fc = future.result()
+                except _NotFound:
+                    continue
+                except Exception as e:
+                    inconclusive.append(f"{name}: {type(e).__name__}")
+                    continue
+                self._write_through(zip_code, fc)
+                self.miss_cache.clear(zip_code)
+                return fc, name
+        if pending:
+            inconclusive.extend(f"{futures[f]}: deadline" for f in pending)
+        if inconclusive:
+            self.miss_cache.record(zip_code, self.retry_ttl, '; '.join(inconclusive)[:500])
+        else:
+            self.miss_cache.record(zip_code, self.miss_ttl, 'not found by any provider')
+        return None, MISS
+
+    def _write_through(self, zip_code: str, fc: Dict) -> None:
+        try:
+            self.boundaries_dir.mkdir(parents=True, exist_ok=True)
+            path = self.boundaries_dir / f"{zip_code}.geojson"
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, 'w') as f:
+                json.dump(fc, f)
+            os.replace(tmp, path)
+            write_precompressed(path)
+        except Exception as e:
+            print(f"Could not cache boundary for {zip_code}: {e}")
+
+
+_resolver: Optional[BoundaryResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_boundary_resolver() -> BoundaryResolver:
+    """Process-wide resolver (one thread pool and miss cache)."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = BoundaryResolver()
+    return _resolver
@@ -0,0 +1,558 @@
+"""
+Packed ZCTA boundary store: every zip boundary in one memory-mapped file.
+
+Replaces tens of thousands of data/zip_boundaries/{zip}.geojson files. Layout (little endian):
+
+    header   magic b'ZCTAPK1\\0', version u32, entry count u32,
+             index offset u64, meta offset u64, meta length u32
+    data     record blobs, back to back
+    index    one 20-byte entry per record: zip (5 ASCII bytes), lod u8, kind u8, pad,
+             offset u64, length u32
+    meta     JSON object (creation info, level-of-detail tolerances, ...)
+
+Each zip has a minified GeoJSON FeatureCollection record (kind GEOJSON, served to the browser
+as-is: lookups return memoryview slices of the mmap, no copy or re-encode) and, when Shapely is
+available, a WKB record (kind WKB) for fast geometry loading and a bounding box (kind BBOX) for
+viewport queries. Features carry a zip_code property so many zips can be concatenated into one
+FeatureCollection straight from the mmap. Lookups are O(1) dict hits on an
+index built once at open.
+
+Besides full resolution (lod 0) the store holds simplified GeoJSON at a few tolerances (lod 1..n,
+listed in meta['lods']) with coordinates quantized to the precision that tolerance can show, so a
+metro-zoom map gets a few hundred bytes per zip instead of the full TIGER polygon.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ZCTAPK1\0'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIQQI')
+_ENTRY = struct.Struct('<5sBBxQI')
+
+# Record kinds
+GEOJSON = 0
+WKB = 1
+BBOX = 2  # '<4d' min lng, min lat, max lng, max lat
+
+_BBOX = struct.Struct('<4d')
+# Every GeoJSON record is written in this canonical form, so its features can be sliced out without parsing
+_FC_PREFIX = b'{"type":"FeatureCollection","features":['
+_FC_SUFFIX = b']}'
+
+DEFAULT_STORE_PATH = 'data/zip_boundaries.pack'
+DEFAULT_BOUNDARIES_DIR = 'data/zip_boundaries'
+
+_Key = Tuple[str, int, int]  # (zip, lod, kind)
+
+# Simplified levels of detail: (lod, tolerance in degrees, coordinate decimals). 0.0001 deg ~ 11 m.
+DEFAULT_LODS = (
+    (1, 0.0001, 5),
+    (2, 0.0005, 4),
+    (3, 0.002, 4),
+    (4, 0.008, 3),
+)
+
+
+def normalize_zip5(zip_code: str) -> Optional[str]:
+    """First five characters of a zip if they are digits ("28202-1234" -> "28202"), else None."""
+    z = str(zip_code or '').strip()[:5]
+    return z if len(z) == 5 and z.isdigit() else None
+
+
+def tolerance_for_zoom(zoom: float) -> float:
+    """Degrees per screen pixel at a web-map zoom level (256 px tiles): detail finer than this is invisible."""
+    return 360.0 / (256 * 2 ** max(0.0, float(zoom)))
+
+
+def lods_meta(lods=DEFAULT_LODS) -> Dict[str, Dict]:
+    """The meta['lods'] entry describing a store's simplified levels."""
+    return {str(lod): {'tolerance': tol, 'precision': prec} for lod, tol, prec in lods}
+
+
+def quantize_geometry(geom: Dict, precision: int) -> Optional[Dict]:
+    """
+    Round Polygon/MultiPolygon coordinates to `precision` decimals and drop the repeated points that
+    rounding creates. Rings left with fewer than 4 points are dropped (a polygon whose shell goes is dropped).
+    """
+    def _ring(ring):
+        out = []
+        for x, y in (c[:2] for c in ring):
+            pt = [round(x, precision), round(y, precision)]
+            if not out or out[-1] != pt:
+                out.append(pt)
+        if out and out[0] != out[-1]:
+            out.append(out[0])
+        return out if len(out) >= 4 else None
+
+    def _polygon(rings):
+        shell = _ring(rings[0]) if rings else None
+        if shell is None:
+            return None
+        return [shell] + [r for r in (_ring(h) for h in rings[1:]) if r]
+
+    gtype = geom.get('type')
+    if gtype == 'Polygon':
+        poly = _polygon(geom.get('coordinates') or [])
+        return {'type': 'Polygon', 'coordinates': poly} if poly else None
+    if gtype == 'MultiPolygon':
+        polys = [p for p in (_polygon(rings) for rings in geom.get('coordinates') or []) if p]
+        return {'type': 'MultiPolygon', 'coordinates': polys} if polys else None
+    return geom
+
+
+def simplify_feature_collection(fc: Dict, tolerance: float, precision: Optional[int] = None) -> Dict:
+    """
+    Topology-preserving simplification (no self-intersections, no collapsed rings) of every feature,
+    then optional coordinate quantization. Features that would vanish keep their original geometry.
+    """
+    from shapely.geometry import mapping, shape
+
+    features = []
+    for feature in fc.get('features') or []:
+        geom = feature.get('geometry')
+        out = geom
+        if geom:
+            try:
+                simplified = shape(geom).simplify(tolerance, preserve_topology=True)
+                if not simplified.is_empty:
+                    out = mapping(simplified)
+                    if precision is not None:
+                        out = quantize_geometry(out, precision) or mapping(simplified)
+            except Exception:
+                out = geom
+        features.append({'type': 'Feature', 'geometry': out, 'properties': feature.get('properties') or {}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def encode_boundary_records(zip_codes, geometries, lods=DEFAULT_LODS,
+                            zip_property: str = 'ZCTA5CE10') -> List[Tuple[str, List[Tuple[int, int, bytes]]]]:
+    """
+    Encode many boundaries at once with Shapely 2 array operations (no per-feature GeoDataFrame or
+    json round trip): full-resolution GeoJSON, WKB, bounding box and one simplified, grid-snapped
+    GeoJSON per lod. Returns [(zip, [(lod, kind, bytes), ...]), ...] in the canonical record form
+    written by BoundaryStoreWriter.add_feature_collection. Rows with no zip or no geometry are skipped.
+    """
+    import numpy as np
+    import shapely
+
+    zips = [normalize_zip5(z) for z in zip_codes]
+    geoms = np.asarray(geometries, dtype=object)
+    keep = np.array([z is not None for z in zips], dtype=bool) & ~shapely.is_missing(geoms)
+    keep &= ~shapely.is_empty(np.where(keep, geoms, None))
+    zips = [z for z, k in zip(zips, keep) if k]
+    geoms = geoms[keep]
+    if not zips:
+        return []
+
+    def _records(geojson_strings):
+        return [
+            (f'{{"type":"FeatureCollection","features":[{{"type":"Feature","geometry":{g},'
+             f'"properties":{{"{zip_property}":"{z}","zip_code":"{z}"}}}}]}}').encode('utf-8')
+            for z, g in zip(zips, geojson_strings)
+        ]
+
+    per_lod = {0: _records(shapely.to_geojson(geoms))}
+    # Each level is simplified from the previous (coarser tolerances, far fewer vertices to walk)
+    simplified = geoms
+    for lod, tolerance, precision in sorted(lods, key=lambda l: l[1]):
+        simplified = shapely.simplify(simplified, tolerance, preserve_topology=True)
+        snapped = shapely.set_precision(simplified, 10.0 ** -precision)
+        # Grid snapping can collapse a tiny polygon entirely; keep the unsnapped shape then
+        snapped = np.where(shapely.is_empty(snapped), simplified, snapped)
+        per_lod[lod] = _records(shapely.to_geojson(snapped))
+    wkbs = shapely.to_wkb(geoms)
+    bounds = shapely.bounds(geoms)
+
+    out = []
+    for i, zip_code in enumerate(zips):
+        records = [(lod, GEOJSON, per_lod[lod][i]) for lod in per_lod]
+        records.append((0, WKB, bytes(wkbs[i])))
+        records.append((0, BBOX, _BBOX.pack(*(float(v) for v in bounds[i]))))
+        out.append((zip_code, records))
+    return out
+
+
+class BoundaryStoreWriter:
+    """
+    Stream records into a new store. Data is written as it arrives (bounded memory); the index
+    and metadata are appended on close() and the file is moved into place atomically.
+
+    With merge=True, close() also copies every record of the zips this writer did not write from
+    the store currently at `path` (if any), so a partial run updates the store instead of
+    replacing it. A zip that was written keeps none of its old records.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, meta: Optional[Dict] = None, merge: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.meta = dict(meta or {})
+        self.merge = merge
+        self.kept_zips = 0
+        self._entries: Dict[_Key, Tuple[int, int]] = {}
+        self._f = open(self.tmp_path, 'wb')
+        self._f.write(_HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0))
+
+    def add(self, zip_code: str, data: bytes, lod: int = 0, kind: int = GEOJSON) -> None:
+        """Append one record. A later record for the same (zip, lod, kind) replaces the earlier one."""
+        key = normalize_zip5(zip_code)
+        if key is None:
+            raise ValueError(f"Invalid zip code for boundary store: {zip_code!r}")
+        offset = self._f.tell()
+        self._f.write(data)
+        self._entries[(key, lod, kind)] = (offset, len(data))
+
+    def add_feature_collection(self, zip_code: str, geojson: Dict, lod: int = 0) -> None:
+        """Add a GeoJSON FeatureCollection as a minified canonical record (features tagged with zip_code)."""
+        features = [
+            {'type': 'Feature', 'geometry': f.get('geometry'),
+             'properties': {**(f.get('properties') or {}), 'zip_code': zip_code}}
+            for f in geojson.get('features') or []
+        ]
+        fc = {'type': 'FeatureCollection', 'features': features}
+        self.add(zip_code, json.dumps(fc, separators=(',', ':')).encode('utf-8'), lod=lod, kind=GEOJSON)
+
+    def add_encoded(self, encoded: List[Tuple[str, List[Tuple[int, int, bytes]]]]) -> None:
+        """Add the output of encode_boundary_records()."""
+        for zip_code, records in encoded:
+            for lod, kind, data in records:
+                self.add(zip_code, data, lod=lod, kind=kind)
+
+    def add_bounds(self, zip_code: str, bounds: Tuple[float, float, float, float]) -> None:
+        """Add the (min lng, min lat, max lng, max lat) box used by viewport queries."""
+        self.add(zip_code, _BBOX.pack(*bounds), kind=BBOX)
+
+    def _merge_existing(self) -> None:
+        """Copy the records of zips not written by this run from the store being replaced."""
+        if not self.path.exists():
+            return
+        try:
+            existing = BoundaryStore(str(self.path))
+        except (OSError, ValueError) as e:
+            logger.warning("Not merging %s (unreadable: %s); it will be replaced", self.path, e)
+            return
+        try:
+            written = {k[0] for k in self._entries}
+            kept = set()
+            for (zip_code, lod, kind), (offset, length) in sorted(existing._index.items()):
+                if zip_code in written:
+                    continue
+                self.add(zip_code, existing._mm[offset:offset + length], lod=lod, kind=kind)
+                kept.add(zip_code)
+            self.kept_zips = len(kept)
+            # Levels of detail of the kept records stay described (this run's definitions win)
+            lods = {**(existing.meta.get('lods') or {}), **(self.meta.get('lods') or {})}
+            if lods:
+                self.meta['lods'] = lods
+        finally:
+            existing.close()
+
+    def close(self) -> int:
+        """Write index + meta, fsync and atomically replace the target. Returns number of records."""
+        if self.merge:
+            self._merge_existing()
+        index_offset = self._f.tell()
+        for (zip_code, lod, kind), (offset, length) in sorted(self._entries.items()):
+            self._f.write(_ENTRY.pack(zip_code.encode('ascii'), lod, kind, offset, length))
+        meta_offset = self._f.tell()
+        meta = json.dumps(self.meta, separators=(',', ':')).encode('utf-8')
+        self._f.write(meta)
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(MAGIC, VERSION, len(self._entries), index_offset, meta_offset, len(meta)))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+        return len(self._entries)
+
+    def abort(self) -> None:
+        self._f.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BoundaryStore:
+    """Read-only, memory-mapped boundary store. Safe to share between threads (and forked workers)."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = str(path)
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_offset, meta_offset, meta_length = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a boundary store (magic={magic!r}, version={version})")
+        self._index: Dict[_Key, Tuple[int, int]] = {}
+        for i in range(count):
+            z, lod, kind, offset, length = _ENTRY.unpack_from(self._mm, index_offset + i * _ENTRY.size)
+            self._index[(z.decode('ascii'), lod, kind)] = (offset, length)
+        self.meta: Dict = json.loads(bytes(self._mm[meta_offset:meta_offset + meta_length]) or b'{}')
+        # lod -> tolerance, finest first
+        self.lod_tolerances: Dict[int, float] = dict(sorted(
+            ((int(k), float(v['tolerance'])) for k, v in (self.meta.get('lods') or {}).items()),
+            key=lambda kv: kv[1],
+        ))
+        self._zips = sorted({k[0] for k in self._index})
+        self._bounds: Optional[List[Tuple[str, float, float, float, float]]] = None
+        self._bounds_lock = threading.Lock()
+        self.mtime = os.path.getmtime(self.path)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._zips)
+
+    def __contains__(self, zip_code: str) -> bool:
+        return (normalize_zip5(zip_code), 0, GEOJSON) in self._index
+
+    def zips(self) -> List[str]:
+        return list(self._zips)
+
+    def lods(self, zip_code: str, kind: int = GEOJSON) -> List[int]:
+        """Levels of detail stored for a zip (0 = full resolution)."""
+        z = normalize_zip5(zip_code)
+        return sorted(lod for (k, lod, kd) in self._index if k == z and kd == kind)
+
+    def raw(self, zip_code: str, lod: int = 0, kind: int = GEOJSON) -> Optional[memoryview]:
+        """Zero-copy view of a record's bytes, or None if absent."""
+        entry = self._index.get((normalize_zip5(zip_code), lod, kind))
+        if entry is None:
+            return None
+        offset, length = entry
+        return memoryview(self._mm)[offset:offset + length]
+
+    def lod_for_tolerance(self, tolerance: Optional[float]) -> int:
+        """Coarsest stored level of detail whose tolerance does not exceed `tolerance` (0 = full resolution)."""
+        lod = 0
+        if tolerance:
+            for candidate, tol in self.lod_tolerances.items():
+                if tol <= tolerance:
+                    lod = candidate
+        return lod
+
+    def geojson_bytes(self, zip_code: str, lod: int = 0) -> Optional[memoryview]:
+        """Minified GeoJSON FeatureCollection bytes for a zip (zero-copy). Missing lods fall back to full resolution."""
+        data = self.raw(zip_code, lod=lod, kind=GEOJSON)
+        if data is None and lod:
+            data = self.raw(zip_code, lod=0, kind=GEOJSON)
+        return data
+
+    def feature_bytes(self, zip_code: str, lod: int = 0):
+        """
+        The comma-separated Feature objects of a zip's record (no FeatureCollection wrapper), ready to
+        splice into a larger collection. Zero-copy for canonical records; None if the zip is absent.
+        """
+        data = self.geojson_bytes(zip_code, lod=lod)
+        if data is None:
+            return None
+        if data[:len(_FC_PREFIX)] == _FC_PREFIX and data[len(data) - len(_FC_SUFFIX):] == _FC_SUFFIX:
+            return data[len(_FC_PREFIX):len(data) - len(_FC_SUFFIX)]
+        # Written by an older packer: parse and tag features with the zip
+        fc = to_feature_collection(json.loads(bytes(data)), normalize_zip5(zip_code)) or {'features': []}
+        return b','.join(
+            json.dumps({'type': 'Feature', 'geometry': f.get('geometry'),
+                        'properties': {**(f.get('properties') or {}), 'zip_code': normalize_zip5(zip_code)}},
+                       separators=(',', ':')).encode('utf-8')
+            for f in fc['features']
+        )
+
+    def bounds(self, zip_code: str) -> Optional[Tuple[float, float, float, float]]:
+        """(min lng, min lat, max lng, max lat) for a zip, or None."""
+        data = self.raw(zip_code, kind=BBOX)
+        if data is not None:
+            return _BBOX.unpack(data)
+        try:
+            geom = self.geometry(zip_code)
+        except Exception:
+            geom = None
+        return tuple(geom.bounds) if geom is not None and not geom.is_empty else None
+
+    def zips_in_bbox(self, west: float, south: float, east: float, north: float) -> List[str]:
+        """Zips whose bounding box intersects the given box (box list is built once, on first use)."""
+        if self._bounds is None:
+            with self._bounds_lock:
+                if self._bounds is None:
+                    boxes = []
+                    for z in self._zips:
+                        b = self.bounds(z)
+                        if b is not None:
+                            boxes.append((z,) + tuple(b))
+                    self._bounds = boxes
+        return [
+            z for z, minx, miny, maxx, maxy in self._bounds
+            if minx <= east and maxx >= west and miny <= north and maxy >= south
+        ]
+
+    def geojson(self, zip_code: str, lod: int = 0) -> Optional[Dict]:
+        data = self.geojson_bytes(zip_code, lod=lod)
+        return json.loads(bytes(data)) if data is not None else None
+
+    def geometry(self, zip_code: str, lod: int = 0):
+        """Shapely geometry for a zip (from WKB when stored, else parsed GeoJSON). None if absent."""
+        wkb = self.raw(zip_code, lod=lod, kind=WKB)
+        if wkb is not None:
+            from shapely import wkb as shapely_wkb
+            return shapely_wkb.loads(bytes(wkb))
+        data = self.geojson(zip_code, lod=lod)
+        if not data:
+            return None
+        from shapely.geometry import shape
+        geom = data
+        if data.get('type') == 'FeatureCollection':
+            features = data.get('features') or []
+            geom = features[0].get('geometry') if features else None
+        elif data.get('type') == 'Feature':
+            geom = data.get('geometry')
+        return shape(geom) if geom else None
+
+    def iter_geojson(self, zip_codes: Optional[List[str]] = None, lod: int = 0) -> Iterator[Tuple[str, memoryview]]:
+        """Yield (zip, bytes) for the given zips (all if None) in one pass over the store."""
+        for z in (zip_codes if zip_codes is not None else self._zips):
+            data = self.geojson_bytes(z, lod=lod)
+            if data is not None:
+                yield normalize_zip5(z), data
+
+
+# Seconds between re-checks of a store file (a rebuilt or newly written pack is picked up after this)
+STORE_RECHECK_SECONDS = 5.0
+
+# store path -> (open store or None, monotonic time checked, (inode, mtime, size) or None if missing)
+_stores: Dict[str, Tuple[Optional[BoundaryStore], float, Optional[Tuple[int, int, int]]]] = {}
+_store_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def get_boundary_store(path: Optional[str] = None) -> Optional[BoundaryStore]:
+    """
+    Shared store instance per process and path, or None if no packed store exists.
+    Path: argument, else Config.ZIP_BOUNDARY_STORE, else data/zip_boundaries.pack.
+    The file is re-checked every STORE_RECHECK_SECONDS: a pack created or atomically replaced
+    since (scripts/pack_zip_boundaries.py) is opened; the previous mmap is left to the GC, since
+    memoryviews handed out from it may still be in use.
+    """
+    if path is None:
+        try:
+            from config.config import Config
+            path = getattr(Config, 'ZIP_BOUNDARY_STORE', None) or DEFAULT_STORE_PATH
+        except Exception:
+            path = DEFAULT_STORE_PATH
+    key = str(path)
+    entry = _stores.get(key)
+    now = time.monotonic()
+    if entry is not None and now - entry[1] < STORE_RECHECK_SECONDS:
+        return entry[0]
+    with _store_lock:
+        entry = _stores.get(key)
+        if entry is not None and now - entry[1] < STORE_RECHECK_SECONDS:
+            return entry[0]
+        signature = _file_signature(key)
+        if entry is not None and signature == entry[2]:
+            store = entry[0]
+        else:
+            store = None
+            if signature is not None:
+                try:
+                    store = BoundaryStore(key)
+                except Exception as e:
+                    print(f"[WARNING] Could not open boundary store {key}: {e}")
+        _stores[key] = (store, now, signature)
+        return store
+
+
+def reset_boundary_store() -> None:
+    """
+    Forget the shared stores so the next get_boundary_store() reopens them (after a rebuild).
+    They are not closed here: memoryviews handed out by raw()/geojson_bytes() may still be in
+    use, and the old mmap is released once the last of them is gone.
+    """
+    with _store_lock:
+        _stores.clear()
+
+
+def to_feature_collection(data: Dict, zip_code: str) -> Optional[Dict]:
+    """Normalize a stored boundary (FeatureCollection, Feature or bare geometry) to a FeatureCollection."""
+    if not isinstance(data, dict):
+        return None
+    t = data.get('type')
+    if t == 'FeatureCollection':
+        return data if data.get('features') else None
+    if t == 'Feature':
+        return {'type': 'FeatureCollection', 'features': [data]}
+    if t in ('Polygon', 'MultiPolygon'):
+        return {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': data, 'properties': {'ZCTA5CE10': zip_code}}
+        ]}
+    return None
+
+
+def pack_directory(boundaries_dir: str = DEFAULT_BOUNDARIES_DIR, store_path: str = DEFAULT_STORE_PATH,
+                   include_wkb: bool = True, lods=DEFAULT_LODS, merge: bool = True) -> Dict[str, int]:
+    """
+    Convert a directory of {zip}.geojson files into a packed store, with simplified levels of
+    detail for each (lods: (lod, tolerance, decimals) tuples; empty for full resolution only).
+    With merge (the default), zips already in the store but not in the directory are kept.
+    Returns counts.
+    """
+    try:
+        from shapely.geometry import shape
+    except ImportError:
+        shape = None
+        include_wkb = False
+        lods = ()
+
+    meta = {'source': str(boundaries_dir), 'lods': lods_meta(lods)}
+    packed = skipped = 0
+    with BoundaryStoreWriter(store_path, meta=meta, merge=merge) as writer:
+        for path in sorted(Path(boundaries_dir).glob('*.geojson')):
+            zip_code = normalize_zip5(path.stem)
+            if zip_code is None:
+                skipped += 1
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    fc = to_feature_collection(json.load(f), zip_code)
+            except Exception:
+                fc = None
+            if fc is None:
+                skipped += 1
+                continue
+            writer.add_feature_collection(zip_code, fc)
+            if include_wkb:
+                try:
+                    geom = shape(fc['features'][0]['geometry'])
+                    writer.add(zip_code, geom.wkb, kind=WKB)
+                    writer.add_bounds(zip_code, geom.bounds)
+                except Exception:
+                    pass
+            for lod, tol, prec in lods:
+                writer.add_feature_collection(zip_code, simplify_feature_collection(fc, tol, prec), lod=lod)
+            packed += 1
+    return {'packed': packed, 'skipped': skipped, 'kept': writer.kept_zips}
@@ -1,24 +1,137 @@
 """
 FIPS code lookup utilities for state and county names.
+
+County names come from a county FIPS CSV (Config.COUNTY_FIPS_CSV, written by
+scripts/build_zip_reference.py) and, failing that, from the county columns of the bundled zip
+reference table (backend/zip_reference.py). Both are loaded once and indexed in memory.
 """
+import csv
+import gzip
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config.config import Config
+
+STATE_FIPS_TO_CODE = {
+    '01': 'AL', '02': 'AK', '04': 'AZ', '05': 'AR', '06': 'CA', '08': 'CO',
+    '09': 'CT', '10': 'DE', '11': 'DC', '12': 'FL', '13': 'GA', '15': 'HI',
+    '16': 'ID', '17': 'IL', '18': 'IN', '19': 'IA', '20': 'KS', '21': 'KY',
+    '22': 'LA', '23': 'ME', '24': 'MD', '25': 'MA', '26': 'MI', '27': 'MN',
+    '28': 'MS', '29': 'MO', '30': 'MT', '31': 'NE', '32': 'NV', '33': 'NH',
+    '34': 'NJ', '35': 'NM', '36': 'NY', '37': 'NC', '38': 'ND', '39': 'OH',
+    '40': 'OK', '41': 'OR', '42': 'PA', '44': 'RI', '45': 'SC', '46': 'SD',
+    '47': 'TN', '48': 'TX', '49': 'UT', '50': 'VT', '51': 'VA', '53': 'WA',
+    '54': 'WV', '55': 'WI', '56': 'WY', '60': 'AS', '66': 'GU', '69': 'MP',
+    '72': 'PR', '78': 'VI',
+}
+STATE_CODE_TO_FIPS = {code: fips for fips, code in STATE_FIPS_TO_CODE.items()}
+
+# Header aliases accepted by load_county_fips_from_csv (our format and the Census national county files)
+_STATE_FIPS_COLUMNS = ('state_fips', 'STATEFP', 'STATE_FIPS', 'statefp')
+_COUNTY_FIPS_COLUMNS = ('county_fips', 'COUNTYFP', 'COUNTY_FIPS', 'countyfp')
+_COUNTY_NAME_COLUMNS = ('county_name', 'COUNTYNAME', 'NAMELSAD', 'NAME', 'county')
+_STATE_NAME_COLUMNS = ('state_name', 'STATE', 'STATE_NAME', 'state')
+
+CountyKey = Tuple[str, str]  # (2-digit state FIPS, 3-digit county FIPS)
+
+_counties: Optional[Dict[CountyKey, Tuple[str, str]]] = None
+_by_name: Optional[Dict[Tuple[str, str], str]] = None
+_lock = threading.Lock()
+
+
+def _first(row: Dict[str, str], columns) -> str:
+    for column in columns:
+        value = row.get(column)
+        if value:
+            return value.strip()
+    return ''
+
+
+def normalize_county_name(name: Optional[str]) -> str:
+    """'Mecklenburg County' / 'mecklenburg' -> 'mecklenburg' (for name -> FIPS matching)."""
+    value = (name or '').lower().replace('.', '').replace('-', ' ')
+    for suffix in (' county', ' parish', ' borough', ' census area', ' municipality', ' city and borough'):
+        if value.endswith(suffix):
+            value = value[:-len(suffix)]
+            break
+    return ' '.join(value.split())
+
+
+def load_county_fips_from_csv(csv_path: str = None) -> Dict[CountyKey, Tuple[str, str]]:
+    """
+    Load county FIPS codes from a CSV file.
+    Expected format: state_fips,county_fips,county_name,state_name
+    (Census national_county files, pipe-delimited and/or gzipped, are accepted too.)
 
-def fips_to_county_name(state_fips: str, county_fips: str):
+    Returns {(state_fips, county_fips): (county_name, state_name)}; {} if the file doesn't exist.
+    """
+    path = Path(csv_path or Config.COUNTY_FIPS_CSV)
+    if not path.exists():
+        return {}
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8-sig', newline='') as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter='|' if sample.count('|') > sample.count(',') else ',')
+        counties = {}
+        for row in reader:
+            state_fips = _first(row, _STATE_FIPS_COLUMNS).zfill(2)
+            county_fips = _first(row, _COUNTY_FIPS_COLUMNS).zfill(3)
+            name = _first(row, _COUNTY_NAME_COLUMNS)
+            if state_fips.strip('0') and county_fips.strip('0') and name:
+                state = _first(row, _STATE_NAME_COLUMNS) or STATE_FIPS_TO_CODE.get(state_fips, '')
+                counties[(state_fips, county_fips)] = (name, state)
+    return counties
+
+
+def _load() -> Dict[CountyKey, Tuple[str, str]]:
+    global _counties, _by_name
+    if _counties is None:
+        with _lock:
+            if _counties is None:
+                counties = load_county_fips_from_csv()
+                if not counties:
+                    from backend.zip_reference import get_zip_reference
+                    for ref in get_zip_reference().values():
+                        if ref.county_fips and ref.county:
+                            counties.setdefault((ref.county_fips[:2], ref.county_fips[2:]), (ref.county, ref.state))
+                by_name = {}
+                for (state_fips, county_fips), (name, _) in counties.items():
+                    by_name[(STATE_FIPS_TO_CODE.get(state_fips, state_fips), normalize_county_name(name))] = state_fips + county_fips
+                _by_name = by_name
+                _counties = counties
+    return _counties
+
+
+def fips_to_county_name(state_fips: str, county_fips: str = None):
     """
     Convert state and county FIPS codes to county name.
-    
+
     Args:
-        state_fips: 2-digit state FIPS code
+        state_fips: 2-digit state FIPS code (or the full 5-digit county FIPS with county_fips=None)
         county_fips: 3-digit county FIPS code
-    
+
     Returns:
         County name string or None if not found
     """
-    # TODO: Implement county FIPS to name lookup (e.g. Census ANSI file)
-    return None
+    if county_fips is None:
+        state_fips, county_fips = str(state_fips or '').zfill(5)[:2], str(state_fips or '').zfill(5)[2:]
+    entry = _load().get((str(state_fips).zfill(2), str(county_fips).zfill(3)))
+    return entry[0] if entry else None
 
-def load_county_fips_from_csv(csv_path: str = None):
-    """
-    Load county FIPS codes from a CSV file.
-    Expected format: state_fips,county_fips,county_name,state_name
-    """
-    pass
+
+def county_name_to_fips(state: str, county_name: str) -> Optional[str]:
+    """5-digit county FIPS for ('NC', 'Mecklenburg County'); state may be a code or 2-digit FIPS."""
+    _load()
+    state = (state or '').strip().upper()
+    state = STATE_FIPS_TO_CODE.get(state, state)
+    return _by_name.get((state, normalize_county_name(county_name)))
+
+
+def reset_fips_cache() -> None:
+    """Drop the loaded tables (after rebuilding the reference files)."""
+    global _counties, _by_name
+    with _lock:
+        _counties = None
+        _by_name = None
@@ -0,0 +1,206 @@
+"""
+Shared address geocoding with a persistent cache.
+
+Every geocode call site goes through get_geocoder().geocode(address). Addresses are normalized
+(case, whitespace, punctuation, common street-suffix and direction abbreviations) so trivially
+different spellings share one cache entry. Results are kept in a small SQLite table with a TTL:
+long for hits, short for "no results"; provider errors (quota, denied key, network) are never
+cached. Concurrent lookups of the same address share one provider call, and geocode_many() does a
+batch of addresses with one cache read and a bounded thread pool for the misses.
+
+GEOCODE_PROVIDER=stub swaps Google for StubGeocodingProvider (fixed table + offline zip centroids),
+so tests and local runs make no network calls.
+"""
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from config.config import Config
+from backend.ttl_cache import Coalescer, TTLCache
+
+GOOGLE_GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd', 'lane': 'ln',
+    'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy', 'circle': 'cir', 'terrace': 'ter',
+    'trail': 'trl', 'square': 'sq', 'suite': 'ste', 'apartment': 'apt', 'north': 'n', 'south': 's',
+    'east': 'e', 'west': 'w', 'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+_COUNTRY_SUFFIX = re.compile(r'\s*\b(usa|us|united states( of america)?)$')
+
+
+class GeocodingError(Exception):
+    """Provider failed (quota, denied key, network). Not cached; the next call tries again."""
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: '123 Main Street, Charlotte, NC 28202, USA' -> '123 main st charlotte nc 28202'."""
+    text = (address or '').lower().replace('#', ' # ')
+    text = re.sub(r"[^\w#\s-]", ' ', text)
+    words = [_ABBREVIATIONS.get(w, w) for w in text.split()]
+    return _COUNTRY_SUFFIX.sub('', ' '.join(words)).strip()
+
+
+def _result(lat, lng, zip_code=None, formatted_address=None, bounds=None, viewport=None) -> Dict:
+    return {
+        'lat': float(lat), 'lng': float(lng), 'zip_code': zip_code,
+        'formatted_address': formatted_address, 'bounds': bounds, 'viewport': viewport,
+    }
+
+
+class GoogleGeocodingProvider:
+    """Google Geocoding API (US only). One keep-alive session per thread."""
+
+    name = 'google'
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10.0):
+        self.api_key = api_key if api_key is not None else Config.GOOGLE_MAPS_API_KEY
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def geocode(self, address: str) -> Optional[Dict]:
+        """Best match, or None when Google has no result. Raises GeocodingError on any other failure."""
+        params = {'address': address, 'key': self.api_key, 'components': 'country:US'}
+        try:
+            data = self._session().get(GOOGLE_GEOCODE_URL, params=params, timeout=self.timeout).json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise GeocodingError(str(e)) from e
+        status = data.get('status')
+        if status == 'ZERO_RESULTS' or (status == 'OK' and not data.get('results')):
+            return None
+        if status != 'OK':
+            raise GeocodingError(data.get('error_message') or status or 'Unknown error')
+        best = data['results'][0]
+        geometry = best['geometry']
+        zip_code = next(
+            (c['long_name'] for c in best.get('address_components', []) if 'postal_code' in c.get('types', [])),
+            None,
+        )
+        return _result(geometry['location']['lat'], geometry['location']['lng'], zip_code,
+                       best.get('formatted_address'), geometry.get('bounds'), geometry.get('viewport'))
+
+
+class StubGeocodingProvider:
+    """
+    Offline provider for tests and local runs: exact matches from `results` ({address: (lat, lng)}),
+    otherwise the centroid of the address's 5-digit zip from backend.zip_centroids.
+    """
+
+    name = 'stub'
+
+    def __init__(self, results: Optional[Dict[str, tuple]] = None):
+        self.results = {normalize_address(a): latlng for a, latlng in (results or {}).items()}
+        self.calls = 0
+
+    def geocode(self, address: str) -> Optional[Dict]:
+        from backend.zip_centroids import lookup_centroids
+        self.calls += 1
+        zip_match = re.search(r'\b(\d{5})(?:-\d{4})?\b', address or '')
+        zip_code = zip_match.group(1) if zip_match else None
+        key = normalize_address(address)
+        if key in self.results:
+            lat, lng = self.results[key]
+            return _result(lat, lng, zip_code, address)
+        if zip_code:
+            centroid = lookup_centroids(None, [zip_code]).get(zip_code)
+            if centroid:
+                return _result(centroid[0], centroid[1], zip_code, address)
+        return None
+
+
+class GeocodeCache(TTLCache):
+    """Normalized address -> result JSON (NULL = no result), each with an expiry time."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        super().__init__(path, 'geocodes', 'address_key', 'result', busy_timeout=busy_timeout)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """{key: result or None} for unexpired entries; absent keys are not cached."""
+        return {k: json.loads(r) if r else None for k, r in self.get_values(keys).items()}
+
+    def put(self, key: str, result: Optional[Dict], ttl: float) -> None:
+        self.set_value(key, json.dumps(result) if result is not None else None, ttl)
+
+
+class Geocoder:
+    """Cached, coalescing front end over a provider (see module docstring)."""
+
+    def __init__(
+        self,
+        provider=None,
+        cache: Optional[GeocodeCache] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        max_workers: int = 8,
+    ):
+        self.provider = provider or GoogleGeocodingProvider()
+        self.cache = cache or GeocodeCache(Config.GEOCODE_CACHE)
+        self.ttl = ttl if ttl is not None else Config.GEOCODE_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else Config.GEOCODE_NEGATIVE_TTL
+        self.max_workers = max_workers
+        self._inflight = Coalescer()
+
+    def geocode(self, address: str) -> Optional[Dict]:
+        """{lat, lng, zip_code, formatted_address, bounds, viewport} or None. Raises GeocodingError."""
+        key = normalize_address(address)
+        if not key:
+            return None
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        return self._lookup(key, address)
+
+    def geocode_many(self, addresses: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """{address: result or None} for a batch. Addresses whose lookup errored are left out."""
+        addresses = list(dict.fromkeys(a for a in addresses if a))
+        keys = {a: normalize_address(a) for a in addresses}
+        cached = self.cache.get_many({k for k in keys.values() if k})
+        results = {a: cached.get(k) for a, k in keys.items() if not k or k in cached}
+        todo: Dict[str, str] = {}  # one provider call per distinct key
+        for a, k in keys.items():
+            if a not in results:
+                todo.setdefault(k, a)
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as pool:
+                futures = {k: pool.submit(self._lookup, k, a) for k, a in todo.items()}
+            by_key = {}
+            for k, future in futures.items():
+                try:
+                    by_key[k] = future.result()
+                except GeocodingError as e:
+                    print(f"Geocoding failed for {todo[k]!r}: {e}")
+            results.update({a: by_key[k] for a, k in keys.items() if a not in results and k in by_key})
+        return results
+
+    def _lookup(self, key: str, address: str) -> Optional[Dict]:
+        return self._inflight.coalesce(key, lambda: self._fetch(key, address))
+
+    def _fetch(self, key: str, address: str) -> Optional[Dict]:
+        result = self.provider.geocode(address)
+        self.cache.put(key, result, self.ttl if result is not None else self.negative_ttl)
+        return result
+
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """Process-wide geocoder; the provider comes from Config.GEOCODE_PROVIDER ('google' or 'stub')."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                provider = StubGeocodingProvider() if Config.GEOCODE_PROVIDER == 'stub' else GoogleGeocodingProvider()
+                _geocoder = Geocoder(provider)
+    return _geocoder
@@ -0,0 +1,190 @@
+"""
+HTTP compression, strong ETags and Cache-Control for API responses.
+
+init_http_caching(app) adds an after_request hook for successful GET/HEAD responses:
+  - Cache-Control comes from CACHE_POLICIES by endpoint;
+  - the ETag is the one the route set (derived from a file mtime or data version) or else a
+    hash of the body, and a matching If-None-Match turns the response into a 304;
+  - bodies of at least Config.COMPRESS_MIN_BYTES are compressed with brotli (when the brotli
+    package is installed) or gzip, per Accept-Encoding. Compressed bodies are memoized by
+    (ETag, encoding) in a byte-bounded LRU, so each payload is compressed once per process.
+
+Per-zip boundary files are served through send_precompressed(), which picks the .br/.gz sibling
+written by write_precompressed() (on write-through and by scripts/precompress_boundaries.py).
+Streamed responses are left alone.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from flask import request
+
+from config.config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# endpoint -> Cache-Control. no-cache still allows storing but revalidates every time (cheap 304s).
+CACHE_POLICIES = {
+    'api.get_zip_boundary': 'public, max-age=86400',
+    'api.get_zip_boundaries': 'public, max-age=86400',
+    'api.get_census_tile': 'public, max-age=86400',
+    'api.get_school_zones_by_zip': 'public, max-age=3600',
+    'api.get_census_data': 'no-cache',
+    'api.get_census_data_by_zip': 'no-cache',
+    'api.get_zip_centroids': 'public, max-age=86400',
+}
+COMPRESSIBLE_TYPES = ('application/json', 'application/geo+json', 'application/x-ndjson', 'text/')
+# ETag suffix per content coding (a strong ETag must differ between encodings of the same resource)
+_ENCODING_SUFFIX = {'br': '-br', 'gzip': '-gzip'}
+
+
+def data_version_etag(*parts) -> str:
+    """Short stable ETag value from whatever identifies the data version (paths, mtimes, sizes, ids)."""
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def file_etag(path, *extra) -> str:
+    stat = os.stat(path)
+    return data_version_etag(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, *extra)
+
+
+def accepted_encoding() -> Optional[str]:
+    """Best content coding the client accepts that we can produce: 'br', 'gzip' or None."""
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESS_LEVEL, mtime=0)
+
+
+def write_precompressed(path) -> None:
+    """Write path.gz (and path.br with brotli) next to a file that is served as-is."""
+    path = Path(path)
+    data = path.read_bytes()
+    for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+        if encoding == 'br' and brotli is None:
+            continue
+        target = path.with_name(path.name + suffix)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(compress(data, encoding))
+        os.replace(tmp, target)
+
+
+def send_precompressed(path, mimetype: str = 'application/json'):
+    """Serve a file, using a fresh .br/.gz sibling when the client accepts it."""
+    from flask import current_app
+    path = Path(path)
+    etag = file_etag(path)
+    encoding = accepted_encoding()
+    if encoding is not None:
+        variant = path.with_name(path.name + ('.br' if encoding == 'br' else '.gz'))
+        try:
+            if variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+                response = current_app.response_class(variant.read_bytes(), mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.headers['Vary'] = 'Accept-Encoding'
+                response.set_etag(etag + _ENCODING_SUFFIX[encoding])
+                return response
+        except OSError:
+            pass
+    response = current_app.response_class(path.read_bytes(), mimetype=mimetype)
+    response.set_etag(etag)
+    return response
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (etag, encoding), bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def _not_modified(app, response):
+    not_modified = app.response_class(status=304)
+    for header in ('ETag', 'Cache-Control', 'Vary'):
+        if header in response.headers:
+            not_modified.headers[header] = response.headers[header]
+    return not_modified
+
+
+def init_http_caching(app) -> None:
+    body_cache = CompressedBodyCache(Config.COMPRESS_CACHE_BYTES)
+
+    @app.after_request
+    def _cache_and_compress(response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        policy = CACHE_POLICIES.get(request.endpoint)
+        if policy and 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = policy
+        if response.is_streamed or (policy is None and not request.path.startswith('/api/')):
+            return response
+
+        etag, _ = response.get_etag()
+        if etag is None:
+            response.add_etag()  # sha1 of the body
+            etag, _ = response.get_etag()
+
+        # The encoding this request would get decides the validator (a 304 must repeat the ETag
+        # of the variant the client has cached) and whether Vary is needed
+        compressible = ('Content-Encoding' not in response.headers
+                        and response.mimetype.startswith(COMPRESSIBLE_TYPES))
+        encoding = None
+        if compressible:
+            response.vary.add('Accept-Encoding')
+            if (response.content_length or 0) >= Config.COMPRESS_MIN_BYTES:
+                encoding = accepted_encoding()
+        if request.if_none_match and any(request.if_none_match.contains(etag + s) for s in ('', '-br', '-gzip')):
+            if encoding is not None:
+                response.set_etag(etag + _ENCODING_SUFFIX[encoding])
+            return _not_modified(app, response)
+
+        if encoding is None:
+            return response
+        key = (etag, encoding)
+        body = body_cache.get(key)
+        if body is None:
+            body = compress(response.get_data(), encoding)
+            body_cache.put(key, body)
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag + _ENCODING_SUFFIX[encoding])
+        return response
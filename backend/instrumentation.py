@@ -0,0 +1,220 @@
+"""
+Per-request timing and query instrumentation.
+
+init_instrumentation(app) adds before/after-request hooks to the Flask app, SQLAlchemy cursor
+events on the shared engine and a wrapper around requests' HTTPAdapter.send. Each request records
+wall time, DB time, query count, rows reported by the driver, outbound HTTP time/count and
+response bytes. These go back to the client in a Server-Timing header and into in-process
+aggregates per endpoint, which prometheus_text() renders for /api/_metrics.
+
+Work done on other threads (thread pools in the geocoder or boundary resolver) is not attributed
+to the request; the request-thread time spent waiting on it shows up in wall time.
+
+The aggregates live in each process. Under gunicorn every worker keeps its own, and /api/_metrics
+reports the worker that answered; app_process_id and app_start_time_seconds identify it, so a
+scraper can tell a different worker (or a recycled one) from a counter reset.
+"""
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import request
+
+# Histogram buckets for request duration (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestStats:
+    __slots__ = ('started', 'db_seconds', 'queries', 'rows', 'http_seconds', 'http_requests')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.http_seconds = 0.0
+        self.http_requests = 0
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled on this thread, or None outside a request."""
+    return _current.get()
+
+
+class _EndpointMetrics:
+    __slots__ = ('requests', 'duration_sum', 'buckets', 'db_seconds', 'queries', 'rows',
+                 'http_seconds', 'http_requests', 'response_bytes')
+
+    def __init__(self):
+        self.requests: Dict[str, int] = {}  # status code -> count
+        self.duration_sum = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)  # last bucket is +Inf
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.http_seconds = 0.0
+        self.http_requests = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Thread-safe per-(method, endpoint) aggregates."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints: Dict[Tuple[str, str], _EndpointMetrics] = {}
+        self.started = time.time()
+
+    def observe(self, method: str, endpoint: str, status: int, duration: float, stats: RequestStats,
+                response_bytes: int) -> None:
+        bucket = next((i for i, le in enumerate(DURATION_BUCKETS) if duration <= le), len(DURATION_BUCKETS))
+        with self.lock:
+            m = self.endpoints.get((method, endpoint))
+            if m is None:
+                m = self.endpoints[(method, endpoint)] = _EndpointMetrics()
+            m.requests[str(status)] = m.requests.get(str(status), 0) + 1
+            m.duration_sum += duration
+            m.buckets[bucket] += 1
+            m.db_seconds += stats.db_seconds
+            m.queries += stats.queries
+            m.rows += stats.rows
+            m.http_seconds += stats.http_seconds
+            m.http_requests += stats.http_requests
+            m.response_bytes += response_bytes
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        def labels(method, endpoint, **extra):
+            pairs = {'method': method, 'endpoint': endpoint, **extra}
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + '}'
+
+        with self.lock:
+            snapshot = sorted(self.endpoints.items())
+            lines = [
+                '# HELP app_start_time_seconds Unix time the metrics registry was created.',
+                '# TYPE app_start_time_seconds gauge',
+                f'app_start_time_seconds {self.started:.3f}',
+                '# HELP app_process_id PID of the worker process these metrics come from.',
+                '# TYPE app_process_id gauge',
+                f'app_process_id {os.getpid()}',
+                '# HELP http_requests_total Requests handled, by endpoint and status code.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (method, endpoint), m in snapshot:
+                for status, count in sorted(m.requests.items()):
+                    lines.append(f'http_requests_total{labels(method, endpoint, status=status)} {count}')
+            lines += ['# HELP http_request_duration_seconds Request wall time.',
+                      '# TYPE http_request_duration_seconds histogram']
+            for (method, endpoint), m in snapshot:
+                cumulative = 0
+                for le, count in zip(DURATION_BUCKETS + ('+Inf',), m.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{labels(method, endpoint, le=le)} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{labels(method, endpoint)} {m.duration_sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{labels(method, endpoint)} {cumulative}')
+            for name, attr, kind, help_text in (
+                ('db_query_seconds_total', 'db_seconds', 'counter', 'Time spent executing SQL.'),
+                ('db_queries_total', 'queries', 'counter', 'SQL statements executed.'),
+                ('db_rows_total', 'rows', 'counter', 'Rows reported by the DB driver (rowcount).'),
+                ('external_http_seconds_total', 'http_seconds', 'counter', 'Time spent in outbound HTTP calls.'),
+                ('external_http_requests_total', 'http_requests', 'counter', 'Outbound HTTP calls.'),
+                ('http_response_bytes_total', 'response_bytes', 'counter', 'Response body bytes (when known).'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (method, endpoint), m in snapshot:
+                    value = getattr(m, attr)
+                    lines.append(f'{name}{labels(method, endpoint)} {value:.6f}' if isinstance(value, float)
+                                 else f'{name}{labels(method, endpoint)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self.lock:
+            self.endpoints.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.db_seconds += time.perf_counter() - started
+        stats.queries += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+
+def _instrument_requests() -> None:
+    """Time every outbound call made through the requests library (all sessions share HTTPAdapter)."""
+    from requests.adapters import HTTPAdapter
+    if getattr(HTTPAdapter.send, '_instrumented', False):
+        return
+    original = HTTPAdapter.send
+
+    def send(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return original(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            stats.http_seconds += time.perf_counter() - started
+            stats.http_requests += 1
+
+    send._instrumented = True
+    HTTPAdapter.send = send
+
+
+def _endpoint_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def init_instrumentation(app, engine=None) -> None:
+    """Register the request hooks on app and the query hooks on engine (default: backend.database.engine)."""
+    from sqlalchemy import event
+    if engine is None:
+        from backend.database import engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    _instrument_requests()
+
+    @app.before_request
+    def _start_request_stats():
+        _current.set(RequestStats())
+
+    @app.after_request
+    def _record_request_stats(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.started
+        response_bytes = 0 if response.is_streamed else (response.content_length or 0)
+        registry.observe(request.method, _endpoint_label(), response.status_code, duration, stats, response_bytes)
+        if app.config.get('SERVER_TIMING_HEADER', True):
+            parts = [f'app;dur={duration * 1000:.1f}',
+                     f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries, {stats.rows} rows"']
+            if stats.http_requests:
+                parts.append(f'http;dur={stats.http_seconds * 1000:.1f};desc="{stats.http_requests} calls"')
+            response.headers['Server-Timing'] = ', '.join(parts)
+        return response
+
+    @app.teardown_request
+    def _clear_request_stats(exc):
+        _current.set(None)
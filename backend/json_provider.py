@@ -0,0 +1,115 @@
+"""
+JSON provider for the Flask app: orjson when installed, stdlib json otherwise.
+
+Encodes datetime/date/time as ISO 8601, Decimal as float, UUIDs, sets and NumPy scalars/arrays
+without per-row conversion in the routes. RawJSON wraps already-encoded JSON (e.g. GeoJSON
+from GEOS or the boundary store) so it is spliced into the response verbatim instead of being
+parsed and re-encoded. Keys are not sorted (Flask's default provider sorts them).
+"""
+import dataclasses
+import datetime
+import decimal
+import json
+import re
+import secrets
+import sys
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+
+class RawJSON:
+    """Already-encoded JSON (bytes or str) to embed as-is."""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+def geojson_raw(geometry) -> RawJSON:
+    """Shapely geometry as RawJSON via GEOS' GeoJSON writer (no Python coordinate tuples)."""
+    import shapely
+    return RawJSON(shapely.to_geojson(geometry))
+
+
+def _default(obj):
+    """Types neither encoder handles natively (orjson already covers datetime, UUID and dataclasses)."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    numpy = sys.modules.get('numpy')  # NumPy values imply numpy is already loaded; never import it here
+    if numpy is not None:
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+        if isinstance(obj, numpy.ndarray):
+            return obj.tolist()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    def encode(self, obj, indent: bool = False) -> bytes:
+        """obj as UTF-8 JSON bytes, with RawJSON values spliced in."""
+        if isinstance(obj, RawJSON):
+            return obj.data
+        raw = []
+        token = None
+
+        def default(o):
+            nonlocal token
+            if isinstance(o, RawJSON):
+                # Encode a unique placeholder string and substitute the raw bytes afterwards
+                if token is None:
+                    token = secrets.token_hex(8)
+                raw.append(o.data)
+                return f"__raw_json_{token}_{len(raw) - 1}__"
+            return _default(o)
+
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            out = orjson.dumps(obj, default=default, option=option)
+        else:
+            out = json.dumps(obj, default=default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+                             indent=2 if indent else None,
+                             separators=None if indent else (',', ':')).encode('utf-8')
+        if raw:
+            out = re.sub(rb'"__raw_json_' + token.encode() + rb'_(\d+)__"', lambda m: raw[int(m.group(1))], out)
+        return out
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Caller-specific json.dumps options (indent, separators, ...) go to the stdlib encoder
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.encode(obj, indent=indent), mimetype=self.mimetype)
@@ -0,0 +1,78 @@
+"""
+Application logging: per-module loggers (logging.getLogger(__name__)), level and format from Config.
+
+configure_logging() installs one stdout handler on the root logger with either a plain text or a
+JSON-lines formatter (LOG_FORMAT=json; `extra={...}` fields become JSON keys). Modules log with
+%-style arguments so nothing is formatted unless the level is enabled; anything costly to build
+goes behind logger.isEnabledFor(). Per-item messages inside loops use LogSampler so only every Nth
+occurrence is emitted.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Optional
+
+from config.config import Config
+
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any `extra` fields, exc (traceback) if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Set up the root handler once (later calls only change the level)."""
+    global _configured
+    level = (level or Config.LOG_LEVEL).upper()
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if (fmt or Config.LOG_FORMAT).lower() == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root.addHandler(handler)
+    _configured = True
+
+
+class LogSampler:
+    """
+    Emit only every `every`-th call (the 1st, every+1-th, ...), with a running count appended.
+    Costs one isEnabledFor() check when the level is off.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int, level: int = logging.DEBUG):
+        self.logger = logger
+        self.every = max(1, every)
+        self.level = level
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, msg: str, *args) -> None:
+        if not self.logger.isEnabledFor(self.level):
+            return
+        with self.lock:
+            self.count += 1
+            count = self.count
+        if (count - 1) % self.every == 0:
+            self.logger.log(self.level, msg + ' [sampled 1/%d, %d so far]', *args, self.every, count)
@@ -99,6 +99,7 @@ class SchoolData(Base):
     address = Column(String(255), nullable=True, index=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    location_key = Column(String(32), nullable=True)  # "lat,lng" rounded to 4 places; upsert key (backend/school_ingest.py)
     
     # School ratings (1-10 scale)
     elementary_school_name = Column(String(255), nullable=True)
@@ -126,6 +127,7 @@ class SchoolData(Base):
         Index('idx_school_zip', 'zip_code'),
         Index('idx_school_location', 'latitude', 'longitude'),  # For fast geographic lookups
         Index('idx_school_ratings', 'elementary_school_rating', 'middle_school_rating', 'high_school_rating'),
+        Index('idx_school_data_location_key', 'location_key', unique=True),
     )
     
     def to_dict(self):
@@ -0,0 +1,306 @@
+"""
+Sampling profiler for a running server.
+
+SamplingProfiler is a stdlib-only wall-clock sampler: a daemon thread reads sys._current_frames()
+every `interval` seconds and counts each thread's stack. Output is the collapsed-stack format
+(`frame;frame;frame count` per line) read by flamegraph.pl, speedscope and inferno, or a small
+self-contained HTML call tree.
+
+Two ways in:
+  - a profiling session over the whole process, started by POST /api/_profile (X-Admin-Token) or by
+    Config.PROFILE_SIGNAL (SIGPROF by default; see install_signal_toggle), which stops after N seconds
+    or N requests and writes <PROFILE_DIR>/profile-<time>.collapsed;
+  - ?profile=1 on any request (only when PROFILE_REQUESTS is on, e.g. locally), which samples the
+    request's thread and returns the HTML profile instead of the normal response.
+"""
+import html
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _frame_label(code) -> str:
+    # Repo- or site-packages-relative paths keep stacks readable
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Count stacks of the given threads (default: all but the sampler) every `interval` seconds."""
+
+    def __init__(self, interval: float = 0.005, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[object, str] = {}
+
+    def start(self) -> 'SamplingProfiler':
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one `a;b;c count` line each."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write_collapsed(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.collapsed())
+        return path
+
+    def html(self, title: str = 'Profile', min_percent: float = 0.5) -> str:
+        """Self-contained HTML call tree (nested <details>, inclusive % of samples)."""
+        tree: Dict = {}
+        total = sum(self.stacks.values())
+        for stack, count in self.stacks.items():
+            node = tree
+            for frame in stack.split(';'):
+                entry = node.setdefault(frame, [0, {}])
+                entry[0] += count
+                node = entry[1]
+
+        def render(children: Dict) -> str:
+            parts = []
+            for frame, (count, sub) in sorted(children.items(), key=lambda kv: -kv[1][0]):
+                percent = 100.0 * count / total
+                if percent < min_percent:
+                    continue
+                label = (f'<span class="pct">{percent:5.1f}%</span> '
+                         f'<span class="ms">{count * self.interval * 1000:.0f} ms</span> {html.escape(frame)}')
+                inner = render(sub)
+                if inner:
+                    parts.append(f'<details{" open" if percent >= 10 else ""}><summary>{label}</summary>{inner}</details>')
+                else:
+                    parts.append(f'<div class="leaf">{label}</div>')
+            return ''.join(parts)
+
+        body = render(tree) if total else '<p>No samples (the call finished faster than one sampling interval).</p>'
+        return (
+            '<!doctype html><html><head><meta charset="utf-8"><title>' + html.escape(title) + '</title><style>'
+            'body{font:13px monospace;margin:1em} details,.leaf{margin-left:1.2em} summary{cursor:pointer}'
+            '.pct{color:#b00;display:inline-block;width:4.5em}.ms{color:#666;display:inline-block;width:6em}'
+            '</style></head><body>'
+            f'<h3>{html.escape(title)}</h3><p>{self.elapsed * 1000:.1f} ms wall, {total} samples '
+            f'every {self.interval * 1000:.1f} ms (frames under {min_percent}% hidden)</p>'
+            + body + '</body></html>'
+        )
+
+
+class ProfilingSession:
+    """One process-wide profiling run that ends after `seconds` or `max_requests`, whichever comes first."""
+
+    def __init__(self, seconds: Optional[float], max_requests: Optional[int], out_dir: str, interval: float):
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.out_dir = out_dir
+        self.requests = 0
+        self.output: Optional[str] = None
+        self.profiler = SamplingProfiler(interval=interval)
+        self._timer: Optional[threading.Timer] = None
+
+    def start(self) -> None:
+        self.profiler.start()
+        if self.seconds:
+            self._timer = threading.Timer(self.seconds, stop_session)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def finish(self) -> str:
+        if self._timer is not None:
+            self._timer.cancel()
+        self.profiler.stop()
+        name = time.strftime('profile-%Y%m%d-%H%M%S.collapsed')
+        self.output = str(self.profiler.write_collapsed(Path(self.out_dir) / name))
+        return self.output
+
+    def status(self) -> Dict:
+        return {
+            'running': self.profiler.running,
+            'seconds': self.seconds,
+            'max_requests': self.max_requests,
+            'requests': self.requests,
+            'samples': self.profiler.samples,
+            'elapsed': round(time.perf_counter() - self.profiler.started if self.profiler.running
+                             else self.profiler.elapsed, 3),
+            'output': self.output,
+        }
+
+
+_session: Optional[ProfilingSession] = None
+_last_status: Optional[Dict] = None
+_lock = threading.Lock()
+
+
+def start_session(seconds: Optional[float] = None, max_requests: Optional[int] = None,
+                  out_dir: Optional[str] = None, interval: Optional[float] = None) -> Dict:
+    """Start profiling the whole process; raises RuntimeError if a session is already running."""
+    global _session
+    if not seconds and not max_requests:
+        seconds = Config.PROFILE_DEFAULT_SECONDS
+    with _lock:
+        if _session is not None:
+            raise RuntimeError('A profiling session is already running')
+        _session = ProfilingSession(seconds, max_requests, out_dir or Config.PROFILE_DIR,
+                                    interval or Config.PROFILE_INTERVAL)
+        _session.start()
+        return _session.status()
+
+
+def stop_session() -> Optional[Dict]:
+    """Stop the running session (if any), write its collapsed stacks and return its status."""
+    global _session, _last_status
+    with _lock:
+        session, _session = _session, None
+    if session is None:
+        return None
+    session.finish()
+    _last_status = session.status()
+    logger.info("Profile written to %s (%d samples, %d requests)", session.output, session.profiler.samples, session.requests)
+    return _last_status
+
+
+def session_status() -> Optional[Dict]:
+    """Status of the running session, else of the last finished one (None if there never was one)."""
+    session = _session
+    return session.status() if session is not None else _last_status
+
+
+def _count_request() -> None:
+    session = _session
+    if session is None or not session.max_requests:
+        return
+    with _lock:
+        session.requests += 1
+        done = session.requests >= session.max_requests
+    if done:
+        # Write the file off the request thread
+        threading.Thread(target=stop_session, daemon=True).start()
+
+
+def toggle_session() -> Optional[Dict]:
+    """Stop the running session, or start one with the default duration. Returns its status."""
+    if _session is not None:
+        return stop_session()
+    try:
+        return start_session()
+    except RuntimeError:
+        return session_status()
+
+
+_signal_event = threading.Event()
+_signal_watcher: Optional[threading.Thread] = None
+
+
+def _toggle_on_signal(signum, frame) -> None:
+    # Runs on the main thread between bytecodes, possibly while it holds _lock: only wake the watcher
+    _signal_event.set()
+
+
+def _watch_signal() -> None:
+    while True:
+        _signal_event.wait()
+        _signal_event.clear()
+        toggle_session()
+
+
+def profile_signal() -> Optional[int]:
+    """Signal number named by Config.PROFILE_SIGNAL (e.g. 'SIGPROF'), or None when unset/unknown."""
+    name = (Config.PROFILE_SIGNAL or '').strip().upper()
+    if not name:
+        return None
+    return getattr(signal, name if name.startswith('SIG') else 'SIG' + name, None)
+
+
+def install_signal_toggle() -> Optional[int]:
+    """
+    Toggle a profiling session when this process receives Config.PROFILE_SIGNAL. Call it in each
+    process that serves requests, from its main thread: app.py's __main__ block, gunicorn's
+    post_worker_init. Not done at import, because the gunicorn master (where a preloaded app is
+    imported) owns its signals and resets several of them in workers. Returns the signal or None.
+    """
+    global _signal_watcher
+    signum = profile_signal()
+    if signum is None:
+        return None
+    if _signal_watcher is None or not _signal_watcher.is_alive():
+        _signal_watcher = threading.Thread(target=_watch_signal, name='profile-signal', daemon=True)
+        _signal_watcher.start()
+    signal.signal(signum, _toggle_on_signal)
+    return signum
+
+
+def init_profiling(app) -> None:
+    """Request hooks for ?profile=1 and session request counting."""
+    from flask import request
+
+    per_request = app.config.get('PROFILE_REQUESTS', False)
+
+    @app.before_request
+    def _start_request_profile():
+        if per_request and request.args.get('profile') == '1':
+            request.environ['app.profiler'] = SamplingProfiler(
+                interval=0.001, thread_ids=[threading.get_ident()]).start()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        if request.endpoint != 'api.profile_session':
+            _count_request()
+        profiler = request.environ.pop('app.profiler', None)
+        if profiler is None:
+            return response
+        profiler.stop()
+        return app.response_class(profiler.html(f"{request.method} {request.full_path.rstrip('?')}"),
+                                  mimetype='text/html')
@@ -1,10 +1,10 @@
 """API routes for the application."""
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from sqlalchemy.orm import Session, load_only
-from sqlalchemy import or_, text
+from sqlalchemy import text
 from typing import List, Dict, Optional
 from backend.database import get_db
-from backend.models import CensusData, SchoolData, School, AttendanceZone
+from backend.models import CensusData, SchoolData, School
 
 # Columns that exist in census_data table (no city until added in Supabase)
 _CENSUS_LOAD_COLUMNS = (
@@ -14,19 +14,19 @@ _CENSUS_LOAD_COLUMNS = (
 )
 # Explicit column list for raw SQL (includes school counts and ratings)
 _CENSUS_SQL_COLS = "id, zip_code, county, population, median_age, average_household_income, local_employment_rating, data_year, created_at, updated_at, total_schools, elementary_schools, middle_schools, high_schools, average_school_rating, average_elementary_school_rating, average_middle_school_rating, average_high_school_rating"
-from backend.census_api import CensusAPIClient
-from backend.zone_utils import (
-    point_in_polygon,
-    find_zoned_schools,
-    find_all_zoned_schools,
-    load_zip_polygon,
-    zones_intersecting_zip,
-    zones_intersecting_zip_diagnostic,
-    group_zones_by_district,
-    district_geometry_in_zip,
-    zone_geometry_in_zip,
+from backend.zip_centroids import lookup_centroids
+from backend.geocoding import GeocodingError, get_geocoder
+from backend.instrumentation import registry as metrics_registry
+from backend.json_provider import geojson_raw
+from backend.http_caching import data_version_etag, send_precompressed
+from backend.profiling import session_status, start_session, stop_session
+from backend.boundary_store import (
+    get_boundary_store,
+    normalize_zip5,
+    simplify_feature_collection,
+    to_feature_collection,
+    tolerance_for_zoom,
 )
-from backend.greatschools_client import GreatSchoolsClient
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
@@ -58,6 +58,12 @@ def get_census_data():
         min_blended_school_rating = request.args.get('min_blended_school_rating', type=float)
         limit = request.args.get('limit', type=int, default=1000)
         offset = request.args.get('offset', type=int, default=0)
+        # centroids=1 adds latitude/longitude per zip so the map needs no geocoding
+        include_centroids = request.args.get('centroids', '').lower() in ('1', 'true', 'yes')
+        # rows (array of objects, default), columnar ({column: [values]}) or arrow (Arrow IPC stream)
+        response_format = request.args.get('format', 'rows').lower()
+        if response_format not in ('rows', 'columnar', 'arrow'):
+            return jsonify({'error': 'format must be rows, columnar or arrow', 'data': []}), 400
 
         # Build WHERE and params (state filter uses census_data.state when column exists)
         use_state_filter = state and str(state).strip()
@@ -121,17 +127,32 @@ def get_census_data():
         params["off"] = offset
         rows = db.execute(data_sql, params).fetchall()
 
-        # Build response dicts (same shape as to_dict)
-        data = []
-        for row in rows:
-            d = dict(zip(keys, row))
-            if d.get("local_employment_rating") is not None:
-                d["local_employment_rating"] = float(d["local_employment_rating"])
-            if d.get("created_at"):
-                d["created_at"] = d["created_at"].isoformat() if hasattr(d["created_at"], "isoformat") else str(d["created_at"])
-            if d.get("updated_at"):
-                d["updated_at"] = d["updated_at"].isoformat() if hasattr(d["updated_at"], "isoformat") else str(d["updated_at"]) if d["updated_at"] else None
-            data.append(d)
+        if response_format != 'rows':
+            # Struct-of-arrays straight from the cursor rows: no per-row dicts
+            columns = dict(zip(keys, map(list, zip(*rows)))) if rows else {k: [] for k in keys}
+            if include_centroids:
+                centroids = lookup_centroids(db, columns["zip_code"])
+                lat_lngs = [centroids.get(str(z)[:5], (None, None)) for z in columns["zip_code"]]
+                columns["latitude"] = [p[0] for p in lat_lngs]
+                columns["longitude"] = [p[1] for p in lat_lngs]
+            if response_format == 'arrow':
+                return _arrow_response(columns, {"total": total, "limit": limit, "offset": offset})
+            return jsonify({
+                "columns": list(columns),
+                "data": columns,
+                "total": total,
+                "limit": limit,
+                "offset": offset,
+            })
+
+        # Response dicts (same shape as to_dict); the JSON provider encodes datetimes as ISO and Decimals as floats
+        data = [dict(zip(keys, row)) for row in rows]
+
+        if include_centroids:
+            centroids = lookup_centroids(db, [d["zip_code"] for d in data])
+            for d in data:
+                lat_lng = centroids.get(str(d["zip_code"])[:5])
+                d["latitude"], d["longitude"] = lat_lng if lat_lng else (None, None)
 
         return jsonify({
             "data": data,
@@ -142,6 +163,19 @@ def get_census_data():
     except Exception as e:
         return jsonify({"error": str(e), "data": []}), 500
 
+def _arrow_response(columns: Dict[str, list], metadata: Dict):
+    """Columns as an Arrow IPC stream; metadata goes into the schema metadata and X-Total-Count."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return jsonify({'error': 'format=arrow requires pyarrow (pip install pyarrow)', 'data': []}), 501
+    table = pa.table(columns).replace_schema_metadata({k: str(v) for k, v in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), mimetype='application/vnd.apache.arrow.stream',
+                    headers={'X-Total-Count': str(metadata.get('total', ''))})
+
 @api.route('/census-data/zip/<zip_code>', methods=['GET'])
 def get_census_data_by_zip(zip_code: str):
     """Get census data for a specific zip code. Fetches from Census API if not in database."""
@@ -153,6 +187,7 @@ def get_census_data_by_zip(zip_code: str):
         # Try to fetch from Census API
         print(f"[INFO] Zip code {zip_code} not in database, fetching from Census API...")
         try:
+            from backend.census_api import CensusAPIClient
             client = CensusAPIClient()
             census_data_list = client.fetch_zip_code_data([zip_code])
             
@@ -185,38 +220,26 @@ def get_census_data_by_zip(zip_code: str):
 def geocode_zip(zip_code: str):
     """Backend geocoding endpoint for zip codes."""
     try:
-        import requests
-        from config.config import Config
-        
-        # Use Google Geocoding API via backend
-        # This helps if frontend API key has restrictions
-        geocode_url = 'https://maps.googleapis.com/maps/api/geocode/json'
-        params = {
-            'address': zip_code,
-            'key': Config.GOOGLE_MAPS_API_KEY,
-            'components': 'country:US'
-        }
-        
-        response = requests.get(geocode_url, params=params, timeout=10)
-        data = response.json()
+        # Geocoded via backend (cached): this helps if frontend API key has restrictions
+        try:
+            result = get_geocoder().geocode(zip_code)
+        except GeocodingError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if data['status'] == 'OK' and data['results']:
-            result = data['results'][0]
-            geometry = result['geometry']
-            
+        if result:
             return jsonify({
                 'success': True,
                 'location': {
-                    'lat': geometry['location']['lat'],
-                    'lng': geometry['location']['lng']
+                    'lat': result['lat'],
+                    'lng': result['lng']
                 },
-                'bounds': geometry.get('bounds'),
-                'viewport': geometry.get('viewport')
+                'bounds': result.get('bounds'),
+                'viewport': result.get('viewport')
             })
         else:
             return jsonify({
                 'success': False,
-                'error': data.get('error_message', data.get('status', 'Unknown error'))
+                'error': 'ZERO_RESULTS'
             }), 400
             
     except Exception as e:
@@ -225,229 +248,266 @@ def geocode_zip(zip_code: str):
             'error': str(e)
         }), 500
 
+def _geocode_address(address: str):
+    """(geocode result, None) or (None, 400 response) for the address-based school and report routes."""
+    try:
+        location = get_geocoder().geocode(address)
+    except GeocodingError as e:
+        return None, (jsonify({'error': 'Could not geocode address', 'details': str(e)}), 400)
+    if location is None:
+        return None, (jsonify({'error': 'Could not geocode address', 'details': 'ZERO_RESULTS'}), 400)
+    return location, None
+
+@api.route('/_metrics', methods=['GET'])
+def get_metrics():
+    """Request, DB and outbound HTTP aggregates per endpoint in Prometheus text format."""
+    return Response(metrics_registry.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api.route('/_profile', methods=['GET', 'POST', 'DELETE'])
+def profile_session():
+    """
+    Admin-only sampling profiler over the whole process (X-Admin-Token: ADMIN_TOKEN).
+    POST {"seconds": 30} or {"requests": 200} starts it, GET reports status, DELETE stops it early.
+    The collapsed stacks are written under PROFILE_DIR for flamegraph.pl / speedscope.
+    """
+    from config.config import Config
+    import hmac
+    token = request.headers.get('X-Admin-Token', '')
+    if not Config.ADMIN_TOKEN or not hmac.compare_digest(token, Config.ADMIN_TOKEN):
+        return jsonify({'error': 'Forbidden'}), 403
+    if request.method == 'GET':
+        return jsonify({'session': session_status()})
+    if request.method == 'DELETE':
+        status = stop_session()
+        if status is None:
+            return jsonify({'error': 'No profiling session is running'}), 409
+        return jsonify({'session': status})
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data['seconds']) if data.get('seconds') else None
+        max_requests = int(data['requests']) if data.get('requests') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seconds and requests must be numbers'}), 400
+    try:
+        status = start_session(seconds=seconds, max_requests=max_requests)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'session': status}), 201
+
+@api.route('/_health', methods=['GET'])
+def health():
+    """Liveness: the process is serving requests."""
+    return jsonify({'status': 'ok'})
+
+@api.route('/_ready', methods=['GET'])
+def readiness():
+    """Readiness: 200 once the shared indexes (zone index, zip reference) are warm, else 503."""
+    from backend.warmup import index_status
+    status = index_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@api.route('/zip-centroids', methods=['GET', 'POST'])
+def get_zip_centroids():
+    """
+    Bulk zip centroids without geocoding. GET ?zips=28202,28203 or POST {"zips": [...]}.
+    Returns {"centroids": {zip: {"lat", "lng"}}, "missing": [...]}.
+    """
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    zips = params.get('zips') or []
+    if isinstance(zips, str):
+        zips = zips.split(',')
+    zips = [z for z in dict.fromkeys(normalize_zip5(z) for z in zips) if z]
+    if not zips:
+        return jsonify({'error': 'Provide zips'}), 400
+    try:
+        db: Session = next(get_db())
+    except Exception:
+        db = None  # offline sources still answer
+    centroids = lookup_centroids(db, zips)
+    return jsonify({
+        'centroids': {z: {'lat': lat, 'lng': lng} for z, (lat, lng) in centroids.items()},
+        'missing': [z for z in zips if z not in centroids],
+    })
+
+def _boundary_tolerance(params=None) -> Optional[float]:
+    """Simplification tolerance (degrees) from tolerance= or zoom= (one screen pixel at that zoom); None = full resolution."""
+    params = request.args if params is None else params
+
+    def _num(key):
+        try:
+            return float(params.get(key)) if params.get(key) not in (None, '') else None
+        except (TypeError, ValueError):
+            return None
+
+    tolerance = _num('tolerance')
+    if tolerance is not None:
+        return max(0.0, tolerance) or None
+    zoom = _num('zoom')
+    if zoom is not None:
+        return tolerance_for_zoom(zoom)
+    return None
+
+# Most zips one bulk boundary request returns (a whole-country bbox at low zoom is ~33k)
+MAX_BULK_BOUNDARY_ZIPS = 5000
+
+def _local_boundary_features(zip_code: str, tolerance: Optional[float]) -> Optional[bytes]:
+    """Features of a per-zip boundary file (no packed store), tagged with zip_code. None if missing."""
+    import json
+    from pathlib import Path
+    path = Path('data/zip_boundaries') / f"{zip_code}.geojson"
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r') as f:
+            fc = to_feature_collection(json.load(f), zip_code)
+    except Exception:
+        return None
+    if not fc:
+        return None
+    if tolerance:
+        fc = simplify_feature_collection(fc, tolerance)
+    return b','.join(
+        json.dumps({'type': 'Feature', 'geometry': feat.get('geometry'),
+                    'properties': {**(feat.get('properties') or {}), 'zip_code': zip_code}},
+                   separators=(',', ':')).encode('utf-8')
+        for feat in fc['features']
+    )
+
+@api.route('/zip-boundaries', methods=['GET', 'POST'])
+def get_zip_boundaries():
+    """
+    Boundaries for many zips in one streamed response (local data only; no remote fallbacks).
+    POST JSON: {"zips": [...], "zoom"|"tolerance": ..., "format": "geojson"|"ndjson"}
+    GET: ?zips=28202,28203 or ?bbox=west,south,east,north (needs the packed store), plus zoom/tolerance/format.
+    format=geojson (default) streams one FeatureCollection; format=ndjson streams one Feature per line so
+    the client can draw as lines arrive. Every feature has properties.zip_code.
+    Header X-Missing-Zips lists requested zips with no local boundary; X-Truncated is set when capped.
+    """
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    tolerance = _boundary_tolerance(params)
+    fmt = (params.get('format') or 'geojson').lower()
+    if fmt not in ('geojson', 'ndjson'):
+        return jsonify({'error': "format must be 'geojson' or 'ndjson'"}), 400
+    store = get_boundary_store()
+
+    zips = params.get('zips') or []
+    if isinstance(zips, str):
+        zips = zips.split(',')
+    bbox = params.get('bbox')
+    if bbox:
+        try:
+            west, south, east, north = (float(v) for v in (bbox.split(',') if isinstance(bbox, str) else bbox))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'bbox must be west,south,east,north'}), 400
+        if store is None:
+            return jsonify({'error': 'bbox queries need the packed boundary store (run scripts/pack_zip_boundaries.py)'}), 503
+        zips = list(zips) + store.zips_in_bbox(west, south, east, north)
+    if not zips:
+        return jsonify({'error': 'Provide zips or bbox'}), 400
+
+    seen = set()
+    wanted = []
+    for z in zips:
+        key = normalize_zip5(z)
+        if key and key not in seen:
+            seen.add(key)
+            wanted.append(key)
+    truncated = len(wanted) > MAX_BULK_BOUNDARY_ZIPS
+    wanted = wanted[:MAX_BULK_BOUNDARY_ZIPS]
+
+    lod = store.lod_for_tolerance(tolerance) if store is not None else 0
+    if store is not None:
+        missing = [z for z in wanted if z not in store]
+    else:
+        from pathlib import Path
+        missing = [z for z in wanted if not (Path('data/zip_boundaries') / f"{z}.geojson").exists()]
+    missing_set = set(missing)
+
+    def generate():
+        sep = b'\n' if fmt == 'ndjson' else b','
+        if fmt == 'geojson':
+            yield b'{"type":"FeatureCollection","features":['
+        first = True
+        for z in wanted:
+            if z in missing_set:
+                continue
+            if store is not None:
+                features = store.feature_bytes(z, lod=lod)
+            else:
+                features = _local_boundary_features(z, tolerance)
+            if not features:
+                continue
+            if fmt == 'ndjson':
+                # Records hold comma-joined features; NDJSON needs one per line
+                if bytes(features).count(b'{"type":"Feature",') > 1:
+                    import json
+                    for feat in json.loads(b'[' + bytes(features) + b']'):
+                        yield json.dumps(feat, separators=(',', ':')).encode('utf-8') + sep
+                else:
+                    yield features
+                    yield sep
+                continue
+            if not first:
+                yield sep
+            yield features
+            first = False
+        if fmt == 'geojson':
+            yield b']}'
+
+    headers = {'X-Missing-Zips': ','.join(missing[:500])}
+    if truncated:
+        headers['X-Truncated'] = '1'
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/geo+json'
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
 @api.route('/zip-boundary/<zip_code>', methods=['GET'])
 def get_zip_boundary(zip_code: str):
-    """Get GeoJSON boundary polygon for a zip code."""
+    """Get GeoJSON boundary polygon for a zip code. Optional ?zoom= or ?tolerance= returns a simplified level of detail."""
     try:
-        import requests
         import json
         from pathlib import Path
         
-        # FIRST: Check if we have a locally stored boundary (fastest, most reliable)
+        tolerance = _boundary_tolerance()
+        
+        # FIRST: Packed boundary store (one mmap'd file; bytes are served as stored, no re-encode)
+        store = get_boundary_store()
+        if store is not None:
+            lod = store.lod_for_tolerance(tolerance)
+            data = store.geojson_bytes(zip_code, lod=lod)
+            if data is not None:
+                response = Response([data], mimetype='application/json', direct_passthrough=True,
+                                    headers={'Content-Length': str(len(data))})
+                response.set_etag(data_version_etag(store.path, store.mtime, normalize_zip5(zip_code), lod))
+                return response
+        
+        # Then: per-zip boundary file (legacy layout / write-through cache of remote sources)
         try:
             boundary_file = Path('data/zip_boundaries') / f"{zip_code}.geojson"
             if boundary_file.exists():
+                if not tolerance:
+                    # As stored, or its precompressed .gz/.br sibling
+                    return send_precompressed(boundary_file)
                 with open(boundary_file, 'r') as f:
                     data = json.load(f)
+                    if data.get('type') == 'FeatureCollection':
+                        data = simplify_feature_collection(data, tolerance)
                     return jsonify(data)
         except Exception as e:
             print(f"Local boundary file check failed: {e}")
         
-        # Try multiple sources for zip code boundaries
-        # Source 1: OpenDataSoft API (most reliable)
-        try:
-            ods_url = "https://public.opendatasoft.com/api/explore/v2.1/catalog/datasets/us-zip-code-labels-and-boundaries/records"
-            # Try with ZCTA5CE10 field (Census format)
-            params = {
-                'where': f'zcta5ce10="{zip_code}"',
-                'limit': 1,
-                'select': 'zcta5ce10,geo_shape'
-            }
-            response = requests.get(ods_url, params=params, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if 'results' in data and len(data['results']) > 0:
-                    record = data['results'][0]
-                    if 'record' in record and 'fields' in record['record']:
-                        fields = record['record']['fields']
-                        if 'geo_shape' in fields:
-                            geometry = fields['geo_shape']
-                            geojson = {
-                                'type': 'FeatureCollection',
-                                'features': [{
-                                    'type': 'Feature',
-                                    'geometry': geometry,
-                                    'properties': {'ZCTA5CE10': zip_code}
-                                }]
-                            }
-                            try:
-                                boundary_dir = Path('data/zip_boundaries')
-                                boundary_dir.mkdir(parents=True, exist_ok=True)
-                                boundary_file = boundary_dir / f"{zip_code}.geojson"
-                                with open(boundary_file, 'w') as f:
-                                    json.dump(geojson, f)
-                            except Exception:
-                                pass
-                            return jsonify(geojson)
-            
-            # Try with zip_code field
-            params2 = {
-                'where': f'zip_code="{zip_code}"',
-                'limit': 1,
-                'select': 'zip_code,geo_shape'
-            }
-            response2 = requests.get(ods_url, params=params2, timeout=15)
-            if response2.status_code == 200:
-                data2 = response2.json()
-                if 'results' in data2 and len(data2['results']) > 0:
-                    record = data2['results'][0]
-                    if 'record' in record and 'fields' in record['record']:
-                        fields = record['record']['fields']
-                        if 'geo_shape' in fields:
-                            geometry = fields['geo_shape']
-                            geojson = {
-                                'type': 'FeatureCollection',
-                                'features': [{
-                                    'type': 'Feature',
-                                    'geometry': geometry,
-                                    'properties': {'ZCTA5CE10': zip_code}
-                                }]
-                            }
-                            try:
-                                boundary_dir = Path('data/zip_boundaries')
-                                boundary_dir.mkdir(parents=True, exist_ok=True)
-                                boundary_file = boundary_dir / f"{zip_code}.geojson"
-                                with open(boundary_file, 'w') as f:
-                                    json.dump(geojson, f)
-                            except Exception:
-                                pass
-                            return jsonify(geojson)
-        except Exception as e:
-            print(f"OpenDataSoft failed: {e}")
-        
-        # Source 2: Try boundaries.io API (FREE tier available)
-        try:
-            from config.config import Config
-            boundaries_api_key = getattr(Config, 'BOUNDARIES_IO_API_KEY', None)
-            
-            if boundaries_api_key:
-                # Use Boundaries.io API (requires free API key)
-                boundaries_url = f"https://boundaries.io/api/v1/boundary"
-                params = {
-                    'zipcode': zip_code,
-                    'api_key': boundaries_api_key,
-                    'format': 'geojson'
-                }
-                response = requests.get(boundaries_url, params=params, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    # Save locally for future use
-                    try:
-                        boundary_dir = Path('data/zip_boundaries')
-                        boundary_dir.mkdir(parents=True, exist_ok=True)
-                        boundary_file = boundary_dir / f"{zip_code}.geojson"
-                        with open(boundary_file, 'w') as f:
-                            json.dump(data, f)
-                    except:
-                        pass
-                    return jsonify(data)
-            else:
-                # Try free endpoint (may have rate limits)
-                boundaries_url = f"https://boundaries-io.herokuapp.com/zip/{zip_code}"
-                response = requests.get(boundaries_url, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'boundaries' in data or 'geometry' in data:
-                        return jsonify(data)
-        except Exception as e:
-            print(f"Boundaries.io failed: {e}")
-        
-        # Source 3: Try GitHub repository (state-based)
-        try:
-            # Try different GitHub sources
-            github_sources = [
-                f"https://raw.githubusercontent.com/OpenDataDE/State-zip-code-GeoJSON/master/{zip_code[0]}/{zip_code}_polygon.geojson",
-                f"https://raw.githubusercontent.com/OpenDataDE/State-zip-code-GeoJSON/master/zcta5/{zip_code}_polygon.geojson",
-            ]
-            
-            for github_url in github_sources:
-                response = requests.get(github_url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'type' in data and (data['type'] == 'FeatureCollection' or data['type'] == 'Feature'):
-                        if data['type'] == 'Feature':
-                            # Wrap single feature in FeatureCollection
-                            return jsonify({
-                                'type': 'FeatureCollection',
-                                'features': [data]
-                            })
-                        return jsonify(data)
-        except Exception as e:
-            print(f"GitHub source failed: {e}")
-        
-        # Source 4: Try using Census TIGERweb (ZCTA layer is 2, not 82!)
-        try:
-            feature_url = "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_Current/MapServer/2/query"
-            
-            # Use objectIds approach - first find the object ID
-            # Then query by object ID
-            params_list = [
-                {'where': f"ZCTA5='{zip_code}'", 'outFields': '*', 'f': 'geojson', 'outSR': '4326', 'returnGeometry': 'true'},
-                {'where': f"ZCTA5 = '{zip_code}'", 'outFields': '*', 'f': 'geojson', 'outSR': '4326', 'returnGeometry': 'true'},
-                {'where': f"ZCTA5CE10='{zip_code}'", 'outFields': '*', 'f': 'geojson', 'outSR': '4326', 'returnGeometry': 'true'},
-            ]
-            
-            for params in params_list:
-                try:
-                    response = requests.get(feature_url, params=params, timeout=25)
-                    if response.status_code == 200:
-                        data = response.json()
-                        # Check for actual features, not errors
-                        if 'features' in data and isinstance(data['features'], list) and len(data['features']) > 0:
-                            # Validate it's actually a polygon
-                            feature = data['features'][0]
-                            if 'geometry' in feature and feature['geometry'].get('type') in ['Polygon', 'MultiPolygon']:
-                                # Save locally for future use
-                                try:
-                                    boundary_dir = Path('data/zip_boundaries')
-                                    boundary_dir.mkdir(parents=True, exist_ok=True)
-                                    boundary_file = boundary_dir / f"{zip_code}.geojson"
-                                    with open(boundary_file, 'w') as f:
-                                        json.dump(data, f)
-                                except:
-                                    pass
-                                return jsonify(data)
-                except:
-                    continue
-        except Exception as e:
-            print(f"Census TIGER failed: {e}")
-        
-        # Source 5: Try alternative Census TIGERweb endpoints (all FREE)
-        census_endpoints = [
-            "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_ACS2022/MapServer/2/query",
-            "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_ACS2021/MapServer/2/query",
-        ]
-        
-        for alt_url in census_endpoints:
-            try:
-                params = {
-                    'where': f"ZCTA5='{zip_code}'",
-                    'outFields': '*',
-                    'f': 'geojson',
-                    'outSR': '4326',
-                    'returnGeometry': 'true'
-                }
-                response = requests.get(alt_url, params=params, timeout=20)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'features' in data and len(data['features']) > 0:
-                        try:
-                            boundary_dir = Path('data/zip_boundaries')
-                            boundary_dir.mkdir(parents=True, exist_ok=True)
-                            boundary_file = boundary_dir / f"{zip_code}.geojson"
-                            with open(boundary_file, 'w') as f:
-                                json.dump(data, f)
-                        except Exception:
-                            pass
-                        return jsonify(data)
-            except Exception as e:
-                print(f"Census endpoint {alt_url} failed: {e}")
-                continue
+        # Remote providers, raced under one deadline; misses are cached so repeats answer instantly
+        from backend.boundary_resolver import CACHED_MISS, get_boundary_resolver
+        geojson, source = get_boundary_resolver().resolve(zip_code)
+        if geojson is not None:
+            if tolerance:
+                geojson = simplify_feature_collection(geojson, tolerance)
+            return jsonify(geojson)
         
         # If all sources fail, return 404 (frontend will use approximate boundary)
         return jsonify({
             'error': 'Boundary not found',
-            'message': f'Could not fetch exact boundary for zip code {zip_code}. Using approximate boundary from geocoding.'
+            'message': f'Could not fetch exact boundary for zip code {zip_code}. Using approximate boundary from geocoding.',
+            'cached': source == CACHED_MISS,
         }), 404
         
     except Exception as e:
@@ -456,6 +516,29 @@ def get_zip_boundary(zip_code: str):
             'error': str(e)
         }), 500
 
+@api.route('/tiles/<int:z>/<int:x>/<int:y>.mvt', methods=['GET'])
+def get_census_tile(z: int, x: int, y: int):
+    """Mapbox Vector Tile: layer "zips" with ZCTA polygons and census attributes (cached on disk per data version)."""
+    from backend.vector_tiles import MAX_ZOOM, get_census_tile as load_tile
+    if z < 0 or z > MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'error': 'Tile out of range'}), 404
+    try:
+        db: Session = next(get_db())
+    except Exception as e:
+        return jsonify({'error': f'Database connection failed: {str(e)}'}), 500
+    try:
+        tile = load_tile(db, z, x, y)
+        if tile is None:
+            return jsonify({'error': 'Boundary store not built (run scripts/pack_zip_boundaries.py)'}), 503
+        if not tile:
+            return Response(status=204)
+        return Response(tile, mimetype='application/vnd.mapbox-vector-tile')
+    except Exception as e:
+        print(f"Error building tile {z}/{x}/{y}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
 @api.route('/census-data', methods=['POST'])
 def add_census_data():
     """Add or update census data."""
@@ -533,6 +616,7 @@ def fetch_census_data():
     request_data = request.get_json() or {}
     zip_codes = request_data.get('zip_codes')  # Optional list of zip codes
     
+    from backend.census_api import CensusAPIClient
     client = CensusAPIClient()
     census_data = client.fetch_zip_code_data(zip_codes)
     
@@ -674,8 +758,6 @@ def export_report():
         from flask import Response
         from datetime import datetime
         from io import BytesIO
-        import requests
-        from config.config import Config
         from sqlalchemy import text
         
         # Get parameters
@@ -690,31 +772,15 @@ def export_report():
         
         # If lat/lng not provided, geocode the address
         if lat is None or lng is None:
-            geocode_url = 'https://maps.googleapis.com/maps/api/geocode/json'
-            params = {
-                'address': address,
-                'key': Config.GOOGLE_MAPS_API_KEY,
-                'components': 'country:US'
-            }
-            response = requests.get(geocode_url, params=params, timeout=10)
-            data = response.json()
-            
-            if data['status'] != 'OK' or not data['results']:
-                return jsonify({
-                    'error': 'Could not geocode address',
-                    'details': data.get('error_message', data.get('status', 'Unknown error'))
-                }), 400
-            
-            location = data['results'][0]['geometry']['location']
+            location, error = _geocode_address(address)
+            if error:
+                return error
             lat = location['lat']
             lng = location['lng']
             
             # Extract zip code if not provided
             if not zip_code:
-                for component in data['results'][0]['address_components']:
-                    if 'postal_code' in component['types']:
-                        zip_code = component['long_name']
-                        break
+                zip_code = location.get('zip_code')
         
         db: Session = next(get_db())
         
@@ -1093,8 +1159,6 @@ def export_report():
 def get_schools_by_address():
     """Get school ratings for an address. Uses nearest schools in school_data within ~5 miles (no Apify)."""
     try:
-        import requests
-        from config.config import Config
         from sqlalchemy import text
 
         address = request.args.get('address')
@@ -1106,20 +1170,9 @@ def get_schools_by_address():
 
         # Geocode if lat/lng not provided
         if lat is None or lng is None:
-            geocode_url = 'https://maps.googleapis.com/maps/api/geocode/json'
-            params = {
-                'address': address,
-                'key': Config.GOOGLE_MAPS_API_KEY,
-                'components': 'country:US'
-            }
-            response = requests.get(geocode_url, params=params, timeout=10)
-            data = response.json()
-            if data['status'] != 'OK' or not data['results']:
-                return jsonify({
-                    'error': 'Could not geocode address',
-                    'details': data.get('error_message', data.get('status', 'Unknown error'))
-                }), 400
-            location = data['results'][0]['geometry']['location']
+            location, error = _geocode_address(address)
+            if error:
+                return error
             lat = location['lat']
             lng = location['lng']
 
@@ -1236,9 +1289,8 @@ def get_all_zoned_schools_for_address():
     Use for dropdown/export: list every school the address is zoned for (NC/SC only).
     """
     try:
-        import requests
-        from config.config import Config
-
+        from backend.zone_index import get_zone_index
+        from backend.zone_utils import find_all_zoned_schools
         address = request.args.get('address')
         lat = request.args.get('lat', type=float)
         lng = request.args.get('lng', type=float)
@@ -1246,20 +1298,14 @@ def get_all_zoned_schools_for_address():
         if lat is None or lng is None:
             if not address:
                 return jsonify({'error': 'Provide address= or lat= and lng='}), 400
-            geocode_url = 'https://maps.googleapis.com/maps/api/geocode/json'
-            params = {'address': address, 'key': Config.GOOGLE_MAPS_API_KEY, 'components': 'country:US'}
-            response = requests.get(geocode_url, params=params, timeout=10)
-            data = response.json()
-            if data.get('status') != 'OK' or not data.get('results'):
-                return jsonify({'error': 'Could not geocode address'}), 400
-            loc = data['results'][0]['geometry']['location']
+            loc, error = _geocode_address(address)
+            if error:
+                return error
             lat, lng = loc['lat'], loc['lng']
 
         db: Session = next(get_db())
-        zones = db.query(AttendanceZone).filter(
-            or_(AttendanceZone.state == 'NC', AttendanceZone.state == 'SC')
-        ).all()
-        if not zones:
+        index = get_zone_index(db)
+        if not index.zones:
             return jsonify({
                 'address': address,
                 'latitude': lat,
@@ -1268,8 +1314,8 @@ def get_all_zoned_schools_for_address():
                 'message': 'No NCES attendance zones loaded (NC/SC only).'
             })
 
-        zones_list = [z.to_dict() for z in zones]
-        by_level = find_all_zoned_schools(lat, lng, zones_list)
+        from shapely.geometry import Point
+        by_level = find_all_zoned_schools(lat, lng, index.candidates(Point(lng, lat)))
 
         def to_summary(zone_list):
             return [{'school_name': z.get('school_name'), 'school_level': z.get('school_level'),
@@ -1368,6 +1414,13 @@ def get_school_zones_by_zip(zip_code: str):
     NC/SC only (attendance zones). Requires zip boundary in data/zip_boundaries/{zip}.geojson.
     """
     try:
+        from backend.zone_index import get_zone_index
+        from backend.zone_utils import (
+            district_shape_in_zip,
+            group_zones_by_district,
+            load_zip_polygon,
+            zones_intersecting_zip_diagnostic,
+        )
         zip_polygon = load_zip_polygon(zip_code)
         if zip_polygon is None:
             return jsonify({
@@ -1376,10 +1429,8 @@ def get_school_zones_by_zip(zip_code: str):
             }), 404
 
         db: Session = next(get_db())
-        zones = db.query(AttendanceZone).filter(
-            or_(AttendanceZone.state == 'NC', AttendanceZone.state == 'SC')
-        ).all()
-        if not zones:
+        index = get_zone_index(db)
+        if not index.zones:
             return jsonify({
                 'zip_code': zip_code,
                 'district_count': 0,
@@ -1387,8 +1438,9 @@ def get_school_zones_by_zip(zip_code: str):
                 'message': 'No NCES attendance zones loaded (NC/SC only).'
             })
 
-        zones_list = [z.to_dict() for z in zones]
-        intersecting, diag = zones_intersecting_zip_diagnostic(zip_polygon, zones_list)
+        # Only zones whose bbox touches the zip; geometries were converted once when the index was built
+        intersecting, diag = zones_intersecting_zip_diagnostic(zip_polygon, index.candidates(zip_polygon))
+        diag.update(zones_total=len(index.zones), zones_with_geometry=index.with_geometry)
         if not intersecting:
             return jsonify({
                 'zip_code': zip_code,
@@ -1413,9 +1465,10 @@ def get_school_zones_by_zip(zip_code: str):
                 grouped = group_zones_by_district(level_zones)
                 for grp in grouped:
                     district_zones = grp['zones']
-                    geometry = district_geometry_in_zip(zip_polygon, district_zones)
-                    if geometry is None:
+                    shape = district_shape_in_zip(zip_polygon, district_zones)
+                    if shape is None:
                         continue
+                    geometry = geojson_raw(shape)
                     schools = []
                     ratings = []
                     for z in district_zones:
@@ -1467,7 +1520,8 @@ def get_school_zones_by_zip(zip_code: str):
                 if rating is not None:
                     ratings.append(rating)
             avg_rating = sum(ratings) / len(ratings) if ratings else None
-            geometry = district_geometry_in_zip(zip_polygon, district_zones)
+            shape = district_shape_in_zip(zip_polygon, district_zones)
+            geometry = geojson_raw(shape) if shape is not None else None
             color = DISTRICT_COLORS[i % len(DISTRICT_COLORS)]
             districts_out.append({
                 'district_id': district_id,
@@ -0,0 +1,184 @@
+"""
+Ingestion stage for Apify school results -> school_data.
+
+Results from overlapping query boxes are normalized and deduplicated in memory by
+(normalized name, level, rounded lat/lng), folded into one row per building location
+(school_data keeps elementary/middle/high side by side), and written with a single
+INSERT ... ON CONFLICT (location_key) per batch instead of one ORM query per school.
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.models import SchoolData
+
+LEVELS = ('elementary', 'middle', 'high')
+
+# 4 decimal places ~ 36 feet: same coordinates = same school building
+LOCATION_PRECISION = 4
+_LOCATION_QUANTUM = Decimal(1).scaleb(-LOCATION_PRECISION)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_school_name(name: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ('St. Mary's  Elem' -> 'st mary s elem')."""
+    if not name:
+        return ''
+    return _NON_ALNUM.sub(' ', str(name).lower()).strip()
+
+
+def normalize_level(level) -> Optional[str]:
+    """Map Apify level strings ('Elementary', 'middle school', 'HIGH') to 'elementary'/'middle'/'high'."""
+    s = str(level or '').strip().lower()
+    if 'elem' in s or s == 'primary':
+        return 'elementary'
+    if 'mid' in s:
+        return 'middle'
+    if 'high' in s:
+        return 'high'
+    return None
+
+
+def _round_coordinate(value: float) -> str:
+    """
+    Coordinate rounded like Postgres' round(value::numeric, 4) (the location_key migration
+    backfill): float8 -> numeric keeps 15 significant digits, then rounds half away from zero.
+    Python's round() works on the binary float and would give 35.12345 -> 35.1234, not 35.1235.
+    """
+    q = Decimal(f"{float(value):.15g}").quantize(_LOCATION_QUANTUM, rounding=ROUND_HALF_UP)
+    if q.is_zero():
+        q = q.copy_abs()  # numeric has no negative zero
+    return f"{q:f}"
+
+
+def location_key(lat: float, lng: float) -> str:
+    """Unique key for a building location (matches school_data.location_key)."""
+    return f"{_round_coordinate(lat)},{_round_coordinate(lng)}"
+
+
+def _first(school: Dict, keys: Tuple[str, ...]):
+    for k in keys:
+        v = school.get(k)
+        if v not in (None, ''):
+            return v
+    return None
+
+
+def _higher(rating: Optional[float], current: Optional[float]) -> bool:
+    """Rated beats unrated; None never beats anything."""
+    return rating is not None and (current is None or rating > current)
+
+
+def dedupe_results(schools: Iterable[Dict], require_rating: bool = True) -> Tuple[Dict[str, Dict], int]:
+    """
+    Normalize Apify result dicts and dedupe by (normalized name, level, location).
+    Returns ({location_key: row dict}, skipped) where each row dict has latitude/longitude and
+    <level>_school_name/_rating/_address for every level present. When two schools share a
+    location and level, the higher rating wins. Schools without a rating are skipped unless
+    require_rating is False (then they are kept with a NULL rating).
+    """
+    best: Dict[Tuple[str, str, str], Dict] = {}
+    skipped = 0
+    for school in schools:
+        name = _first(school, ('schoolName', 'name', 'title'))
+        rating = _first(school, ('gsRating', 'rating', 'schoolRating'))
+        lat = _first(school, ('latitude', 'lat', 'y'))
+        lng = _first(school, ('longitude', 'lng', 'lon', 'x'))
+        try:
+            lat, lng = float(lat), float(lng)
+            rating = float(rating) if rating is not None or require_rating else None
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        norm = normalize_school_name(name)
+        if not norm:
+            skipped += 1
+            continue
+        levels = school.get('schoolLevels') or school.get('level') or []
+        if isinstance(levels, str):
+            levels = [levels]
+        loc = location_key(lat, lng)
+        for level in {normalize_level(lv) for lv in levels} - {None}:
+            key = (norm, level, loc)
+            current = best.get(key)
+            if current is None or _higher(rating, current['rating']):
+                best[key] = {
+                    'name': str(name).strip(),
+                    'rating': rating,
+                    'address': school.get('address') or None,
+                    'lat': lat,
+                    'lng': lng,
+                }
+
+    rows: Dict[str, Dict] = {}
+    for (_, level, loc), s in best.items():
+        row = rows.setdefault(loc, {'location_key': loc, 'latitude': s['lat'], 'longitude': s['lng']})
+        if f'{level}_school_name' not in row or _higher(s['rating'], row[f'{level}_school_rating']):
+            row[f'{level}_school_name'] = s['name']
+            row[f'{level}_school_rating'] = s['rating']
+            row[f'{level}_school_address'] = s['address']
+    for row in rows.values():
+        for level in LEVELS:
+            row.setdefault(f'{level}_school_name', None)
+            row.setdefault(f'{level}_school_rating', None)
+            row.setdefault(f'{level}_school_address', None)
+        ratings = [row[f'{level}_school_rating'] for level in LEVELS if row[f'{level}_school_rating'] is not None]
+        row['blended_school_score'] = sum(ratings) / len(ratings) if ratings else None
+    return rows, skipped
+
+
+def upsert_school_rows(db: Session, rows: List[Dict], batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Bulk upsert deduped rows into school_data on location_key. For each level the existing value
+    is kept unless the incoming rating is higher (or the slot has no school). Returns (inserted, updated).
+    """
+    table = SchoolData.__table__
+    inserted = updated = 0
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        stmt = pg_insert(table).values(batch)
+        ex = stmt.excluded
+        set_ = {}
+        for level in LEVELS:
+            rating_col = table.c[f'{level}_school_rating']
+            better = ((ex[f'{level}_school_rating'].isnot(None)) & (
+                rating_col.is_(None) | (ex[f'{level}_school_rating'] > rating_col)
+            )) | (table.c[f'{level}_school_name'].is_(None) & ex[f'{level}_school_name'].isnot(None))
+            for field in ('name', 'rating', 'address'):
+                col = f'{level}_school_{field}'
+                set_[col] = case((better, ex[col]), else_=table.c[col])
+        set_['updated_at'] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=['location_key'], set_=set_)
+        # xmax = 0 only for freshly inserted rows
+        result = db.execute(stmt.returning(table.c.id, literal_column('(xmax = 0)').label('inserted')))
+        for _, was_inserted in result:
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+    if rows:
+        _refresh_blended(db, [r['location_key'] for r in rows])
+    return inserted, updated
+
+
+def _refresh_blended(db: Session, keys: List[str]) -> None:
+    """Recompute blended_school_score for upserted rows (average of the non-null level ratings)."""
+    db.execute(text("""
+        UPDATE school_data
+        SET blended_school_score = (
+            SELECT AVG(r) FROM (VALUES (elementary_school_rating), (middle_school_rating), (high_school_rating)) v(r)
+        )
+        WHERE location_key = ANY(:keys)
+    """), {"keys": keys})
+
+
+def ingest_apify_results(db: Session, schools: Iterable[Dict], require_rating: bool = True) -> Dict[str, int]:
+    """Normalize, dedupe and bulk upsert Apify results. Caller commits. Returns counts."""
+    rows, skipped = dedupe_results(schools, require_rating=require_rating)
+    inserted, updated = upsert_school_rows(db, list(rows.values()))
+    return {'locations': len(rows), 'inserted': inserted, 'updated': updated, 'skipped': skipped}
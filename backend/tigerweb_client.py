@@ -0,0 +1,155 @@
+"""Census TIGERweb (ArcGIS REST) client for ZCTA boundaries, with batched queries and a shared rate limit."""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import Config
+
+# ZCTA layer is 2 in every TIGERweb WMS service; newest vintage first
+TIGERWEB_SERVICES = ('tigerWMS_Current', 'tigerWMS_ACS2022', 'tigerWMS_ACS2021')
+ZCTA_LAYER = 2
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_polygon_feature(feature: Dict) -> bool:
+    geom = (feature or {}).get('geometry') or {}
+    return geom.get('type') in ('Polygon', 'MultiPolygon') and bool(geom.get('coordinates'))
+
+
+class TigerwebZctaClient:
+    """
+    Fetch ZCTA polygons from TIGERweb, many zips per request (`ZCTA5 IN (...)`).
+    One keep-alive requests.Session per thread; every request (from any thread) takes a token
+    from the shared limiter. Zips missing from the newest service are retried against older ones.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        services: Iterable[str] = TIGERWEB_SERVICES,
+        limiter: Optional[TokenBucket] = None,
+        timeout: float = 60.0,
+        retries: int = 3,
+        backoff: float = 2.0,
+        pool_size: int = 8,
+    ):
+        self.base_url = (base_url or Config.TIGERWEB_BASE_URL).rstrip('/')
+        self.services = tuple(services)
+        self.limiter = limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def query_url(self, service: str) -> str:
+        return f"{self.base_url}/{service}/MapServer/{ZCTA_LAYER}/query"
+
+    def _query(self, service: str, zips: List[str]) -> Dict:
+        """One ArcGIS query with retries on network errors and 5xx/429. Raises on final failure."""
+        in_list = ','.join(f"'{z}'" for z in zips)
+        params = {
+            'where': f"ZCTA5 IN ({in_list})",
+            'outFields': 'ZCTA5,GEOID',
+            'f': 'geojson',
+            'outSR': '4326',
+            'returnGeometry': 'true',
+        }
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                # POST: long IN lists overflow URL limits
+                response = self._session().post(self.query_url(service), data=params, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.exceptions.HTTPError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                if 'error' in data:
+                    # ArcGIS reports errors in a 200 body
+                    raise requests.exceptions.HTTPError(f"ArcGIS error: {data['error']}")
+                return data
+            except (requests.exceptions.RequestException, ValueError) as e:
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * (2 ** attempt))
+        raise last_error
+
+    def fetch(self, zips: List[str]) -> Dict[str, Dict]:
+        """
+        Boundaries for a batch of zips: {zip: FeatureCollection}. Zips absent from every service are
+        simply not in the result. Raises requests exceptions if a service keeps failing.
+        """
+        found: Dict[str, Dict] = {}
+        remaining = list(dict.fromkeys(zips))
+        for service in self.services:
+            if not remaining:
+                break
+            found.update(self._fetch_from(service, remaining))
+            remaining = [z for z in remaining if z not in found]
+        return found
+
+    def _fetch_from(self, service: str, zips: List[str]) -> Dict[str, Dict]:
+        data = self._query(service, zips)
+        found: Dict[str, Dict] = {}
+        for feature in data.get('features') or []:
+            props = feature.get('properties') or {}
+            zip_code = str(props.get('ZCTA5') or props.get('GEOID') or '')[:5]
+            if zip_code in zips and zip_code not in found and _is_polygon_feature(feature):
+                found[zip_code] = {
+                    'type': 'FeatureCollection',
+                    'features': [{
+                        'type': 'Feature',
+                        'geometry': feature['geometry'],
+                        'properties': {'ZCTA5CE10': zip_code, 'source': service},
+                    }],
+                }
+        # Server capped the page (maxRecordCount): split and ask again for what didn't come back
+        if data.get('exceededTransferLimit') or (data.get('properties') or {}).get('exceededTransferLimit'):
+            rest = [z for z in zips if z not in found]
+            if rest and len(rest) < len(zips):
+                found.update(self._fetch_from(service, rest))
+            elif len(rest) > 1:
+                mid = len(rest) // 2
+                found.update(self._fetch_from(service, rest[:mid]))
+                found.update(self._fetch_from(service, rest[mid:]))
+        return found
@@ -0,0 +1,122 @@
+"""
+Small shared pieces behind the geocode cache and the boundary miss cache.
+
+TTLCache is a SQLite table of key -> text value (may be NULL) with an expiry time, shared by every
+worker process (WAL, busy timeout). Cache errors such as "database is locked" are logged and
+treated as a miss or a skipped write; they never fail the caller.
+
+Coalescer makes concurrent calls for the same key share one call of the underlying function.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class TTLCache:
+    """SQLite table (key column, optional value column, expires_at) with per-entry expiry."""
+
+    def __init__(self, path: str, table: str, key_column: str, value_column: Optional[str] = None,
+                 extra_columns: str = '', busy_timeout: float = 5.0):
+        self.path = path
+        self.table = table
+        self.key_column = key_column
+        self.value_column = value_column
+        self.lock = threading.Lock()
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        columns = [f"{key_column} TEXT PRIMARY KEY"]
+        if value_column:
+            columns.append(f"{value_column} TEXT")
+        columns.append("expires_at REAL NOT NULL")
+        if extra_columns:
+            columns.append(extra_columns)
+        try:
+            if path != ':memory:':
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Cache %s (%s) not initialized: %s", path, table, e)
+
+    def get_values(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """{key: stored value} for unexpired entries; absent keys are not cached (or unreadable)."""
+        keys = list(keys)
+        found: Dict[str, Optional[str]] = {}
+        value = self.value_column or 'NULL'
+        now = time.time()
+        with self.lock:
+            try:
+                for i in range(0, len(keys), 500):  # SQLite parameter limit
+                    chunk = keys[i:i + 500]
+                    found.update(self.conn.execute(
+                        f"SELECT {self.key_column}, {value} FROM {self.table} "
+                        f"WHERE expires_at > ? AND {self.key_column} IN ({','.join('?' * len(chunk))})",
+                        [now, *chunk],
+                    ).fetchall())
+            except sqlite3.Error as e:
+                logger.warning("Cache read from %s failed: %s", self.table, e)
+        return found
+
+    def set_value(self, key: str, value: Optional[str], ttl: float, **extra) -> None:
+        """Insert or replace an entry (extra: values for extra_columns)."""
+        columns = [self.key_column, 'expires_at', *extra]
+        params = [key, time.time() + ttl, *extra.values()]
+        if self.value_column:
+            columns.append(self.value_column)
+            params.append(value)
+        self._write(
+            f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            key, params,
+        )
+
+    def delete(self, key: str) -> None:
+        self._write(f"DELETE FROM {self.table} WHERE {self.key_column} = ?", key, [key])
+
+    def _write(self, sql: str, key: str, params) -> None:
+        with self.lock:
+            try:
+                self.conn.execute(sql, params)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                logger.warning("Cache write to %s failed for %r: %s", self.table, key, e)
+
+
+class Coalescer:
+    """Concurrent coalesce() calls with the same key share one fn() call and its result or exception."""
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def coalesce(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Run fn() unless a call for key is already running, in which case wait for that one (up to
+        timeout seconds; concurrent.futures.TimeoutError after that).
+        """
+        with self._lock:
+            shared = self._inflight.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._inflight[key] = Future()
+        if not owner:
+            return shared.result(timeout=timeout)
+        try:
+            result = fn()
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
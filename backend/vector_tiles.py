@@ -0,0 +1,312 @@
+"""
+Mapbox Vector Tiles (MVT v2) for census choropleths.
+
+Each tile has one layer, "zips": ZCTA polygons from the packed boundary store (at the level of detail
+for the tile's zoom), clipped to the tile and joined with census_data attributes. Tiles are encoded
+here with a small protobuf writer (the format only needs varints, packed ints, strings and doubles),
+and cached on disk under data/tile_cache/<data version>/z/x/y.mvt. The data version changes whenever
+the boundary store is rebuilt or census_data is updated, so stale tiles are never served; their
+directories are deleted once the first tile of the new version is cached.
+"""
+import hashlib
+import math
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from backend.boundary_store import BoundaryStore, get_boundary_store, tolerance_for_zoom
+
+EXTENT = 4096
+BUFFER = 64  # tile units of overlap so polygon edges don't show seams
+LAYER_NAME = 'zips'
+MAX_ZOOM = 16
+
+# census_data columns carried as feature attributes
+TILE_ATTRIBUTES = (
+    'population', 'median_age', 'average_household_income', 'total_schools',
+    'average_school_rating', 'average_elementary_school_rating',
+    'average_middle_school_rating', 'average_high_school_rating',
+)
+
+# Seconds to reuse a computed data version before checking the database again
+_VERSION_TTL = 60.0
+# Zips per census_data query (bound as an expanding IN list, which SQLite caps)
+_ATTRIBUTE_BATCH = 500
+# Tile cache subdirectories are named by data_version()
+_VERSION_DIR = re.compile(r'^[0-9a-f]{12}$')
+
+
+# --- protobuf encoding -----------------------------------------------------------------
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _field(num: int, wire_type: int) -> bytes:
+    return _varint((num << 3) | wire_type)
+
+
+def _len_field(num: int, payload: bytes) -> bytes:
+    return _field(num, 2) + _varint(len(payload)) + payload
+
+
+def _packed(num: int, values: Iterable[int]) -> bytes:
+    return _len_field(num, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value) -> bytes:
+    """Tile.Value: string (1), double (3), sint (6), bool (7)."""
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack('<d', value)
+    return _len_field(1, str(value).encode('utf-8'))
+
+
+# --- geometry --------------------------------------------------------------------------
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) in degrees for a web-mercator tile."""
+    n = 2 ** z
+
+    def _lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return x / n * 360.0 - 180.0, _lat(y + 1), (x + 1) / n * 360.0 - 180.0, _lat(y)
+
+
+def _to_tile_coords(geom, z: int, x: int, y: int):
+    """Project a lon/lat geometry into this tile's 0..EXTENT integer grid (y down)."""
+    import numpy as np
+    import shapely
+
+    n = 2 ** z
+
+    def _project(coords):
+        lon = coords[:, 0]
+        lat = np.clip(coords[:, 1], -85.0511, 85.0511)
+        px = ((lon + 180.0) / 360.0 * n - x) * EXTENT
+        lat_r = np.radians(lat)
+        py = ((1 - np.log(np.tan(lat_r) + 1 / np.cos(lat_r)) / math.pi) / 2 * n - y) * EXTENT
+        return np.column_stack([px, py])
+
+    projected = shapely.transform(geom, _project)
+    clipped = shapely.clip_by_rect(projected, -BUFFER, -BUFFER, EXTENT + BUFFER, EXTENT + BUFFER)
+    if clipped.is_empty:
+        return None
+    # Snap to the integer grid; set_precision keeps the result valid (collapsed slivers disappear)
+    snapped = shapely.set_precision(clipped, 1.0)
+    return None if snapped.is_empty else snapped
+
+
+def _polygons(geom) -> List:
+    gtype = geom.geom_type
+    if gtype == 'Polygon':
+        return [geom]
+    if gtype in ('MultiPolygon', 'GeometryCollection'):
+        out = []
+        for part in geom.geoms:
+            out.extend(_polygons(part))
+        return out
+    return []
+
+
+def _ring_area2(coords: List[Tuple[float, float]]) -> float:
+    """Twice the signed area (surveyor's formula) in tile coordinates."""
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(coords, coords[1:] + coords[:1]))
+
+
+def _encode_polygon_geometry(geom) -> List[int]:
+    """MVT command stream for polygons: exterior rings positive area, interior rings negative (y-down)."""
+    cmds: List[int] = []
+    cx = cy = 0
+    for poly in _polygons(geom):
+        rings = [(poly.exterior, True)] + [(r, False) for r in poly.interiors]
+        for ring, exterior in rings:
+            coords = [(int(px), int(py)) for px, py in list(ring.coords)[:-1]]
+            if len(coords) < 3:
+                if exterior:
+                    break
+                continue
+            area = _ring_area2(coords)
+            if area == 0:
+                if exterior:
+                    break
+                continue
+            if (area > 0) != exterior:
+                coords.reverse()
+            px, py = coords[0]
+            cmds += [(1 & 7) | (1 << 3), _zigzag(px - cx), _zigzag(py - cy)]  # MoveTo
+            cx, cy = px, py
+            cmds.append((2 & 7) | ((len(coords) - 1) << 3))  # LineTo
+            for px, py in coords[1:]:
+                cmds += [_zigzag(px - cx), _zigzag(py - cy)]
+                cx, cy = px, py
+            cmds.append((7 & 7) | (1 << 3))  # ClosePath
+    return cmds
+
+
+def encode_layer(name: str, features: List[Tuple[int, List[int], Dict]]) -> bytes:
+    """features: (id, polygon command stream, attributes). Returns an encoded Tile.Layer."""
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, object], int] = {}
+    encoded_features = []
+    for fid, geometry, attrs in features:
+        tags = []
+        for k, v in attrs.items():
+            if v is None:
+                continue
+            tags.append(keys.setdefault(k, len(keys)))
+            tags.append(values.setdefault((type(v), v), len(values)))
+        body = _field(1, 0) + _varint(fid)
+        if tags:
+            body += _packed(2, tags)
+        body += _field(3, 0) + _varint(3)  # POLYGON
+        body += _packed(4, geometry)
+        encoded_features.append(_len_field(2, body))
+
+    layer = _field(15, 0) + _varint(2) + _len_field(1, name.encode('utf-8'))
+    layer += b''.join(encoded_features)
+    layer += b''.join(_len_field(3, k.encode('utf-8')) for k in keys)
+    layer += b''.join(_len_field(4, _encode_value(v)) for (_, v) in values)
+    layer += _field(5, 0) + _varint(EXTENT)
+    return _len_field(3, layer)  # Tile.layers
+
+
+# --- census tiles ----------------------------------------------------------------------
+
+def _census_attributes(db: Session, zips: List[str]) -> Dict[str, Dict]:
+    if not zips:
+        return {}
+    cols = ', '.join(TILE_ATTRIBUTES)
+    # Expanding IN rather than = ANY(:zips) so the query also runs on SQLite (load-test database)
+    query = text(f"SELECT zip_code, {cols} FROM census_data WHERE zip_code IN :zips").bindparams(
+        bindparam('zips', expanding=True)
+    )
+    rows = []
+    for i in range(0, len(zips), _ATTRIBUTE_BATCH):
+        rows.extend(db.execute(query, {"zips": list(zips[i:i + _ATTRIBUTE_BATCH])}).mappings().all())
+    out = {}
+    for r in rows:
+        attrs = {}
+        for col in TILE_ATTRIBUTES:
+            v = r[col]
+            if v is None:
+                continue
+            attrs[col] = int(v) if col in ('population', 'total_schools') else float(v)
+        out[str(r['zip_code'])[:5]] = attrs
+    return out
+
+
+def build_census_tile(db: Session, store: BoundaryStore, z: int, x: int, y: int) -> bytes:
+    """Encode the zips layer for one tile. Empty bytes = empty tile."""
+    west, south, east, north = tile_bounds(z, x, y)
+    # Pad the lookup box by the clip buffer so polygons just outside still reach the overlap
+    pad_x = (east - west) * BUFFER / EXTENT
+    pad_y = (north - south) * BUFFER / EXTENT
+    zips = store.zips_in_bbox(west - pad_x, south - pad_y, east + pad_x, north + pad_y)
+    if not zips:
+        return b''
+    attributes = _census_attributes(db, zips)
+    lod = store.lod_for_tolerance(tolerance_for_zoom(z))
+    features = []
+    for zip_code in zips:
+        geom = store.geometry(zip_code, lod=lod)
+        if geom is None or geom.is_empty:
+            continue
+        tile_geom = _to_tile_coords(geom, z, x, y)
+        if tile_geom is None:
+            continue
+        commands = _encode_polygon_geometry(tile_geom)
+        if not commands:
+            continue
+        attrs = {'zip_code': zip_code}
+        attrs.update(attributes.get(zip_code, {}))
+        features.append((int(zip_code), commands, attrs))
+    return encode_layer(LAYER_NAME, features) if features else b''
+
+
+_version_cache: Tuple[float, Optional[str]] = (0.0, None)
+_version_lock = threading.Lock()
+
+
+def data_version(db: Session, store: BoundaryStore) -> str:
+    """Short hash of (boundary store file, census_data row count and last update). Cached for a minute."""
+    global _version_cache
+    checked, version = _version_cache
+    if version and time.monotonic() - checked < _VERSION_TTL:
+        return version
+    with _version_lock:
+        row = db.execute(text(
+            "SELECT COUNT(*), MAX(COALESCE(updated_at, created_at)) FROM census_data"
+        )).fetchone()
+        stat = os.stat(store.path)
+        raw = f"{stat.st_size}:{stat.st_mtime_ns}:{row[0]}:{row[1]}"
+        version = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+        _version_cache = (time.monotonic(), version)
+    return version
+
+
+_pruned_version: Optional[str] = None
+
+
+def _prune_stale_versions(cache_dir: Path, version: str) -> None:
+    """Delete cached tiles of other data versions (once per process and version)."""
+    global _pruned_version
+    if _pruned_version == version:
+        return
+    _pruned_version = version
+    try:
+        entries = list(cache_dir.iterdir())
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name != version and _VERSION_DIR.match(entry.name) and entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def get_census_tile(db: Session, z: int, x: int, y: int, cache_dir: Optional[str] = None) -> Optional[bytes]:
+    """
+    Tile bytes (possibly empty) from the disk cache, building and caching on a miss. Tiles of
+    older data versions are deleted the first time a new version is cached.
+    Returns None when no packed boundary store is available.
+    """
+    store = get_boundary_store()
+    if store is None:
+        return None
+    if cache_dir is None:
+        from config.config import Config
+        cache_dir = Config.TILE_CACHE_DIR
+    version = data_version(db, store)
+    path = Path(cache_dir) / version / str(z) / str(x) / f"{y}.mvt"
+    if path.exists():
+        return path.read_bytes()
+    tile = build_census_tile(db, store, z, x, y)
+    _prune_stale_versions(Path(cache_dir), version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(tile)
+    os.replace(tmp, path)
+    return tile
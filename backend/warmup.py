@@ -0,0 +1,46 @@
+"""
+Warm-up and readiness of the shared read-only indexes: packed boundary store, zip reference
+table and attendance-zone index.
+
+warm_indexes() builds them all (gunicorn.conf.py calls it in the master before forking workers
+when preloading); index_status() reports which ones are loaded without building anything and
+backs GET /api/_ready.
+"""
+import time
+from typing import Dict
+
+
+def warm_indexes() -> Dict[str, Dict]:
+    """Build every index now; {name: {'ok', 'seconds', 'error'?}}. Failures are reported, not raised."""
+    from backend.boundary_store import get_boundary_store
+    from backend.zip_reference import get_zip_reference
+    from backend.zone_index import get_zone_index
+
+    results = {}
+    for name, build in (('boundary_store', get_boundary_store), ('zip_reference', get_zip_reference),
+                        ('zone_index', get_zone_index)):
+        started = time.perf_counter()
+        try:
+            build()
+            results[name] = {'ok': True}
+        except Exception as e:
+            results[name] = {'ok': False, 'error': str(e)}
+        results[name]['seconds'] = round(time.perf_counter() - started, 3)
+    return results
+
+
+def index_status() -> Dict:
+    """{'ready': bool, 'indexes': {...}}; ready once the zone index and zip reference are loaded."""
+    from backend.boundary_store import get_boundary_store
+    from backend.zip_reference import zip_reference_size
+    from backend.zone_index import zone_index_status
+
+    store = get_boundary_store()  # cheap: mmap plus the entry index, opened once per process
+    zones = zone_index_status()
+    zip_count = zip_reference_size()
+    indexes = {
+        'boundary_store': {'ready': True, 'available': store is not None, 'zips': len(store) if store else 0},
+        'zip_reference': {'ready': zip_count is not None, 'zips': zip_count},
+        'zone_index': dict(zones, ready=True) if zones else {'ready': False},
+    }
+    return {'ready': all(i['ready'] for i in indexes.values()), 'indexes': indexes}
@@ -0,0 +1,72 @@
+"""
+Zip centroid lookup for placing zips on the map without geocoding.
+
+Sources, in order: the zip_code_centroids table (scripts/create_zip_centroids_table.py), the
+offline `zipcodes` package (~42k US zips, loaded once into a dict), then the center of the zip's
+bounding box in the packed boundary store.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.boundary_store import get_boundary_store, normalize_zip5
+
+Centroid = Tuple[float, float]  # (lat, lng)
+
+_offline: Optional[Dict[str, Centroid]] = None
+_offline_lock = threading.Lock()
+
+
+def _offline_centroids() -> Dict[str, Centroid]:
+    global _offline
+    if _offline is None:
+        with _offline_lock:
+            if _offline is None:
+                table: Dict[str, Centroid] = {}
+                try:
+                    import zipcodes
+                    for z in zipcodes.list_all():
+                        try:
+                            table[z['zip_code']] = (float(z['lat']), float(z['long']))
+                        except (KeyError, TypeError, ValueError):
+                            continue
+                except ImportError:
+                    print("[WARNING] zipcodes package not installed - offline zip centroids disabled")
+                _offline = table
+    return _offline
+
+
+def _table_centroids(db: Session, zips) -> Dict[str, Centroid]:
+    try:
+        rows = db.execute(text("""
+            SELECT zip_code, latitude, longitude FROM zip_code_centroids
+            WHERE zip_code = ANY(:zips) AND latitude IS NOT NULL AND longitude IS NOT NULL
+        """), {"zips": list(zips)}).fetchall()
+    except Exception:
+        # Table not created in this database
+        db.rollback()
+        return {}
+    return {str(r[0])[:5]: (float(r[1]), float(r[2])) for r in rows}
+
+
+def lookup_centroids(db: Optional[Session], zip_codes: Iterable[str]) -> Dict[str, Centroid]:
+    """{zip: (lat, lng)} for every zip any source knows. One query, no network calls."""
+    zips = {z for z in (normalize_zip5(z) for z in zip_codes) if z}
+    if not zips:
+        return {}
+    found = _table_centroids(db, zips) if db is not None else {}
+    missing = zips - found.keys()
+    if missing:
+        offline = _offline_centroids()
+        found.update({z: offline[z] for z in missing if z in offline})
+        missing -= found.keys()
+    if missing:
+        store = get_boundary_store()
+        if store is not None:
+            for z in missing:
+                b = store.bounds(z)
+                if b is not None:
+                    found[z] = ((b[1] + b[3]) / 2, (b[0] + b[2]) / 2)
+    return found
@@ -0,0 +1,112 @@
+"""
+Offline ZIP reference table: zip -> primary city, state, county name and 5-digit county FIPS.
+
+Loaded once into a dict keyed by 5-digit zip. The source is the compact gzipped CSV written by
+scripts/build_zip_reference.py (Config.ZIP_REFERENCE_PATH), which carries Census ZCTA -> county
+FIPS assignments. Without it, the table is built from the `zipcodes` package (already a
+dependency, ships its data offline), with county FIPS filled from the county CSV when present.
+"""
+import csv
+import gzip
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from config.config import Config
+from backend.boundary_store import normalize_zip5
+
+REFERENCE_COLUMNS = ('zip_code', 'city', 'state', 'county', 'county_fips')
+
+
+class ZipReference(NamedTuple):
+    zip_code: str
+    city: Optional[str]
+    state: Optional[str]
+    county: Optional[str]
+    county_fips: Optional[str]
+
+
+_table: Optional[Dict[str, ZipReference]] = None
+_lock = threading.Lock()
+
+
+def read_reference_file(path) -> Dict[str, ZipReference]:
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        return {
+            row['zip_code']: ZipReference(*(row.get(c) or None for c in REFERENCE_COLUMNS))
+            for row in csv.DictReader(f)
+        }
+
+
+def write_reference_file(path, table: Dict[str, ZipReference]) -> None:
+    """Write the table sorted by zip as gzipped CSV (temp file + rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REFERENCE_COLUMNS)
+        for zip_code in sorted(table):
+            writer.writerow(['' if v is None else v for v in table[zip_code]])
+    tmp.replace(path)
+
+
+def reference_from_zipcodes_package(county_fips_csv: str = None) -> Dict[str, ZipReference]:
+    """Table from the `zipcodes` package; county FIPS matched by (state, county name) from the county CSV."""
+    from backend.fips_lookup import STATE_FIPS_TO_CODE, load_county_fips_from_csv, normalize_county_name
+    try:
+        import zipcodes
+    except ImportError:
+        print("[WARNING] zipcodes package not installed - offline zip reference disabled")
+        return {}
+    by_name = {
+        (STATE_FIPS_TO_CODE.get(state_fips, state_fips), normalize_county_name(name)): state_fips + county_fips
+        for (state_fips, county_fips), (name, _) in load_county_fips_from_csv(county_fips_csv).items()
+    }
+    table = {}
+    for z in zipcodes.list_all():
+        zip_code, state, county = z.get('zip_code'), z.get('state') or None, z.get('county') or None
+        if not zip_code or not z.get('active', True):
+            continue
+        fips = by_name.get((state, normalize_county_name(county))) if county else None
+        table[zip_code] = ZipReference(zip_code, z.get('city') or None, state, county, fips)
+    return table
+
+
+def get_zip_reference() -> Dict[str, ZipReference]:
+    """{zip: ZipReference} for every known zip (loaded once)."""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                path = Path(Config.ZIP_REFERENCE_PATH)
+                _table = read_reference_file(path) if path.exists() else reference_from_zipcodes_package()
+    return _table
+
+
+def zip_reference_size() -> Optional[int]:
+    """Number of zips in the loaded table, or None if it has not been loaded yet (does not load it)."""
+    table = _table
+    return len(table) if table is not None else None
+
+
+def lookup_zip(zip_code: str) -> Optional[ZipReference]:
+    zip_code = normalize_zip5(zip_code)
+    return get_zip_reference().get(zip_code) if zip_code else None
+
+
+def lookup_zips(zip_codes: Iterable[str]) -> Dict[str, ZipReference]:
+    """{zip: ZipReference} for the zips the table knows."""
+    table = get_zip_reference()
+    found = {}
+    for zip_code in zip_codes:
+        key = normalize_zip5(zip_code)
+        if key in table:
+            found[key] = table[key]
+    return found
+
+
+def reset_zip_reference() -> None:
+    global _table
+    with _lock:
+        _table = None
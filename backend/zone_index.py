@@ -0,0 +1,129 @@
+"""
+Process-wide index of NC/SC attendance zones: WGS84 geometries plus an STRtree over them.
+
+Loading every zone from the database and reprojecting its boundary used to happen on each
+/api/zips/<zip>/school-zones and /api/schools/address/all-zoned request. ZoneIndex does it once:
+each zone dict carries its converted geometry under zone_utils.WGS84_GEOMETRY_KEY (so the
+zone_utils functions skip the conversion) and candidates() narrows a query to zones whose
+bounding boxes intersect. It is rebuilt after ZONE_INDEX_TTL seconds; requests keep using the
+previous index while one thread rebuilds.
+
+Under gunicorn with preload the index is built in the master before fork and shared copy-on-write
+(see gunicorn.conf.py). Workers call pin_zone_index() so they never rebuild a private copy; the
+master refreshes it with refresh_zone_index() and reloads the workers instead.
+
+The zone dicts hold Shapely geometries, so they must not be passed to jsonify as they are.
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config.config import Config
+
+
+class ZoneIndex:
+    def __init__(self, zones: List[Dict]):
+        from shapely import STRtree
+        from backend.zone_utils import WGS84_GEOMETRY_KEY, _boundary_to_shapely_wgs84
+
+        self.zones = zones
+        self.built_at = time.time()
+        geometries, positions = [], []
+        for i, zone in enumerate(zones):
+            try:
+                geom = _boundary_to_shapely_wgs84(zone)
+            except Exception:
+                geom = None
+            zone[WGS84_GEOMETRY_KEY] = geom
+            if geom is not None and not geom.is_empty:
+                geometries.append(geom)
+                positions.append(i)
+        self.with_geometry = len(geometries)
+        self._positions = positions
+        self._tree = STRtree(geometries)
+
+    @classmethod
+    def load(cls, db=None) -> 'ZoneIndex':
+        """Build from the attendance_zones table (NC/SC), using db or a short-lived session."""
+        from sqlalchemy import or_
+        from backend.database import SessionLocal
+        from backend.models import AttendanceZone
+
+        session = db if db is not None else SessionLocal()
+        try:
+            rows = session.query(AttendanceZone).filter(
+                or_(AttendanceZone.state == 'NC', AttendanceZone.state == 'SC')
+            ).all()
+            zones = [z.to_dict() for z in rows]
+        finally:
+            if db is None:
+                session.close()
+        return cls(zones)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def candidates(self, geometry) -> List[Dict]:
+        """Zones whose bounding box intersects geometry, in table order."""
+        hits = sorted(self._positions[i] for i in self._tree.query(geometry))
+        return [self.zones[i] for i in hits]
+
+    def status(self) -> Dict:
+        return {
+            'zones': len(self.zones),
+            'zones_with_geometry': self.with_geometry,
+            'built_at': self.built_at,
+            'age_seconds': round(time.time() - self.built_at, 1),
+        }
+
+
+_index: Optional[ZoneIndex] = None
+_build_lock = threading.Lock()
+_pinned = False
+
+
+def _expired(index: ZoneIndex) -> bool:
+    ttl = Config.ZONE_INDEX_TTL
+    return not _pinned and ttl > 0 and time.time() - index.built_at >= ttl
+
+
+def get_zone_index(db=None) -> ZoneIndex:
+    """Shared index; built on first use, rebuilt after Config.ZONE_INDEX_TTL seconds (unless pinned)."""
+    global _index
+    index = _index
+    if index is not None and not _expired(index):
+        return index
+    # Only the first build blocks; later rebuilds serve the previous index meanwhile
+    if not _build_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _index is None or _expired(_index):
+            _index = ZoneIndex.load(db)
+        return _index
+    finally:
+        _build_lock.release()
+
+
+def refresh_zone_index(db=None) -> ZoneIndex:
+    """Build a new index now and swap it in (requests keep the old one until the swap)."""
+    global _index
+    with _build_lock:
+        _index = ZoneIndex.load(db)
+        return _index
+
+
+def pin_zone_index() -> None:
+    """Keep the current index for the life of this process (gunicorn workers sharing the master's)."""
+    global _pinned
+    _pinned = True
+
+
+def zone_index_status() -> Optional[Dict]:
+    """Status of the built index, or None if it has not been built in this process."""
+    index = _index
+    return index.status() if index is not None else None
+
+
+def reset_zone_index() -> None:
+    global _index
+    _index = None
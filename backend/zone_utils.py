@@ -1,16 +1,31 @@
 """Utilities for school attendance zone point-in-polygon testing."""
 import json
+import logging
 from pathlib import Path
 from shapely.geometry import Point, shape, mapping
 from shapely.ops import unary_union
 from typing import Optional, Dict, List, Any, Tuple
 
-try:
-    from pyproj import Transformer
-    HAS_PYPROJ = True
-except ImportError:
-    HAS_PYPROJ = False
-    print("[WARNING] pyproj not installed - coordinate transformation disabled")
+from backend.boundary_store import get_boundary_store
+from backend.logging_config import LogSampler
+
+logger = logging.getLogger(__name__)
+_zone_errors = LogSampler(logger, 100)
+
+_transformer_class = None  # pyproj.Transformer once imported, False when pyproj is missing
+
+
+def _get_transformer_class():
+    """pyproj.Transformer, imported on the first projected geometry (pyproj is slow to import); None without pyproj."""
+    global _transformer_class
+    if _transformer_class is None:
+        try:
+            from pyproj import Transformer
+            _transformer_class = Transformer
+        except ImportError:
+            logger.warning("pyproj not installed - coordinate transformation disabled")
+            _transformer_class = False
+    return _transformer_class or None
 
 # NCES SABS and similar shapefiles may be in one of these CRSs. We transform to WGS84 for point-in-polygon and mapping.
 _SOURCE_CRS_CANDIDATES = [
@@ -20,6 +35,8 @@ _SOURCE_CRS_CANDIDATES = [
     "EPSG:2273",   # NAD83 State Plane South Carolina
 ]
 _WGS84 = "EPSG:4326"
+# Zone dicts from backend.zone_index carry their converted geometry under this key (may be None)
+WGS84_GEOMETRY_KEY = "_geometry_wgs84"
 
 
 def _transform_ring(ring: List, transformer) -> List:
@@ -41,10 +58,13 @@ def _transform_ring(ring: List, transformer) -> List:
 def _geometry_to_wgs84(geometry: Dict, from_crs: str) -> Optional[Dict]:
     """Transform a GeoJSON geometry from from_crs to WGS84. Returns new geometry dict or None."""
     gtype = _normalize_geom_type(geometry.get("type")) if geometry else None
-    if not HAS_PYPROJ or not geometry or gtype not in ("Polygon", "MultiPolygon"):
+    if not geometry or gtype not in ("Polygon", "MultiPolygon"):
+        return None
+    transformer_class = _get_transformer_class()
+    if transformer_class is None:
         return None
     try:
-        trans = Transformer.from_crs(from_crs, _WGS84, always_xy=True)
+        trans = transformer_class.from_crs(from_crs, _WGS84, always_xy=True)
         coords = geometry.get("coordinates")
         if not coords:
             return None
@@ -120,7 +140,7 @@ def zone_boundary_to_wgs84(zone_boundary: Any, state_abbr: Optional[str] = None)
         return None
     if not _coords_look_projected(coords):
         return {"type": geom_type, "coordinates": coords}
-    if not HAS_PYPROJ:
+    if _get_transformer_class() is None:
         return None
     # NCES SABS shapefiles use Web Mercator (EPSG:3857). Try 3857 first so we don't
     # wrongly accept state-plane (2264/2273) transforms that also yield valid-looking degrees.
@@ -147,6 +167,8 @@ def zone_boundary_to_wgs84(zone_boundary: Any, state_abbr: Optional[str] = None)
 
 def _boundary_to_shapely_wgs84(zone: Dict):
     """Parse zone_boundary and return Shapely geometry in WGS84 (transform if projected)."""
+    if WGS84_GEOMETRY_KEY in zone:
+        return zone[WGS84_GEOMETRY_KEY]
     boundary = zone.get("zone_boundary")
     state = (zone.get("state") or "").strip().upper()
     geom_dict = zone_boundary_to_wgs84(boundary, state_abbr=state)
@@ -201,7 +223,7 @@ def point_in_polygon(lat: float, lng: float, geojson_boundary: str) -> bool:
         return polygon.contains(point)
         
     except Exception as e:
-        print(f"Error in point_in_polygon: {e}")
+        logger.warning("Error in point_in_polygon: %s", e)
         return False
 
 
@@ -212,25 +234,22 @@ def find_zoned_schools(lat: float, lng: float, zones: List[Dict], school_level:
     """
     point_wgs84 = Point(lng, lat)
     level_zones = [z for z in zones if z.get('school_level', '').lower() == school_level.lower()]
-    print(f"[DEBUG] find_zoned_schools: Testing {len(level_zones)} {school_level} zones for point ({lat}, {lng})")
+    logger.debug("find_zoned_schools: testing %d %s zones for point (%s, %s)", len(level_zones), school_level, lat, lng)
 
     tested = 0
     for zone in level_zones:
         tested += 1
-        if tested % 500 == 0:
-            print(f"[DEBUG] find_zoned_schools: Tested {tested}/{len(level_zones)} {school_level} zones...")
         try:
             polygon = _boundary_to_shapely_wgs84(zone)
             if polygon is None:
                 continue
             if polygon.contains(point_wgs84):
-                print(f"[DEBUG] find_zoned_schools: FOUND MATCH! {school_level} school: {zone.get('school_name')}")
+                logger.debug("find_zoned_schools: %s match after %d zones: %s", school_level, tested, zone.get('school_name'))
                 return zone
         except Exception as e:
-            if tested <= 5:
-                print(f"[DEBUG] Error checking zone {zone.get('school_name')}: {e}")
+            _zone_errors("Error checking zone %s: %s", zone.get('school_name'), e)
             continue
-    print(f"[DEBUG] find_zoned_schools: No {school_level} zone found after testing {tested} zones")
+    logger.debug("find_zoned_schools: no %s zone found after testing %d zones", school_level, tested)
     return None
 
 
@@ -239,7 +258,7 @@ def find_all_zoned_schools(lat: float, lng: float, zones: List[Dict]) -> Dict[st
     Find ALL attendance zones (NCES) that contain the given point, grouped by level.
     Zone boundaries are converted to WGS84 when projected (NCES).
     """
-    print(f"[ZONED SCHOOLS / NCES] find_all_zoned_schools: point ({lat}, {lng}), testing {len(zones)} zones (point-in-polygon)")
+    logger.debug("find_all_zoned_schools: point (%s, %s), testing %d zones", lat, lng, len(zones))
     result = {'elementary': [], 'middle': [], 'high': []}
     point_wgs84 = Point(lng, lat)
     for zone in zones:
@@ -250,10 +269,11 @@ def find_all_zoned_schools(lat: float, lng: float, zones: List[Dict]) -> Dict[st
             polygon = _boundary_to_shapely_wgs84(zone)
             if polygon is not None and polygon.contains(point_wgs84):
                 result[level].append(zone)
-        except Exception:
+        except Exception as e:
+            _zone_errors("Error checking zone %s: %s", zone.get('school_name'), e)
             continue
-    counts = {k: len(v) for k, v in result.items()}
-    print(f"[ZONED SCHOOLS / NCES] find_all_zoned_schools result: {counts}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("find_all_zoned_schools result: %s", {k: len(v) for k, v in result.items()})
     return result
 
 
@@ -294,8 +314,15 @@ def _boundary_to_geometry(boundary: Any):
 def load_zip_polygon(zip_code: str, boundaries_dir: str = 'data/zip_boundaries') -> Optional[Any]:
     """
     Load ZCTA boundary for zip as Shapely polygon (or multi-polygon).
-    Reads from data/zip_boundaries/{zip_code}.geojson. Returns None if file missing or invalid.
+    Reads from the packed boundary store when present, else data/zip_boundaries/{zip_code}.geojson.
+    Returns None if missing or invalid.
     """
+    store = get_boundary_store()
+    if store is not None and zip_code in store:
+        try:
+            return store.geometry(zip_code)
+        except Exception:
+            pass
     path = Path(boundaries_dir) / f"{zip_code}.geojson"
     if not path.exists():
         return None
@@ -390,6 +417,12 @@ def district_geometry_in_zip(zip_polygon: Any, district_zones: List[Dict]) -> Op
     Compute the part of the zip that lies in this district (intersection of zip with each zone, unioned).
     Returns GeoJSON geometry in WGS84 (plottable on web maps).
     """
+    merged = district_shape_in_zip(zip_polygon, district_zones)
+    return mapping(merged) if merged is not None else None
+
+
+def district_shape_in_zip(zip_polygon: Any, district_zones: List[Dict]):
+    """Like district_geometry_in_zip but returns the Shapely geometry (or None), e.g. for shapely.to_geojson."""
     pieces = []
     for z in district_zones:
         geom = _boundary_to_shapely_wgs84(z)
@@ -405,8 +438,6 @@ def district_geometry_in_zip(zip_polygon: Any, district_zones: List[Dict]) -> Op
         return None
     try:
         merged = unary_union(pieces)
-        if merged.is_empty:
-            return None
-        return mapping(merged)
+        return None if merged.is_empty else merged
     except Exception:
         return None
@@ -24,6 +24,34 @@ class Config:
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    # Per-request timings (backend/instrumentation.py) in a Server-Timing response header
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    # Logging (backend/logging_config.py): DEBUG/INFO/WARNING..., 'text' or 'json' lines
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    # Admin-only endpoints (/api/_profile) require this in X-Admin-Token; empty disables them
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    # Sampling profiler (backend/profiling.py): ?profile=1 HTML profiles (local use), toggle signal ('' = none), output dir
+    PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'false').lower() == 'true'
+    PROFILE_SIGNAL = os.getenv('PROFILE_SIGNAL', 'SIGPROF')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))  # seconds between samples
+    PROFILE_DEFAULT_SECONDS = float(os.getenv('PROFILE_DEFAULT_SECONDS', '30'))
+    # Response compression (backend/http_caching.py): smallest body compressed, gzip/brotli levels, memo size
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+    COMPRESS_CACHE_BYTES = int(os.getenv('COMPRESS_CACHE_BYTES', str(64 * 1024 * 1024)))
+    # Production serving (gunicorn.conf.py): bind, processes (0 = one per CPU), threads per process, preload
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '0'))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_PRELOAD = os.getenv('WEB_PRELOAD', 'true').lower() == 'true'
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '120'))
+    WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', '2000'))
+    # Attendance-zone index (backend/zone_index.py) is rebuilt from the database after this many seconds
+    # (0 = never; under gunicorn with preload the master rebuilds it and reloads the workers)
+    ZONE_INDEX_TTL = float(os.getenv('ZONE_INDEX_TTL', '3600'))
     
     # Google Sheets
     GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', 'credentials/google_sheets_credentials.json')
@@ -31,12 +59,35 @@ class Config:
     # Boundaries.io (optional - for zip code boundaries)
     BOUNDARIES_IO_API_KEY = os.getenv('BOUNDARIES_IO_API_KEY', '')
     
+    # Packed ZCTA boundary store (built by scripts/pack_zip_boundaries.py); per-zip files are the fallback
+    ZIP_BOUNDARY_STORE = os.getenv('ZIP_BOUNDARY_STORE', 'data/zip_boundaries.pack')
+    # Census TIGERweb ArcGIS services (point at scripts/fake_arcgis_server.py for tests) and request budget
+    TIGERWEB_BASE_URL = os.getenv('TIGERWEB_BASE_URL', 'https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb')
+    TIGERWEB_REQUESTS_PER_SECOND = float(os.getenv('TIGERWEB_REQUESTS_PER_SECOND', '4'))
+    # Remote zip boundary lookups (backend/boundary_resolver.py): overall deadline and miss-cache TTLs (seconds)
+    BOUNDARY_RESOLVE_DEADLINE = float(os.getenv('BOUNDARY_RESOLVE_DEADLINE', '8'))
+    BOUNDARY_MISS_TTL = float(os.getenv('BOUNDARY_MISS_TTL', str(7 * 24 * 3600)))  # every provider said not found
+    BOUNDARY_RETRY_TTL = float(os.getenv('BOUNDARY_RETRY_TTL', '600'))  # some provider errored or timed out
+    BOUNDARY_MISS_CACHE = os.getenv('BOUNDARY_MISS_CACHE', 'data/boundary_misses.sqlite')
+    # Disk cache for /api/tiles vector tiles (one subdirectory per data version)
+    TILE_CACHE_DIR = os.getenv('TILE_CACHE_DIR', 'data/tile_cache')
+    # Address geocoding (backend/geocoding.py): 'google' or 'stub' (offline), SQLite cache and TTLs (seconds)
+    GEOCODE_PROVIDER = os.getenv('GEOCODE_PROVIDER', 'google').lower()
+    GEOCODE_CACHE = os.getenv('GEOCODE_CACHE', 'data/geocode_cache.sqlite')
+    GEOCODE_CACHE_TTL = float(os.getenv('GEOCODE_CACHE_TTL', str(30 * 24 * 3600)))
+    GEOCODE_NEGATIVE_TTL = float(os.getenv('GEOCODE_NEGATIVE_TTL', str(24 * 3600)))  # no results for the address
+    # Offline zip -> city/state/county reference (scripts/build_zip_reference.py) and county FIPS names
+    ZIP_REFERENCE_PATH = os.getenv('ZIP_REFERENCE_PATH', 'data/reference/zip_reference.csv.gz')
+    COUNTY_FIPS_CSV = os.getenv('COUNTY_FIPS_CSV', 'data/reference/county_fips.csv')
+    
     # Apify API (for school ratings)
     APIFY_API_TOKEN = os.getenv('APIFY_API_TOKEN', '')
     APIFY_ZILLOW_SCHOOL_ACTOR_ID = 'axlymxp/zillow-school-scraper'
+    APIFY_BASE_URL = os.getenv('APIFY_BASE_URL', 'https://api.apify.com/v2')  # Point at a local fake server for tests
+    APIFY_MAX_CONCURRENT_RUNS = int(os.getenv('APIFY_MAX_CONCURRENT_RUNS', '5'))  # Concurrency budget for bulk imports
     
     # Census API Settings
-    CENSUS_API_BASE_URL = 'https://api.census.gov/data'
+    CENSUS_API_BASE_URL = os.getenv('CENSUS_API_BASE_URL', 'https://api.census.gov/data')  # scripts/fake_census_server.py for tests
     CENSUS_YEAR = '2024'  # ACS 5-year estimates (2020-2024)
     CENSUS_DATASET = 'acs/acs5'  # American Community Survey 5-year
 
@@ -19,6 +19,10 @@ const API_BASE_URL = '/api';
 // Cap how many zips we geocode for the heatmap (biggest Geocoding API saver).
 // Each zip = 1 Geocoding API request; without this, 5000 zips = 5000 requests per load + per layer toggle.
 const MAX_ZIPS_FOR_MAP = 300;
+// Zips the bulk boundary request had nothing for fall back to one request each: cap how many and
+// how many run at once (the rest keep just their marker).
+const MAX_BOUNDARY_FALLBACKS = 50;
+const BOUNDARY_FALLBACK_CONCURRENCY = 4;
 // In-memory cache: zip -> Google Maps LatLng (or { lat, lng }). Avoids re-geocoding same zip in same session.
 let zipCoordCache = new Map();
 
@@ -38,6 +42,18 @@ function initMap() {
     loadCensusData();
 }
 
+// Rebuild row objects from a format=columnar response
+function columnsToRows(columns, data) {
+    const count = columns.length ? (data[columns[0]] || []).length : 0;
+    const rows = new Array(count);
+    for (let i = 0; i < count; i++) {
+        const row = {};
+        for (const col of columns) row[col] = data[col][i];
+        rows[i] = row;
+    }
+    return rows;
+}
+
 // Load census data from API
 async function loadCensusData(filters = {}) {
     try {
@@ -60,6 +76,8 @@ async function loadCensusData(filters = {}) {
         if (filters.min_elementary_school_rating != null && filters.min_elementary_school_rating !== '' && !Number.isNaN(Number(filters.min_elementary_school_rating))) params.append('min_elementary_school_rating', filters.min_elementary_school_rating);
         if (filters.min_blended_school_rating != null && filters.min_blended_school_rating !== '' && !Number.isNaN(Number(filters.min_blended_school_rating))) params.append('min_blended_school_rating', filters.min_blended_school_rating);
         params.append('limit', '5000'); // Adjust as needed
+        params.append('centroids', '1'); // latitude/longitude per zip: no geocoding needed to place them
+        params.append('format', 'columnar'); // {column: [values]}: key names are not repeated per row
         
         const response = await fetch(`${API_BASE_URL}/census-data?${params}`);
         const result = await response.json().catch(() => ({}));
@@ -69,9 +87,10 @@ async function loadCensusData(filters = {}) {
             throw new Error(msg);
         }
 
-        currentData = result.data || [];
+        currentData = columnsToRows(result.columns || [], result.data || {});
         const total = result.total ?? currentData.length;
-        updateRecordCount(total, total > MAX_ZIPS_FOR_MAP ? MAX_ZIPS_FOR_MAP : null);
+        const needGeocoding = currentData.filter(r => r.latitude == null || r.longitude == null).length;
+        updateRecordCount(total, needGeocoding > MAX_ZIPS_FOR_MAP ? MAX_ZIPS_FOR_MAP : null);
         if (currentData.length === 0 && filters.min_employment_rating != null && !Number.isNaN(Number(filters.min_employment_rating))) {
             console.warn('No zips match filters. Local Employment Rating is only available for NC counties.');
         }
@@ -162,10 +181,16 @@ async function updateMap() {
     // Get zip code coordinates (capped to avoid huge Geocoding API usage)
     const heatmapData = [];
     const bounds = new google.maps.LatLngBounds();
-    const recordsToShow = currentData.slice(0, MAX_ZIPS_FOR_MAP);
+    // Zips with a server-side centroid are placed directly; only the rest are geocoded (capped)
+    const withCentroid = currentData.filter(r => r.latitude != null && r.longitude != null);
+    const needGeocoding = currentData.filter(r => r.latitude == null || r.longitude == null);
+    const recordsToShow = withCentroid.concat(needGeocoding.slice(0, MAX_ZIPS_FOR_MAP));
+    const boundaryRecords = [];
     
     for (const record of recordsToShow) {
-        const location = await geocodeZipCode(record.zip_code);
+        const location = record.latitude != null && record.longitude != null
+            ? new google.maps.LatLng(record.latitude, record.longitude)
+            : await geocodeZipCode(record.zip_code);
         if (location) {
             const value = getLayerValue(record, activeLayer);
             if (value !== null && value !== undefined && (activeLayer !== 'employment' || value > 0)) {
@@ -179,14 +204,29 @@ async function updateMap() {
                 // Create marker
                 createMarker(location, record, activeLayer);
                 
-                // Create zip code boundary polygon if boundaries are enabled
                 if (showBoundaries) {
-                    await createZipCodeBoundary(record.zip_code, record, activeLayer);
+                    boundaryRecords.push(record);
                 }
             }
         }
     }
     
+    // Zip boundaries: one streamed bulk request; per-zip lookup only for zips it had no local boundary for
+    if (showBoundaries && boundaryRecords.length > 0) {
+        const drawn = await drawZipBoundariesBulk(boundaryRecords, activeLayer);
+        const missing = boundaryRecords
+            .filter(record => !drawn.has(String(record.zip_code)))
+            .slice(0, MAX_BOUNDARY_FALLBACKS);
+        let next = 0;
+        const worker = async () => {
+            while (next < missing.length) {
+                const record = missing[next++];
+                await createZipCodeBoundary(record.zip_code, record, activeLayer);
+            }
+        };
+        await Promise.all(Array.from({ length: Math.min(BOUNDARY_FALLBACK_CONCURRENCY, missing.length) }, worker));
+    }
+    
     // Update heatmap if we have data
     if (heatmapData.length > 0) {
         updateHeatmap(heatmapData, activeLayer);
@@ -521,6 +561,79 @@ function formatCurrency(num) {
     return '$' + num.toLocaleString(undefined, { maximumFractionDigits: 0 });
 }
 
+// Fetch boundaries for many zips in one request (NDJSON, one Feature per line) and draw each
+// zip as its line arrives. Returns the set of zips drawn.
+async function drawZipBoundariesBulk(records, layer) {
+    const drawn = new Set();
+    const byZip = new Map(records.map(r => [String(r.zip_code), r]));
+    try {
+        const response = await fetch(`${API_BASE_URL}/zip-boundaries`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ zips: [...byZip.keys()], zoom: map.getZoom(), format: 'ndjson' })
+        });
+        if (!response.ok || !response.body) {
+            return drawn;
+        }
+        const drawLine = (line) => {
+            if (!line.trim()) return;
+            const feature = JSON.parse(line);
+            const zip = feature.properties && feature.properties.zip_code;
+            const record = byZip.get(zip);
+            if (record && drawZipBoundaryFeature(feature, record, layer)) {
+                drawn.add(zip);
+            }
+        };
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                drawLine(buffer.slice(0, newline));
+                buffer = buffer.slice(newline + 1);
+            }
+        }
+        drawLine(buffer + decoder.decode());
+    } catch (error) {
+        console.log('Bulk boundary fetch failed:', error);
+    }
+    return drawn;
+}
+
+// Draw one GeoJSON boundary feature for a census record. Returns true if anything was drawn.
+function drawZipBoundaryFeature(feature, record, layer) {
+    const color = getColorForValue(getLayerValue(record, layer), layer);
+    const paths = geometryToPaths(feature.geometry);
+    paths.forEach((path, index) => {
+        const polygon = new google.maps.Polygon({
+            paths: path,
+            map: map,
+            strokeColor: '#FF0000',
+            strokeOpacity: 0.9,
+            strokeWeight: 3,
+            fillColor: color,
+            fillOpacity: 0.25,
+            clickable: true,
+            zIndex: index === 0 ? 2 : 1
+        });
+        const bounds = new google.maps.LatLngBounds();
+        path.forEach(p => bounds.extend(p));
+        polygon.bounds = bounds;
+        polygon.center = bounds.getCenter();
+        polygon.zipCode = record.zip_code;
+        polygon.record = record;
+        polygon.addListener('click', () => {
+            highlightZipCode(polygon, record);
+        });
+        zipCodePolygons.push(polygon);
+    });
+    return paths.length > 0;
+}
+
 // Create zip code boundary polygon with actual shape using Google Data-Driven Styling
 async function createZipCodeBoundary(zipCode, record, layer) {
     try {
@@ -572,7 +685,10 @@ async function createZipCodeBoundary(zipCode, record, layer) {
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 second timeout
             
-            const response = await fetch(`${API_BASE_URL}/zip-boundary/${zipCode}`, {
+            // Ask for the level of detail the current zoom can show (full TIGER polygons are huge)
+            const zoom = map && map.getZoom ? map.getZoom() : null;
+            const lodParam = zoom != null ? `?zoom=${zoom}` : '';
+            const response = await fetch(`${API_BASE_URL}/zip-boundary/${zipCode}${lodParam}`, {
                 signal: controller.signal
             });
             clearTimeout(timeoutId);
@@ -0,0 +1,108 @@
+"""
+Gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Requests mix CPU-bound Shapely work (zone intersections, reprojection) with I/O-bound calls
+(database, geocoding, Census/TIGERweb). Processes give the geometry work real parallelism and
+gthread workers let each process overlap its I/O waits, so the defaults are one worker per CPU
+with a few threads each (WEB_WORKERS / WEB_THREADS override).
+
+With WEB_PRELOAD (default on) the app is imported in the master, and when_ready() builds the
+boundary store, zip reference and attendance-zone index there before any worker is forked.
+Workers then share those read-only structures copy-on-write; gc.freeze() keeps the collector
+from touching (and so copying) their pages. GET /api/_ready reports whether they are warm.
+Workers never rebuild the zone index themselves (that would give each a private copy); every
+ZONE_INDEX_TTL seconds the master rebuilds it and reloads the workers (SIGHUP), so new workers,
+including ones recycled by max_requests, fork from the fresh copy.
+
+Metrics (/api/_metrics) and profiling sessions are per process: each scrape or request is
+answered by whichever worker accepted it.
+"""
+import multiprocessing
+import os
+
+# Never run the Flask debugger/reloader in production (Config.DEBUG defaults to on for `python app.py`)
+os.environ.setdefault('FLASK_DEBUG', 'false')
+
+from config.config import Config  # noqa: E402  (after FLASK_DEBUG is set)
+
+wsgi_app = 'app:app'
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS or multiprocessing.cpu_count()
+threads = Config.WEB_THREADS
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = Config.WEB_PRELOAD
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks (caches, fragmentation) stay bounded
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = max(1, Config.WEB_MAX_REQUESTS // 10) if Config.WEB_MAX_REQUESTS else 0
+accesslog = '-'
+errorlog = '-'
+
+
+def _warm(log):
+    from backend.warmup import warm_indexes
+    for name, result in warm_indexes().items():
+        if result['ok']:
+            log.info("Warmed %s in %.2fs", name, result['seconds'])
+        else:
+            log.warning("Could not warm %s: %s", name, result.get('error'))
+
+
+def _refresh_zone_index(server):
+    """Master thread: rebuild the shared zone index every ZONE_INDEX_TTL seconds, then reload workers."""
+    import gc
+    import signal
+    import time
+    from backend.zone_index import refresh_zone_index
+    while True:
+        time.sleep(Config.ZONE_INDEX_TTL)
+        try:
+            index = refresh_zone_index()
+        except Exception as e:
+            server.log.warning("Could not refresh the zone index: %s", e)
+            continue
+        gc.collect()
+        gc.freeze()
+        server.log.info("Rebuilt the zone index (%d zones); reloading workers", len(index))
+        os.kill(os.getpid(), signal.SIGHUP)
+
+
+def when_ready(server):
+    """Master, after the preloaded app is imported and before workers fork."""
+    import signal
+    from backend.profiling import profile_signal
+    # Profiling toggles are per worker (post_worker_init); the master just ignores the signal
+    signum = profile_signal()
+    if signum is not None:
+        signal.signal(signum, signal.SIG_IGN)
+    if not preload_app:
+        return
+    import gc
+    _warm(server.log)
+    gc.collect()
+    gc.freeze()
+    if Config.ZONE_INDEX_TTL > 0:
+        import threading
+        threading.Thread(target=_refresh_zone_index, args=(server,), name='zone-index-refresh', daemon=True).start()
+
+
+def post_worker_init(worker):
+    """Without preloading every worker builds its own indexes before taking requests."""
+    from backend.profiling import install_signal_toggle
+    from backend.zone_index import pin_zone_index
+    if preload_app:
+        pin_zone_index()  # the master refreshes it (see _refresh_zone_index)
+    else:
+        _warm(worker.log)
+    # kill -PROF <worker pid> toggles a profiling session in that worker (USR1/USR2 belong to gunicorn)
+    install_signal_toggle()
+
+
+def post_fork(server, worker):
+    # Connections must not cross fork (NullPool keeps none, but a pooled engine would)
+    from backend.database import engine
+    engine.dispose()
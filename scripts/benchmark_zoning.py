@@ -0,0 +1,167 @@
+"""
+Offline benchmark for the zoning engine (backend/zone_utils.py) on synthetic SABS-like fixtures.
+
+No database or network: zones and the ZCTA polygon come from scripts/synthetic_geo.py (fixed seeds,
+so every run measures the same geometry). Each benchmark runs --repeat times per zone count and
+boundary CRS (WGS84 and projected EPSG:3857); min/median/mean seconds are written as JSON.
+--compare checks the run against an earlier results file and exits 1 on regressions.
+
+Usage:
+  python scripts/benchmark_zoning.py
+  python scripts/benchmark_zoning.py --zone-counts 100 500 2000 --vertices 800 --repeat 5
+  python scripts/benchmark_zoning.py --output bench/new.json --compare bench/baseline.json --threshold 1.2
+  python scripts/benchmark_zoning.py --only find_all_zoned_schools
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.zone_utils import (
+    district_geometry_in_zip,
+    find_all_zoned_schools,
+    group_zones_by_district,
+    zone_boundary_to_wgs84,
+    zones_intersecting_zip_diagnostic,
+)
+from scripts.synthetic_geo import CHARLOTTE, make_attendance_zones, make_zcta_polygon, random_points
+
+POINTS_PER_RUN = 5
+
+
+def _quiet(fn, *args):
+    """Call fn with stdout discarded (zone_utils prints progress on every call)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def build_benchmarks(zones, zip_polygon):
+    """{name: zero-arg callable} for one fixture."""
+    points = random_points(POINTS_PER_RUN)
+    in_zip, _ = zones_intersecting_zip_diagnostic(zip_polygon, zones)
+    districts = group_zones_by_district(in_zip or zones)
+    biggest = max(districts, key=lambda d: len(d['zones']))['zones']
+
+    def all_zoned():
+        for lat, lng in points:
+            _quiet(find_all_zoned_schools, lat, lng, zones)
+
+    def to_wgs84():
+        for zone in zones:
+            zone_boundary_to_wgs84(zone['zone_boundary'], zone['state'])
+
+    return {
+        'find_all_zoned_schools': all_zoned,
+        'zones_intersecting_zip_diagnostic': lambda: zones_intersecting_zip_diagnostic(zip_polygon, zones),
+        'district_geometry_in_zip': lambda: district_geometry_in_zip(zip_polygon, biggest),
+        'zone_boundary_to_wgs84': to_wgs84,
+    }
+
+
+def time_it(fn, repeat: int):
+    fn()  # warm-up (imports, pyproj transformer setup)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {'min': min(samples), 'median': statistics.median(samples), 'mean': statistics.fmean(samples),
+            'repeat': repeat}
+
+
+def environment():
+    import numpy
+    import shapely
+    try:
+        import pyproj
+        pyproj_version = pyproj.__version__
+    except ImportError:
+        pyproj_version = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or None,
+        'cpu_count': os.cpu_count(),
+        'shapely': shapely.__version__,
+        'pyproj': pyproj_version,
+        'numpy': numpy.__version__,
+    }
+
+
+def compare(results, baseline_path: Path, threshold: float) -> int:
+    """Print median ratios against a baseline; return the number of regressions beyond threshold."""
+    baseline = {r['key']: r for r in json.loads(baseline_path.read_text())['results']}
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (regression if median > {threshold:g}x baseline):")
+    for r in results:
+        old = baseline.get(r['key'])
+        if not old:
+            print(f"  {r['key']:<70} new")
+            continue
+        ratio = r['median'] / old['median'] if old['median'] else float('inf')
+        flag = 'REGRESSION' if ratio > threshold else ('faster' if ratio < 1 / threshold else '')
+        regressions += flag == 'REGRESSION'
+        print(f"  {r['key']:<70} {old['median'] * 1000:9.2f} ms -> {r['median'] * 1000:9.2f} ms  {ratio:5.2f}x {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark zone_utils on synthetic attendance zones')
+    parser.add_argument('--zone-counts', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--vertices', type=int, default=400, help='Vertices per zone polygon')
+    parser.add_argument('--zip-vertices', type=int, default=1500, help='Vertices of the ZCTA polygon')
+    parser.add_argument('--crs', nargs='+', choices=['wgs84', 'projected'], default=['wgs84', 'projected'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='Run only these benchmarks')
+    parser.add_argument('--output', help='Results JSON (default bench_results/zoning-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Median ratio counted as a regression')
+    args = parser.parse_args()
+
+    zip_polygon = make_zcta_polygon(CHARLOTTE, vertices=args.zip_vertices)
+    results = []
+    for crs in args.crs:
+        for count in args.zone_counts:
+            zones = make_attendance_zones(count, vertices=args.vertices, projected=crs == 'projected')
+            for name, fn in build_benchmarks(zones, zip_polygon).items():
+                if args.only and name not in args.only:
+                    continue
+                timing = time_it(fn, args.repeat)
+                key = f"{name}[crs={crs},zones={len(zones)},vertices={args.vertices}]"
+                results.append({'key': key, 'benchmark': name, 'crs': crs, 'zones': len(zones),
+                                'vertices': args.vertices, **timing})
+                print(f"{key:<72} median {timing['median'] * 1000:9.2f} ms  min {timing['min'] * 1000:9.2f} ms")
+
+    output = Path(args.output or f"bench_results/zoning-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'suite': 'zoning',
+        'environment': environment(),
+        'params': {'points_per_run': POINTS_PER_RUN, 'zip_vertices': args.zip_vertices},
+        'results': results,
+    }, indent=2))
+    print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare and compare(results, Path(args.compare), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Build the offline zip reference table (data/reference/zip_reference.csv.gz) used by
+backend/zip_reference.py and backend/fips_lookup.py.
+
+City/state/county names come from the `zipcodes` package (no network). County FIPS come from the
+Census 2020 ZCTA -> county relationship file: each ZCTA is assigned the county holding most of its
+land area. The Census county list is written to data/reference/county_fips.csv for
+fips_to_county_name().
+
+Usage:
+  python scripts/build_zip_reference.py --download        # fetch the two Census files first
+  python scripts/build_zip_reference.py --relationship-file tab20_zcta520_county20_natl.txt \
+      --county-file national_county2020.txt
+  python scripts/build_zip_reference.py                   # names only (no county FIPS)
+"""
+import argparse
+import csv
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from config.config import Config
+from backend.fips_lookup import STATE_FIPS_TO_CODE, load_county_fips_from_csv
+from backend.zip_reference import ZipReference, reference_from_zipcodes_package, write_reference_file
+
+RELATIONSHIP_URL = "https://www2.census.gov/geo/docs/maps-data/data/rel2020/zcta520/tab20_zcta520_county20_natl.txt"
+COUNTY_URL = "https://www2.census.gov/geo/docs/reference/codes2020/national_county2020.txt"
+RAW_DIR = Path('data/reference/raw')
+
+
+def download(url: str, dest_dir: Path = RAW_DIR) -> Path:
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    path = dest_dir / url.rsplit('/', 1)[-1]
+    if path.exists():
+        print(f"Using cached {path}")
+        return path
+    print(f"Downloading {url} ...")
+    with requests.get(url, stream=True, timeout=120) as r:
+        r.raise_for_status()
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            for chunk in r.iter_content(1 << 20):
+                f.write(chunk)
+        tmp.replace(path)
+    return path
+
+
+def primary_counties(relationship_file: Path):
+    """{zcta: (county_fips, county_name)} choosing the county with the largest land overlap."""
+    best = {}
+    with open(relationship_file, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f, delimiter='|'):
+            zcta = (row.get('GEOID_ZCTA5_20') or '').strip()
+            county_fips = (row.get('GEOID_COUNTY_20') or '').strip()
+            if not zcta or not county_fips:
+                continue  # county rows with no ZCTA
+            land = int(row.get('AREALAND_PART') or 0)
+            if zcta not in best or land > best[zcta][0]:
+                best[zcta] = (land, county_fips, (row.get('NAMELSAD_COUNTY_20') or '').strip() or None)
+    return {zcta: (fips, name) for zcta, (_, fips, name) in best.items()}
+
+
+def write_county_csv(counties, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['state_fips', 'county_fips', 'county_name', 'state_name'])
+        for (state_fips, county_fips), (name, state) in sorted(counties.items()):
+            writer.writerow([state_fips, county_fips, name, state])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline zip -> city/state/county reference table')
+    parser.add_argument('--relationship-file', help='Census ZCTA520 -> county20 relationship file (pipe-delimited)')
+    parser.add_argument('--county-file', help='Census national county file (pipe-delimited)')
+    parser.add_argument('--download', action='store_true', help='Download both Census files into data/reference/raw')
+    parser.add_argument('--output', default=Config.ZIP_REFERENCE_PATH)
+    parser.add_argument('--county-output', default=Config.COUNTY_FIPS_CSV)
+    args = parser.parse_args()
+
+    relationship_file = args.relationship_file
+    county_file = args.county_file
+    if args.download:
+        relationship_file = relationship_file or download(RELATIONSHIP_URL)
+        county_file = county_file or download(COUNTY_URL)
+
+    if county_file:
+        counties = load_county_fips_from_csv(county_file)
+        write_county_csv(counties, Path(args.county_output))
+        print(f"Wrote {len(counties)} counties to {args.county_output}")
+
+    table = reference_from_zipcodes_package(args.county_output)
+    print(f"{len(table)} zips from the zipcodes package")
+
+    if relationship_file:
+        assigned = added = 0
+        for zcta, (fips, county_name) in primary_counties(Path(relationship_file)).items():
+            state = STATE_FIPS_TO_CODE.get(fips[:2])
+            ref = table.get(zcta)
+            if ref is None:
+                table[zcta] = ZipReference(zcta, None, state, county_name, fips)
+                added += 1
+            else:
+                table[zcta] = ref._replace(county_fips=fips, county=county_name or ref.county, state=ref.state or state)
+            assigned += 1
+        print(f"County FIPS assigned to {assigned} ZCTAs ({added} not in the zipcodes package)")
+
+    write_reference_file(args.output, table)
+    with_fips = sum(1 for ref in table.values() if ref.county_fips)
+    print(f"Wrote {len(table)} zips ({with_fips} with county FIPS) to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,13 @@
 """Bulk import school data from Apify for major US cities/metro areas."""
 import sys
 import os
-import time
 import argparse
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal
-from backend.models import SchoolData
+from backend.school_ingest import ingest_apify_results
 from backend.apify_client import ApifySchoolClient
+from backend.apify_jobs import ImportLedger, ApifyRunScheduler, QuadtreePlanner
 from config.config import Config
 
 # North Carolina and South Carolina - Complete State Coverage
@@ -102,147 +102,7 @@ def import_schools_for_metro(name, north_lat, south_lat, east_lng, west_lng):
             include_charter=True,
             include_unrated=False
         )
-        
-        print(f"Found {len(schools)} schools")
-        
-        if not schools:
-            print(f"WARNING: No schools found for {name}")
-            return 0
-        
-        # Save to database
-        db = SessionLocal()
-        added = 0
-        updated = 0
-        skipped = 0
-        
-        # Group schools by exact location (same coordinates = same school building)
-        # A school building might have multiple levels (e.g., K-12 school)
-        location_schools = {}  # key: (lat, lng), value: dict with all levels
-        
-        for school in schools:
-            # Extract data
-            school_name = school.get('schoolName', '')
-            gs_rating = school.get('gsRating')
-            school_levels = school.get('schoolLevels', [])
-            lat = school.get('latitude')
-            lng = school.get('longitude')
-            school_address = school.get('address', '')
-            
-            if not lat or not lng or not gs_rating:
-                skipped += 1
-                continue
-            
-            # Round to 4 decimal places (~36 feet precision) to group same building
-            lat_key = round(lat, 4)
-            lng_key = round(lng, 4)
-            location_key = (lat_key, lng_key)
-            
-            if location_key not in location_schools:
-                location_schools[location_key] = {
-                    'lat': lat,
-                    'lng': lng,
-                    'elementary': None,
-                    'middle': None,
-                    'high': None,
-                    'address': school_address
-                }
-            
-            # Store school by level (keep highest rating if multiple schools at same location)
-            for level in school_levels:
-                level_str = str(level).lower()
-                current = location_schools[location_key].get(level_str)
-                
-                if not current or gs_rating > current.get('rating', 0):
-                    location_schools[location_key][level_str] = {
-                        'name': school_name,
-                        'rating': gs_rating,
-                        'address': school_address
-                    }
-        
-        # Save grouped schools to database
-        for (lat_key, lng_key), school_data in location_schools.items():
-            # Check if we already have a record at this exact location
-            existing = db.query(SchoolData).filter(
-                SchoolData.latitude.between(school_data['lat'] - 0.0001, school_data['lat'] + 0.0001),
-                SchoolData.longitude.between(school_data['lng'] - 0.0001, school_data['lng'] + 0.0001)
-            ).first()
-            
-            if existing:
-                # Update with any new/better ratings
-                updated_fields = False
-                if school_data.get('elementary') and (not existing.elementary_school_rating or 
-                                                       school_data['elementary']['rating'] > existing.elementary_school_rating):
-                    existing.elementary_school_name = school_data['elementary']['name']
-                    existing.elementary_school_rating = school_data['elementary']['rating']
-                    existing.elementary_school_address = school_data['elementary']['address']
-                    updated_fields = True
-                if school_data.get('middle') and (not existing.middle_school_rating or 
-                                                  school_data['middle']['rating'] > existing.middle_school_rating):
-                    existing.middle_school_name = school_data['middle']['name']
-                    existing.middle_school_rating = school_data['middle']['rating']
-                    existing.middle_school_address = school_data['middle']['address']
-                    updated_fields = True
-                if school_data.get('high') and (not existing.high_school_rating or 
-                                               school_data['high']['rating'] > existing.high_school_rating):
-                    existing.high_school_name = school_data['high']['name']
-                    existing.high_school_rating = school_data['high']['rating']
-                    existing.high_school_address = school_data['high']['address']
-                    updated_fields = True
-                
-                # Recalculate blended score
-                ratings = []
-                if existing.elementary_school_rating:
-                    ratings.append(existing.elementary_school_rating)
-                if existing.middle_school_rating:
-                    ratings.append(existing.middle_school_rating)
-                if existing.high_school_rating:
-                    ratings.append(existing.high_school_rating)
-                existing.blended_school_score = sum(ratings) / len(ratings) if ratings else None
-                
-                if updated_fields:
-                    updated += 1
-            else:
-                # Create new record
-                elem = school_data.get('elementary') or {}
-                mid = school_data.get('middle') or {}
-                high = school_data.get('high') or {}
-                
-                # Calculate blended score
-                ratings = []
-                if elem and elem.get('rating'):
-                    ratings.append(elem['rating'])
-                if mid and mid.get('rating'):
-                    ratings.append(mid['rating'])
-                if high and high.get('rating'):
-                    ratings.append(high['rating'])
-                blended = sum(ratings) / len(ratings) if ratings else None
-                
-                new_school = SchoolData(
-                    latitude=school_data['lat'],
-                    longitude=school_data['lng'],
-                    elementary_school_name=elem.get('name') if elem else None,
-                    elementary_school_rating=elem.get('rating') if elem else None,
-                    elementary_school_address=elem.get('address') if elem else None,
-                    middle_school_name=mid.get('name') if mid else None,
-                    middle_school_rating=mid.get('rating') if mid else None,
-                    middle_school_address=mid.get('address') if mid else None,
-                    high_school_name=high.get('name') if high else None,
-                    high_school_rating=high.get('rating') if high else None,
-                    high_school_address=high.get('address') if high else None,
-                    blended_school_score=blended
-                )
-                db.add(new_school)
-                added += 1
-                
-                # Commit in batches for performance
-                if (added + updated) % 50 == 0:
-                    db.commit()
-        
-        db.commit()
-        db.close()
-        
-        print(f"Added: {added}, Updated: {updated}, Skipped: {skipped}")
-        return added + updated
+        return save_schools(name, schools)
         
     except Exception as e:
         print(f"ERROR importing {name}: {e}")
@@ -250,6 +110,31 @@ def import_schools_for_metro(name, north_lat, south_lat, east_lng, west_lng):
         traceback.print_exc()
         return 0
 
+def save_schools(name, schools):
+    """
+    Save Apify results for one region to school_data. Results are deduped in memory
+    (normalized name, level, rounded location) and bulk upserted on school_data.location_key.
+    Returns number of rows added or updated.
+    """
+    print(f"Found {len(schools)} schools")
+    
+    if not schools:
+        print(f"WARNING: No schools found for {name}")
+        return 0
+    
+    db = SessionLocal()
+    try:
+        counts = ingest_apify_results(db, schools)
+        db.commit()
+        print(f"Added: {counts['inserted']}, Updated: {counts['updated']}, Skipped: {counts['skipped']} "
+              f"({counts['locations']} unique locations)")
+        return counts['inserted'] + counts['updated']
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 def estimate_cost():
     """Estimate the cost of importing all schools in NC and SC."""
     print("\n" + "=" * 60)
@@ -304,23 +189,38 @@ def main():
     """Import schools for all NC and SC regions."""
     parser = argparse.ArgumentParser(description='Bulk import school data for NC and SC')
     parser.add_argument('--yes', '-y', action='store_true', help='Skip confirmation prompt')
-    parser.add_argument('--no-subdivide', action='store_true', help='Use original large regions instead of subdivided')
+    parser.add_argument('--no-subdivide', action='store_true', help='Use original large regions and never split them')
+    parser.add_argument('--grid', action='store_true', help='Use the fixed 3x3 grid per region instead of adaptive splitting')
+    parser.add_argument('--result-cap', type=int, default=50, help='Max results the actor returns per query')
+    parser.add_argument('--max-concurrent', type=int, default=Config.APIFY_MAX_CONCURRENT_RUNS,
+                        help='Max actor runs in flight at once (Apify concurrency budget)')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between status polls of running actor runs')
+    parser.add_argument('--ledger', default='data/apify_import_ledger.sqlite',
+                        help='Job ledger file; re-running with the same ledger resumes where it left off')
+    parser.add_argument('--retry-failed', action='store_true', help='Retry regions marked failed in the ledger')
     args = parser.parse_args()
     
     print("Bulk School Data Import - North Carolina & South Carolina")
     print("=" * 60)
     
-    # Generate regions (subdivided by default, or original if --no-subdivide)
+    # Generate regions: adaptive quadtree by default, fixed 3x3 grid with --grid, original with --no-subdivide
+    planner = None
     if args.no_subdivide:
         regions_to_process = NC_SC_REGIONS
         print("Using ORIGINAL large regions")
         print(f"This will process {len(regions_to_process)} regions")
         print(f"Estimated time: ~20-30 minutes")
-    else:
+    elif args.grid:
         regions_to_process = generate_all_sub_regions()
         print("Using SUBDIVIDED regions (3x3 grid per main region)")
         print(f"This will process {len(regions_to_process)} sub-regions (9x more than original)")
         print(f"Estimated time: ~90-150 minutes ({len(regions_to_process)} regions × 30-60 seconds)")
+    else:
+        regions_to_process = NC_SC_REGIONS
+        planner = QuadtreePlanner(cap=args.result_cap)
+        print("Using ADAPTIVE regions (quadtree split when a query returns "
+              f">= {planner.threshold} of the {args.result_cap}-result cap)")
+        print(f"Starting from {len(regions_to_process)} regions; dense areas are split until no box is truncated")
     
     print("=" * 60)
     
@@ -346,29 +246,38 @@ def main():
         print("ERROR: APIFY_API_TOKEN not set in .env file")
         return
     
-    total_imported = 0
-    total_cost = 0.0
-    cost_per_school = 0.02
-    
-    for i, (name, north, south, east, west) in enumerate(regions_to_process, 1):
-        print(f"\n[{i}/{len(regions_to_process)}] Processing: {name}")
-        count = import_schools_for_metro(name, north, south, east, west)
-        total_imported += count
-        region_cost = count * cost_per_school
-        total_cost += region_cost
+    ledger = ImportLedger(args.ledger)
+    try:
+        added = ledger.add_regions(regions_to_process)
+        if args.retry_failed:
+            print(f"Retrying {ledger.reset_failed()} failed region(s)")
+        print(f"Ledger {args.ledger}: {added} new region(s); state counts: {ledger.counts()}")
         
-        print(f"Region cost: ${region_cost:.2f} ({count} schools)")
-        print(f"Running total: {total_imported} schools, ${total_cost:.2f}")
+        scheduler = ApifyRunScheduler(
+            client=ApifySchoolClient(),
+            ledger=ledger,
+            on_results=save_schools,
+            max_concurrent=args.max_concurrent,
+            poll_interval=args.poll_interval,
+            planner=planner,
+        )
+        counts = scheduler.run()
         
-        # Rate limiting - wait between regions to avoid overwhelming Apify
-        if i < len(regions_to_process):
-            print(f"\nWaiting 10 seconds before next region...")
-            time.sleep(10)
+        cost_per_school = 0.02
+        done = ledger.regions('done')
+        total_imported = sum(r['saved_count'] or 0 for r in done)
+        split = sum(1 for r in done if r['split'])
+        total_cost = sum(r['result_count'] or 0 for r in done) * cost_per_school  # Apify bills per result
+    finally:
+        ledger.close()
     
     print(f"\n{'='*60}")
     print(f"Import complete!")
+    print(f"Regions: {counts} ({split} split for hitting the result cap)")
     print(f"Total schools imported: {total_imported}")
     print(f"Total cost: ${total_cost:.2f}")
+    if counts.get('failed'):
+        print(f"Re-run with --retry-failed to retry {counts['failed']} failed region(s)")
     print(f"{'='*60}")
 
 if __name__ == '__main__':
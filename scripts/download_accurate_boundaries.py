@@ -1,25 +1,42 @@
 """
 Download accurate zip code boundaries from Census TIGERweb.
 This is the OFFICIAL source for ZCTA (Zip Code Tabulation Area) boundaries.
+
+Zips are fetched in batches (`ZCTA5 IN (...)`, one request per batch) by a small thread pool that
+shares a token-bucket rate limit and keep-alive connections. Each boundary is written atomically
+and every finished batch is appended to a resume manifest, so an interrupted run picks up where it
+stopped. Use --pack to rebuild the packed boundary store afterwards.
+
+Test offline against scripts/fake_arcgis_server.py by setting TIGERWEB_BASE_URL.
 """
 import sys
 import os
-import requests
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+
+import requests
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.database import SessionLocal
-from backend.models import CensusData
+from config.config import Config
+from backend.tigerweb_client import TigerwebZctaClient, TokenBucket
 
 BOUNDARIES_DIR = Path('data/zip_boundaries')
 BOUNDARIES_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST_PATH = Path('data/boundary_download_manifest.jsonl')
+
+# Manifest statuses
+DOWNLOADED = 'downloaded'
+NOT_FOUND = 'not_found'
 
 def get_zip_codes_from_database(limit=None):
     """Get all unique zip codes from database."""
+    from backend.database import SessionLocal
+    from backend.models import CensusData
     db = SessionLocal()
     try:
         query = db.query(CensusData.zip_code).distinct()
@@ -30,115 +47,144 @@ def get_zip_codes_from_database(limit=None):
     finally:
         db.close()
 
-def download_from_census_tigerweb(zip_code: str) -> Tuple[bool, str]:
+def write_boundary(zip_code: str, geojson: Dict, boundaries_dir: Path = BOUNDARIES_DIR) -> None:
+    """Write {zip}.geojson atomically (temp file + rename), so readers never see a partial file."""
+    path = boundaries_dir / f"{zip_code}.geojson"
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(geojson, f)
+    os.replace(tmp, path)
+
+
+class DownloadManifest:
+    """Append-only JSON-lines record of finished zips ({"zip": ..., "status": ...}); last entry wins."""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def load(self) -> Dict[str, str]:
+        status = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    status[entry['zip']] = entry['status']
+        return status
+
+    def record(self, entries: Dict[str, str]) -> None:
+        with self.lock, open(self.path, 'a') as f:
+            for zip_code, status in entries.items():
+                f.write(json.dumps({'zip': zip_code, 'status': status}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def download_from_census_tigerweb(zip_code: str, client: TigerwebZctaClient = None) -> Tuple[bool, str]:
     """
     Download boundary from Census TIGERweb (OFFICIAL source).
     Returns: (success, message)
     """
-    # Check if already exists
     file_path = BOUNDARIES_DIR / f"{zip_code}.geojson"
     if file_path.exists():
         return True, "already_exists"
-    
-    # Census TIGERweb REST API endpoints (ZCTA layer is 2, not 82!)
-    endpoints = [
-        "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_Current/MapServer/2/query",
-        "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_ACS2022/MapServer/2/query",
-        "https://tigerweb.geo.census.gov/arcgis/rest/services/TIGERweb/tigerWMS_ACS2021/MapServer/2/query",
-    ]
-    
-    # Try different query formats
-    where_clauses = [
-        f"ZCTA5='{zip_code}'",
-        f"ZCTA5 = '{zip_code}'",
-        f"ZCTA5CE10='{zip_code}'",
-        f"ZCTA5CE10 = '{zip_code}'",
-    ]
-    
-    for endpoint in endpoints:
-        for where_clause in where_clauses:
-            try:
-                params = {
-                    'where': where_clause,
-                    'outFields': '*',
-                    'f': 'geojson',
-                    'outSR': '4326',
-                    'returnGeometry': 'true'
-                }
-                
-                response = requests.get(endpoint, params=params, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Validate response has features
-                    if 'features' in data and isinstance(data['features'], list) and len(data['features']) > 0:
-                        feature = data['features'][0]
-                        
-                        # Validate it's actually a polygon
-                        if 'geometry' in feature:
-                            geometry = feature['geometry']
-                            if geometry.get('type') in ['Polygon', 'MultiPolygon']:
-                                # Save to file
-                                with open(file_path, 'w') as f:
-                                    json.dump(data, f)
-                                return True, "census_tigerweb"
-                
-            except requests.exceptions.Timeout:
-                continue
-            except requests.exceptions.RequestException:
-                continue
-            except Exception as e:
-                continue
-    
-    return False, "not_found"
+    client = client or TigerwebZctaClient()
+    try:
+        found = client.fetch([zip_code])
+    except requests.exceptions.RequestException:
+        return False, "error"
+    if zip_code not in found:
+        return False, "not_found"
+    write_boundary(zip_code, found[zip_code])
+    return True, "census_tigerweb"
+
 
-def batch_download(zip_codes: List[str], delay: float = 0.5):
+def batch_download(
+    zip_codes: List[str],
+    workers: int = 4,
+    batch_size: int = 50,
+    rate: float = None,
+    manifest_path: Path = MANIFEST_PATH,
+    retry_not_found: bool = False,
+    base_url: str = None,
+    boundaries_dir: Path = BOUNDARIES_DIR,
+):
     """
-    Download boundaries for all zip codes.
-    delay: seconds to wait between requests (to avoid rate limiting)
+    Download boundaries for all zip codes, batch_size zips per TIGERweb request, with `workers`
+    batches in flight and at most `rate` requests/second overall.
+    Zips that already have a file are skipped; so are zips the manifest marks not found
+    (unless retry_not_found). Batches that error are not recorded and are retried on the next run.
     """
+    rate = Config.TIGERWEB_REQUESTS_PER_SECOND if rate is None else rate
+    boundaries_dir = Path(boundaries_dir)
+    boundaries_dir.mkdir(parents=True, exist_ok=True)
+    manifest = DownloadManifest(manifest_path)
+    previous = manifest.load()
+
+    zip_codes = list(dict.fromkeys(str(z).strip()[:5] for z in zip_codes if z))
     total = len(zip_codes)
-    success = 0
-    already_exists = 0
-    failed = []
-    
+    already_exists = sum(1 for z in zip_codes if (boundaries_dir / f"{z}.geojson").exists())
+    known_missing = [
+        z for z in zip_codes
+        if not (boundaries_dir / f"{z}.geojson").exists() and previous.get(z) == NOT_FOUND and not retry_not_found
+    ]
+    skip = set(known_missing)
+    todo = [z for z in zip_codes if z not in skip and not (boundaries_dir / f"{z}.geojson").exists()]
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
     print(f"\n{'='*70}")
     print(f"Downloading accurate boundaries from Census TIGERweb")
-    print(f"Total zip codes: {total}")
+    print(f"Total zip codes: {total} | already on disk: {already_exists} | known not found: {len(known_missing)}")
+    print(f"To fetch: {len(todo)} in {len(batches)} batch(es) of up to {batch_size} "
+          f"({workers} workers, {rate:g} req/s)")
     print(f"{'='*70}\n")
-    
-    for i, zip_code in enumerate(zip_codes, 1):
-        status, message = download_from_census_tigerweb(zip_code)
-        
-        if status:
-            if message == "already_exists":
-                already_exists += 1
-                print(f"[{i:4d}/{total}] {zip_code}: [OK] Already exists")
-            else:
-                success += 1
-                print(f"[{i:4d}/{total}] {zip_code}: [OK] Downloaded from Census")
-        else:
-            failed.append(zip_code)
-            print(f"[{i:4d}/{total}] {zip_code}: [FAIL] Not found")
-        
-        # Rate limiting - be nice to Census servers
-        if i < total:
-            time.sleep(delay)
-        
-        # Progress update every 50
-        if i % 50 == 0:
-            print(f"\nProgress: {i}/{total} ({i*100//total}%) | Success: {success} | Failed: {len(failed)}\n")
-    
+
+    client = TigerwebZctaClient(base_url=base_url, limiter=TokenBucket(rate), pool_size=workers)
+    success = 0
+    failed = list(known_missing)
+    errored: List[str] = []
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(client.fetch, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            batch = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                errored.extend(batch)
+                print(f"[{done:4d}/{len(batches)}] batch of {len(batch)} FAILED: {e}")
+                continue
+            entries = {}
+            for zip_code in batch:
+                if zip_code in found:
+                    write_boundary(zip_code, found[zip_code], boundaries_dir)
+                    entries[zip_code] = DOWNLOADED
+                else:
+                    entries[zip_code] = NOT_FOUND
+                    failed.append(zip_code)
+            manifest.record(entries)
+            success += len(found)
+            elapsed = time.time() - started
+            print(f"[{done:4d}/{len(batches)}] {len(found)}/{len(batch)} found | "
+                  f"downloaded {success}, not found {len(failed)}, errors {len(errored)} | {elapsed:.1f}s")
+
     print(f"\n{'='*70}")
     print(f"DOWNLOAD COMPLETE")
     print(f"{'='*70}")
     print(f"Successfully downloaded: {success}")
     print(f"Already existed: {already_exists}")
     print(f"Not found: {len(failed)}")
+    if errored:
+        print(f"Errored (re-run to retry): {len(errored)}")
     print(f"Total with boundaries: {success + already_exists}/{total}")
-    print(f"\nBoundaries saved to: {BOUNDARIES_DIR.absolute()}")
-    
+    print(f"\nBoundaries saved to: {boundaries_dir.absolute()}")
+    print(f"Resume manifest: {Path(manifest_path).absolute()}")
+
     if failed:
         print(f"\n[WARNING] {len(failed)} zip codes not found:")
         if len(failed) <= 20:
@@ -146,8 +192,8 @@ def batch_download(zip_codes: List[str], delay: float = 0.5):
         else:
             print(", ".join(failed[:20]) + f" ... and {len(failed) - 20} more")
         print("\nThese will use approximate boundaries (rectangles) on the map.")
-    
-    return success, already_exists, len(failed)
+
+    return success, already_exists, len(failed) + len(errored)
 
 if __name__ == '__main__':
     import argparse
@@ -165,11 +211,21 @@ Examples:
   
   # Download first 100 zip codes (for testing)
   python scripts/download_accurate_boundaries.py --limit 100
+  
+  # Faster, then rebuild the packed boundary store
+  python scripts/download_accurate_boundaries.py --workers 8 --rate 8 --pack
         """
     )
     parser.add_argument('--limit', type=int, help='Limit number of zip codes to process')
     parser.add_argument('--zip-codes', nargs='+', help='Specific zip codes to download')
-    parser.add_argument('--delay', type=float, default=0.5, help='Delay between requests (seconds)')
+    parser.add_argument('--workers', type=int, default=4, help='Batches in flight at once')
+    parser.add_argument('--batch-size', type=int, default=50, help='Zips per TIGERweb request')
+    parser.add_argument('--rate', type=float, default=Config.TIGERWEB_REQUESTS_PER_SECOND,
+                        help='Max TIGERweb requests per second (all workers combined)')
+    parser.add_argument('--manifest', default=str(MANIFEST_PATH), help='Resume manifest path')
+    parser.add_argument('--retry-not-found', action='store_true',
+                        help='Query zips the manifest already marks as not found')
+    parser.add_argument('--pack', action='store_true', help='Rebuild the packed boundary store when done')
     parser.add_argument('--yes', '-y', action='store_true', help='Skip confirmation prompt')
     
     args = parser.parse_args()
@@ -188,13 +244,26 @@ Examples:
     # Ask for confirmation if processing many
     if len(zip_codes) > 50 and not args.yes:
         print(f"\n[WARNING] This will download boundaries for {len(zip_codes)} zip codes.")
-        print(f"   Estimated time: ~{len(zip_codes) * args.delay / 60:.1f} minutes")
+        requests_needed = -(-len(zip_codes) // max(1, args.batch_size))
+        print(f"   About {requests_needed} TIGERweb request(s); at least {requests_needed / max(args.rate, 0.01) / 60:.1f} minutes")
         response = input(f"\nContinue? (y/N): ")
         if response.lower() != 'y':
             print("Cancelled.")
             sys.exit(0)
     
-    success, exists, failed = batch_download(zip_codes, delay=args.delay)
+    success, exists, failed = batch_download(
+        zip_codes,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        rate=args.rate,
+        manifest_path=Path(args.manifest),
+        retry_not_found=args.retry_not_found,
+    )
+    
+    if args.pack:
+        from backend.boundary_store import pack_directory
+        counts = pack_directory(str(BOUNDARIES_DIR), Config.ZIP_BOUNDARY_STORE)
+        print(f"\n[INFO] Packed {counts['packed']} boundaries into {Config.ZIP_BOUNDARY_STORE}")
     
     print(f"\n[SUCCESS] Complete! {success + exists}/{len(zip_codes)} zip codes now have accurate boundaries.")
     print(f"   Refresh your map to see the accurate shapes!")
@@ -0,0 +1,170 @@
+"""
+Local fake Apify API for exercising the bulk school import without spending credits.
+
+Implements the three endpoints ApifySchoolClient uses:
+  POST /acts/<actor>/runs                   -> start a run (returns run id)
+  GET  /actor-runs/<run_id>                 -> run status (SUCCEEDED after --delay seconds)
+  GET  /actor-runs/<run_id>/dataset/items   -> synthetic schools inside the run's bounding box
+
+Schools are generated once from a fixed seed over NC/SC (denser around Charlotte, Raleigh and
+Columbia), and each run returns at most --cap of them, like the real actor.
+
+Usage:
+    python scripts/fake_apify_server.py --port 8765
+    APIFY_BASE_URL=http://127.0.0.1:8765 APIFY_API_TOKEN=fake python scripts/bulk_import_schools.py --yes --ledger data/fake_ledger.sqlite
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (lat, lng, spread in degrees, number of schools)
+_CLUSTERS = [
+    (35.23, -80.84, 0.35, 900),   # Charlotte
+    (35.80, -78.64, 0.35, 700),   # Raleigh / Triangle
+    (36.07, -79.79, 0.25, 300),   # Greensboro
+    (34.00, -81.03, 0.25, 350),   # Columbia
+    (32.78, -79.93, 0.20, 250),   # Charleston
+    (34.85, -82.39, 0.25, 250),   # Greenville
+]
+_RURAL_SCHOOLS = 1200
+_BOUNDS = (32.0, 36.6, -84.3, -75.5)  # south, north, west, east
+_LEVELS = [['elementary'], ['middle'], ['high'], ['elementary', 'middle'], ['middle', 'high']]
+
+
+def generate_schools(seed: int = 42):
+    """Deterministic synthetic schools shaped like the actor's dataset items."""
+    rng = random.Random(seed)
+    schools = []
+
+    def _add(lat, lng):
+        i = len(schools)
+        levels = rng.choice(_LEVELS)
+        schools.append({
+            'schoolName': f"Fake {levels[0].title()} School {i}",
+            'gsRating': rng.randint(1, 10),
+            'schoolLevels': levels,
+            'latitude': round(lat, 6),
+            'longitude': round(lng, 6),
+            'address': f"{100 + i} Main St, Testville, NC {27000 + i % 2000:05d}",
+        })
+
+    for lat, lng, spread, n in _CLUSTERS:
+        for _ in range(n):
+            _add(rng.gauss(lat, spread / 2), rng.gauss(lng, spread / 2))
+    south, north, west, east = _BOUNDS
+    for _ in range(_RURAL_SCHOOLS):
+        _add(rng.uniform(south, north), rng.uniform(west, east))
+    return schools
+
+
+class FakeApifyState:
+    """In-memory runs: run_id -> {input, started, fail}."""
+
+    def __init__(self, delay: float, cap: int, fail_rate: float, seed: int):
+        self.delay = delay
+        self.cap = cap
+        self.fail_rate = fail_rate
+        self.schools = generate_schools(seed)
+        self.runs = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed + 1)
+
+    def start(self, input_data):
+        run_id = uuid.uuid4().hex[:17]
+        with self.lock:
+            self.runs[run_id] = {
+                'input': input_data,
+                'started': time.monotonic(),
+                'fail': self.rng.random() < self.fail_rate,
+            }
+        return run_id
+
+    def status(self, run_id):
+        run = self.runs.get(run_id)
+        if run is None:
+            return None
+        if time.monotonic() - run['started'] < self.delay:
+            return 'RUNNING'
+        return 'FAILED' if run['fail'] else 'SUCCEEDED'
+
+    def items(self, run_id):
+        inp = self.runs[run_id]['input']
+        north, south = float(inp['northLatitude']), float(inp['southLatitude'])
+        east, west = float(inp['eastLongitude']), float(inp['westLongitude'])
+        found = [
+            s for s in self.schools
+            if south <= s['latitude'] <= north and west <= s['longitude'] <= east
+        ]
+        return found[:self.cap]
+
+
+def make_handler(state: FakeApifyState):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            path = self.path.split('?', 1)[0]
+            if re.search(r'/acts/[^/]+(/[^/]+)?/runs$', path):
+                length = int(self.headers.get('Content-Length') or 0)
+                input_data = json.loads(self.rfile.read(length) or b'{}')
+                run_id = state.start(input_data)
+                return self._send(201, {'data': {'id': run_id, 'status': 'RUNNING'}})
+            self._send(404, {'error': 'not found'})
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            m = re.search(r'/actor-runs/([^/]+)/dataset/items$', path)
+            if m:
+                if state.status(m.group(1)) != 'SUCCEEDED':
+                    return self._send(404, {'error': 'run not finished'})
+                return self._send(200, state.items(m.group(1)))
+            m = re.search(r'/actor-runs/([^/]+)$', path)
+            if m:
+                status = state.status(m.group(1))
+                if status is None:
+                    return self._send(404, {'error': 'run not found'})
+                return self._send(200, {'data': {'id': m.group(1), 'status': status}})
+            self._send(404, {'error': 'not found'})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8765, delay: float = 2.0, cap: int = 50, fail_rate: float = 0.0, seed: int = 42):
+    """Create the server (not started). Call serve_forever() or run it in a thread."""
+    state = FakeApifyState(delay=delay, cap=cap, fail_rate=fail_rate, seed=seed)
+    return ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Apify API')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=2.0, help='Seconds each run stays RUNNING')
+    parser.add_argument('--cap', type=int, default=50, help='Max results per run (real actor caps around 50)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of runs that end FAILED')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.delay, args.cap, args.fail_rate, args.seed)
+    print(f"Fake Apify API on http://127.0.0.1:{args.port} (delay={args.delay}s, cap={args.cap}, fail_rate={args.fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
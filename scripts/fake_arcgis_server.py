@@ -0,0 +1,137 @@
+"""
+Local fake TIGERweb (ArcGIS MapServer query) for exercising the boundary downloader offline.
+
+Serves POST/GET <base>/<service>/MapServer/2/query with `where=ZCTA5 IN ('28202',...)` and f=geojson.
+Each zip gets a small synthetic square. To exercise the downloader's edge cases:
+  - zips ending in 9 exist in no service (reported missing)
+  - zips ending in 7 are absent from tigerWMS_Current but present in tigerWMS_ACS2022 (older-vintage fallback)
+  - at most --max-records features per response, with exceededTransferLimit set when truncated
+  - --fail-rate of requests return HTTP 500 (retry path)
+
+Usage:
+    python scripts/fake_arcgis_server.py --port 8766
+    TIGERWEB_BASE_URL=http://127.0.0.1:8766/arcgis/rest/services/TIGERweb \
+        python scripts/download_accurate_boundaries.py --zip-codes 28202 28203 --yes
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_QUERY_PATH = re.compile(r'/([^/]+)/MapServer/2/query$')
+_ZIP_IN_WHERE = re.compile(r"'(\d{5})'")
+
+
+def zip_square(zip_code: str):
+    """Deterministic ~0.05 degree square somewhere in the lower 48 for a zip."""
+    n = int(zip_code)
+    lat = 25.0 + (n % 400) * 0.05
+    lng = -124.0 + (n // 400) * 0.025
+    d = 0.05
+    return {'type': 'Polygon', 'coordinates': [[[lng, lat], [lng + d, lat], [lng + d, lat + d], [lng, lat + d], [lng, lat]]]}
+
+
+def zip_exists(service: str, zip_code: str) -> bool:
+    if zip_code.endswith('9'):
+        return False
+    if zip_code.endswith('7') and service == 'tigerWMS_Current':
+        return False
+    return True
+
+
+class FakeArcgisState:
+    def __init__(self, delay: float, max_records: int, fail_rate: float, seed: int):
+        self.delay = delay
+        self.max_records = max_records
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            return self.rng.random() < self.fail_rate
+
+
+def make_handler(state: FakeArcgisState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, params):
+            m = _QUERY_PATH.search(urlparse(self.path).path)
+            if not m:
+                return self._send(404, {'error': {'code': 404, 'message': 'not found'}})
+            if state.delay:
+                time.sleep(state.delay)
+            if state.should_fail():
+                return self._send(500, {'error': {'code': 500, 'message': 'simulated failure'}})
+            service = m.group(1)
+            where = (params.get('where') or [''])[0]
+            zips = list(dict.fromkeys(_ZIP_IN_WHERE.findall(where)))
+            present = [z for z in zips if zip_exists(service, z)]
+            page = present[:state.max_records]
+            payload = {
+                'type': 'FeatureCollection',
+                'features': [
+                    {'type': 'Feature', 'geometry': zip_square(z), 'properties': {'ZCTA5': z, 'GEOID': z}}
+                    for z in page
+                ],
+            }
+            if len(present) > len(page):
+                payload['exceededTransferLimit'] = True
+            self._send(200, payload)
+
+        def do_GET(self):
+            self._handle(parse_qs(urlparse(self.path).query))
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self._handle(parse_qs(self.rfile.read(length).decode('utf-8')))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8766, delay: float = 0.0, max_records: int = 40, fail_rate: float = 0.0, seed: int = 7):
+    """Create the server (not started). Call serve_forever() or run it in a thread."""
+    state = FakeArcgisState(delay=delay, max_records=max_records, fail_rate=fail_rate, seed=seed)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake TIGERweb ArcGIS server')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds per response')
+    parser.add_argument('--max-records', type=int, default=40, help='Max features per response (maxRecordCount)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.delay, args.max_records, args.fail_rate, args.seed)
+    print(f"Fake TIGERweb on http://127.0.0.1:{args.port}/arcgis/rest/services/TIGERweb "
+          f"(delay={args.delay}s, max_records={args.max_records}, fail_rate={args.fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
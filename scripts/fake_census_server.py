@@ -0,0 +1,92 @@
+"""
+Local fake Census Data API (ACS 5-year) for exercising CensusAPIClient and /api/census-data/fetch offline.
+
+Serves GET <base>/<year>/<dataset>?get=NAME,B01001_001E,...&for=zip code tabulation area:28202,28203
+(or :*) with the API's JSON table shape (header row, then one row per ZCTA). Values are
+deterministic per zip; zips ending in 9 are unknown (no row), like ZCTAs the ACS doesn't publish.
+
+Usage:
+    python scripts/fake_census_server.py --port 8767
+    CENSUS_API_BASE_URL=http://127.0.0.1:8767/data python app.py
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_ALL_ZIPS = [f"{n:05d}" for n in range(28001, 28999, 7)]  # answer for 'for=zip code tabulation area:*'
+
+
+def variable_value(zip_code: str, variable: str):
+    """Deterministic plausible value for an ACS variable."""
+    rng = random.Random(f"{zip_code}:{variable}")
+    if variable == 'NAME':
+        return f"ZCTA5 {zip_code}"
+    if variable == 'B01002_001E':
+        return f"{rng.uniform(25, 55):.1f}"
+    if variable == 'B19013_001E':
+        return str(rng.randrange(30000, 180000))
+    if variable == 'B01001_001E':
+        return str(rng.randrange(500, 60000))
+    return str(rng.randrange(0, 20000))
+
+
+def make_handler(delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            variables = (params.get('get') or [''])[0].split(',')
+            geography = (params.get('for') or [''])[0]
+            if not variables[0] or not geography.startswith('zip code tabulation area:'):
+                return self._send(400, {'error': 'error: unknown/unsupported geography hierarchy'})
+            if delay:
+                time.sleep(delay)
+            requested = geography.split(':', 1)[1]
+            zips = _ALL_ZIPS if requested == '*' else [z.strip() for z in requested.split(',') if z.strip()]
+            rows = [[variable_value(z, v) for v in variables] + [z] for z in zips if not z.endswith('9')]
+            if not rows:
+                self.send_response(204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._send(200, [variables + ['zip code tabulation area']] + rows)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8767, delay: float = 0.0):
+    """Create the server (not started). Call serve_forever() or run it in a thread."""
+    return ThreadingHTTPServer(('127.0.0.1', port), make_handler(delay))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Census Data API')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds per response')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.delay)
+    print(f"Fake Census API on http://127.0.0.1:{args.port}/data (delay={args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
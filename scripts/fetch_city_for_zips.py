@@ -2,6 +2,9 @@
 Populate census_data.city using the free Zippopotam.us API (zip → place name).
 No API key required. Results are cached locally so re-runs don't re-fetch.
 
+Faster: scripts/fill_census_locations.py fills city for every zip from the offline reference
+table in one UPDATE; use this script only for zips that table doesn't cover.
+
 Usage:
   python scripts/fetch_city_for_zips.py              # all zips in census_data
   python scripts/fetch_city_for_zips.py --limit 50   # first 50 (test)
@@ -0,0 +1,86 @@
+"""
+Fill census_data.city / county / state from the offline zip reference table in one set-based UPDATE
+(replaces the per-zip HTTP lookups in fetch_city_for_zips.py and fetch_county_for_zips.py).
+
+The whole reference table for the zips in census_data is sent as parallel arrays and joined with
+unnest(), so the database does a single UPDATE ... FROM instead of one statement per zip. Columns
+that don't exist in the table yet (city/state migrations) are skipped.
+
+Usage:
+  python scripts/fill_census_locations.py                 # overwrite city, county, state
+  python scripts/fill_census_locations.py --missing-only  # only fill empty values
+  python scripts/fill_census_locations.py --columns city  # just city
+  python scripts/fill_census_locations.py --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from backend.database import SessionLocal
+from backend.zip_reference import lookup_zips
+
+COLUMNS = ('city', 'county', 'state')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill census_data city/county/state from the offline zip reference')
+    parser.add_argument('--columns', nargs='+', choices=COLUMNS, default=list(COLUMNS))
+    parser.add_argument('--missing-only', action='store_true', help="Keep values that are already set")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would change; don't write")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        existing = {r[0] for r in db.execute(text(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'census_data'"
+        )).fetchall()}
+        columns = [c for c in args.columns if c in existing]
+        for c in args.columns:
+            if c not in existing:
+                print(f"[WARNING] census_data.{c} does not exist - skipping (run its migration first)")
+        if not columns:
+            sys.exit(1)
+
+        zips = [r[0] for r in db.execute(text("SELECT zip_code FROM census_data")).fetchall()]
+        refs = lookup_zips(zips)
+        # Key by the stored zip_code so the join matches rows stored as ZIP+4 or with whitespace
+        rows = [(z, refs[key]) for z in zips for key in [str(z).strip()[:5]] if key in refs]
+        print(f"{len(zips)} zips in census_data, {len(rows)} found in the reference table")
+
+        params = {'zips': [z for z, _ in rows]}
+        assignments, changed = [], []
+        for c in columns:
+            params[c] = [getattr(ref, c) for _, ref in rows]
+            value = f"COALESCE(NULLIF(TRIM(c.{c}), ''), r.{c})" if args.missing_only else f"COALESCE(r.{c}, c.{c})"
+            assignments.append(f"{c} = {value}")
+            changed.append(f"c.{c} IS DISTINCT FROM {value}")
+        source = (
+            "unnest(CAST(:zips AS text[]), " + ', '.join(f"CAST(:{c} AS text[])" for c in columns) + ")"
+            f" AS r(zip_code, {', '.join(columns)})"
+        )
+        where = f"c.zip_code = r.zip_code AND ({' OR '.join(changed)})"
+
+        started = time.time()
+        if args.dry_run:
+            count = db.execute(text(f"SELECT COUNT(*) FROM census_data c, {source} WHERE {where}"), params).scalar()
+            print(f"[DRY RUN] Would update {count} rows ({', '.join(columns)})")
+        else:
+            result = db.execute(text(
+                f"UPDATE census_data c SET {', '.join(assignments)} FROM {source} WHERE {where}"
+            ), params)
+            db.commit()
+            print(f"Updated {result.rowcount} rows ({', '.join(columns)}) in {time.time() - started:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
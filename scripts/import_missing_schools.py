@@ -6,6 +6,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.database import SessionLocal
 from backend.models import SchoolData, AttendanceZone
 from backend.apify_client import ApifySchoolClient
+from backend.school_ingest import ingest_apify_results
 from sqlalchemy import func, or_, and_
 from config.config import Config
 
@@ -107,112 +108,13 @@ def import_schools_for_charlotte():
             print("[ERROR] No schools returned from Apify")
             return
         
-        # Process and store schools
+        # Process and store schools (deduped in memory, bulk upsert on school_data.location_key)
         db = SessionLocal()
         try:
-            added = 0
-            updated = 0
-            skipped = 0
-            
             print(f"\n[STEP 3] Processing and storing schools...")
-            
-            for i, school in enumerate(schools, 1):
-                if i % 10 == 0:
-                    print(f"  Processing: {i}/{len(schools)}...")
-                
-                try:
-                    # Extract school data from Apify response
-                    # Apify returns different field names - try multiple
-                    school_name = (
-                        school.get('name') or 
-                        school.get('schoolName') or 
-                        school.get('title') or
-                        'Unknown'
-                    )
-                    
-                    rating = school.get('rating') or school.get('schoolRating')
-                    
-                    # Get coordinates
-                    lat = school.get('latitude') or school.get('lat') or school.get('y')
-                    lng = school.get('longitude') or school.get('lng') or school.get('lon') or school.get('x')
-                    
-                    if not lat or not lng:
-                        skipped += 1
-                        continue
-                    
-                    # Get school level
-                    school_levels = school.get('schoolLevels', [])
-                    if isinstance(school_levels, str):
-                        school_levels = [school_levels]
-                    
-                    # Find or create SchoolData record
-                    # Use coordinates to find existing record
-                    existing = db.query(SchoolData).filter(
-                        SchoolData.latitude.between(float(lat) - 0.001, float(lat) + 0.001),
-                        SchoolData.longitude.between(float(lng) - 0.001, float(lng) + 0.001)
-                    ).first()
-                    
-                    if existing:
-                        # Update existing record
-                        updated_fields = False
-                        
-                        # Update by school level
-                        if 'elementary' in str(school_levels).lower() and not existing.elementary_school_name:
-                            existing.elementary_school_name = school_name
-                            existing.elementary_school_rating = float(rating) if rating else None
-                            updated_fields = True
-                        
-                        if 'middle' in str(school_levels).lower() and not existing.middle_school_name:
-                            existing.middle_school_name = school_name
-                            existing.middle_school_rating = float(rating) if rating else None
-                            updated_fields = True
-                        
-                        if 'high' in str(school_levels).lower() and not existing.high_school_name:
-                            existing.high_school_name = school_name
-                            existing.high_school_rating = float(rating) if rating else None
-                            updated_fields = True
-                        
-                        if updated_fields:
-                            updated += 1
-                        else:
-                            skipped += 1
-                    else:
-                        # Create new record
-                        new_school = SchoolData(
-                            latitude=float(lat),
-                            longitude=float(lng),
-                            address=None  # Apify may not provide full address
-                        )
-                        
-                        # Set school data by level
-                        if 'elementary' in str(school_levels).lower():
-                            new_school.elementary_school_name = school_name
-                            new_school.elementary_school_rating = float(rating) if rating else None
-                        
-                        if 'middle' in str(school_levels).lower():
-                            new_school.middle_school_name = school_name
-                            new_school.middle_school_rating = float(rating) if rating else None
-                        
-                        if 'high' in str(school_levels).lower():
-                            new_school.high_school_name = school_name
-                            new_school.high_school_rating = float(rating) if rating else None
-                        
-                        db.add(new_school)
-                        added += 1
-                    
-                    # Commit every 50 schools
-                    if (added + updated) % 50 == 0:
-                        db.commit()
-                        print(f"  Committed batch: {added} added, {updated} updated")
-                
-                except Exception as e:
-                    skipped += 1
-                    if skipped <= 5:
-                        print(f"  [ERROR] Skipped school {i}: {e}")
-                    continue
-            
-            # Final commit
+            counts = ingest_apify_results(db, schools, require_rating=False)  # unrated schools still fill empty slots
             db.commit()
+            added, updated, skipped = counts['inserted'], counts['updated'], counts['skipped']
             
             print(f"\n{'='*80}")
             print("IMPORT COMPLETE")
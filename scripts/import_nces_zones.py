@@ -5,6 +5,7 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal, init_db
+from backend.fips_lookup import STATE_CODE_TO_FIPS, STATE_FIPS_TO_CODE
 from backend.models import AttendanceZone, SchoolData
 from sqlalchemy import or_
 import requests
@@ -47,9 +48,9 @@ def download_nces_data(output_dir='data/nces_zones'):
         print("\nNo shapefiles found. Please download from NCES first.")
         return None
 
-def convert_shapefile_to_geojson(shapefile_path, output_geojson_path):
+def convert_shapefile_to_geojson(shapefile_path, output_geojson_path, states=('NC', 'SC')):
     """
-    Convert shapefile to GeoJSON.
+    Convert shapefile to GeoJSON (zones of the given states only).
     Requires: pip install geopandas fiona
     """
     try:
@@ -58,14 +59,13 @@ def convert_shapefile_to_geojson(shapefile_path, output_geojson_path):
         print(f"\nConverting {shapefile_path} to GeoJSON...")
         gdf = gpd.read_file(shapefile_path)
         
-        # Filter for NC and SC only
+        # Filter to the requested states
         if 'STATEFP' in gdf.columns:
-            # State FIPS codes: 37 = NC, 45 = SC
-            gdf = gdf[gdf['STATEFP'].isin(['37', '45'])]
+            gdf = gdf[gdf['STATEFP'].isin([STATE_CODE_TO_FIPS.get(st) for st in states])]
         elif 'STATE' in gdf.columns:
-            gdf = gdf[gdf['STATE'].isin(['NC', 'SC'])]
+            gdf = gdf[gdf['STATE'].isin(list(states))]
         
-        print(f"Found {len(gdf)} zones for NC and SC")
+        print(f"Found {len(gdf)} zones for {', '.join(states)}")
         
         # Convert to GeoJSON
         gdf.to_file(output_geojson_path, driver='GeoJSON')
@@ -116,7 +116,218 @@ def match_zone_to_school(zone_name, zone_level, db):
     
     return school
 
-def import_zones_directly_from_shapefile(shapefile_path):
+# SABS level codes: 1=Elementary, 2=Middle, 3=High, 4=Other
+_SABS_LEVELS = {'1': 'elementary', '2': 'middle', '3': 'high', '4': 'other'}
+_COPY_COLUMNS = ['school_name', 'school_level', 'school_district', 'state', 'zone_boundary', 'data_year', 'source']
+
+
+def _find_column(columns, *names):
+    """Return the first of names present in columns (SABS field case varies between releases)."""
+    for name in names:
+        if name in columns:
+            return name
+    return None
+
+
+def read_sabs_zones(shapefile_path, states=('NC', 'SC'), bbox=None):
+    """
+    Read only the SABS rows/columns we need. With pyogrio the state filter is pushed down into
+    GDAL as an attribute `where` (and optional bbox), so the 684 MB file is never fully materialized.
+    Without a state column the filter uses the state FIPS prefix of leaid. Returns a GeoDataFrame.
+    Raises ValueError if the file has neither column.
+    """
+    import geopandas as gpd
+
+    try:
+        import pyogrio
+        fields = list(pyogrio.read_info(shapefile_path)['fields'])
+    except ImportError:
+        pyogrio = None
+        import fiona
+        with fiona.open(shapefile_path) as src:
+            fields = list(src.schema['properties'].keys())
+
+    state_col = _find_column(fields, 'stAbbrev', 'STABBREV', 'STATE')
+    lea_col = _find_column(fields, 'leaid', 'LEAID')
+    if not state_col and not lea_col:
+        raise ValueError(f"{shapefile_path} has no state or leaid column; cannot filter zones by state")
+    wanted = [c for c in (
+        state_col,
+        _find_column(fields, 'schnam', 'SCHNAM'),
+        _find_column(fields, 'level', 'LEVEL'),
+        lea_col,
+    ) if c]
+    where = None
+    if state_col:
+        where = f"{state_col} IN ({', '.join(repr(st) for st in states)})"
+    else:
+        prefixes = [STATE_CODE_TO_FIPS[st] for st in states if st in STATE_CODE_TO_FIPS]
+        where = ' OR '.join(f"{lea_col} LIKE '{fips}%'" for fips in prefixes) or '1 = 0'
+
+    if pyogrio is not None:
+        gdf = pyogrio.read_dataframe(shapefile_path, columns=wanted, where=where, bbox=bbox)
+    else:
+        # fiona cannot push down attribute filters: filter by bbox while reading, state in build_zone_frame
+        gdf = gpd.read_file(shapefile_path, bbox=bbox)
+    return gdf
+
+
+def build_zone_frame(gdf, states=('NC', 'SC'), data_year='2015', source='NCES'):
+    """
+    Compute attendance_zones columns for every row at once: name/level/state/district columns
+    vectorized with pandas, geometries encoded to GeoJSON in bulk with Shapely 2. state comes from
+    the state column, else from the FIPS prefix of leaid; rows outside `states` are dropped so no
+    NULL-state zone (which the idempotent re-import could not replace) is written.
+    Returns (DataFrame with _COPY_COLUMNS, skipped count: empty geometries and other states).
+    """
+    import shapely
+    import pandas as pd
+
+    geoms = gdf.geometry.values
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    gdf = gdf[valid]
+    skipped = int((~valid).sum())
+
+    cols = gdf.columns
+    name_col = _find_column(cols, 'schnam', 'SCHNAM')
+    level_col = _find_column(cols, 'level', 'LEVEL')
+    state_col = _find_column(cols, 'stAbbrev', 'STABBREV', 'STATE')
+    lea_col = _find_column(cols, 'leaid', 'LEAID')
+
+    out = pd.DataFrame(index=gdf.index)
+    out['school_name'] = gdf[name_col].fillna('Unknown').astype(str).str.strip() if name_col else 'Unknown'
+    if level_col:
+        codes = gdf[level_col].astype('string').str.strip().str.replace(r'\.0$', '', regex=True)
+        out['school_level'] = codes.map(_SABS_LEVELS).fillna(codes.str.lower()).fillna('unknown')
+    else:
+        out['school_level'] = 'unknown'
+    lea = gdf[lea_col].astype('string').str.strip().str.replace(r'\.0$', '', regex=True) if lea_col else None
+    if state_col:
+        st = gdf[state_col].astype('string').str.upper().str.strip()
+    elif lea_col:
+        # LEA ids are 7 digits starting with the state FIPS code
+        st = lea.str.zfill(7).str[:2].map(STATE_FIPS_TO_CODE)
+    else:
+        raise ValueError("zones have no state or leaid column; cannot tell which state they are in")
+    out['state'] = st.where(st.isin(list(states)))
+    out['school_district'] = lea
+    out['zone_boundary'] = shapely.to_geojson(gdf.geometry.values)
+    out['data_year'] = data_year
+    out['source'] = source
+    in_states = out['state'].notna()
+    skipped += int((~in_states).sum())
+    return out.loc[in_states, _COPY_COLUMNS], skipped
+
+
+def _copy_frame(cursor, frame):
+    """Stream one chunk into attendance_zones with COPY (CSV)."""
+    import io
+    buf = io.StringIO()
+    frame.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cursor.copy_expert(
+        f"COPY attendance_zones ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buf,
+    )
+
+
+def import_zones_columnar(shapefile_path, states=('NC', 'SC'), bbox=None, chunk_size=5000,
+                          data_year='2015', source='NCES'):
+    """
+    Columnar SABS import: filtered read, vectorized columns, bulk GeoJSON encoding and COPY.
+    Idempotent: existing rows for the same source/data_year/states are replaced in the same
+    transaction, so a re-run (or a run after a crash) never duplicates zones. canonical_school_id
+    links (scripts/link_attendance_zones_to_schools.py) are carried over to the new rows by
+    school name, level, district and state.
+    """
+    import time
+    from backend.database import engine
+
+    started = time.time()
+    print(f"\nReading {shapefile_path} (states={','.join(states)}{', bbox=' + str(bbox) if bbox else ''})...")
+    gdf = read_sabs_zones(shapefile_path, states=states, bbox=bbox)
+    print(f"Read {len(gdf)} zones in {time.time() - started:.1f}s")
+
+    frame, skipped = build_zone_frame(gdf, states=states, data_year=data_year, source=source)
+    total = len(frame)
+    print(f"Encoded {total} geometries ({skipped} empty or outside the states skipped) in {time.time() - started:.1f}s")
+
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        # Keep the links to the schools table so replacing the zones does not drop them
+        cur.execute(
+            """
+            CREATE TEMP TABLE zone_links ON COMMIT DROP AS
+            SELECT DISTINCT school_name, school_level, school_district, state, canonical_school_id
+            FROM attendance_zones
+            WHERE source = %s AND data_year = %s AND state = ANY(%s) AND canonical_school_id IS NOT NULL
+            """,
+            (source, data_year, list(states)),
+        )
+        cur.execute(
+            "DELETE FROM attendance_zones WHERE source = %s AND data_year = %s AND state = ANY(%s)",
+            (source, data_year, list(states)),
+        )
+        print(f"Replacing {cur.rowcount} previously imported zones")
+
+        loaded = 0
+        for start in range(0, total, chunk_size):
+            chunk = frame.iloc[start:start + chunk_size]
+            _copy_frame(cur, chunk)
+            loaded += len(chunk)
+            percent = (loaded / total) * 100 if total else 100.0
+            print(f"\rProgress: [{percent:.1f}%] {loaded}/{total} zones copied", end="", flush=True)
+        print()
+
+        cur.execute(
+            """
+            UPDATE attendance_zones z
+            SET canonical_school_id = l.canonical_school_id
+            FROM zone_links l
+            WHERE z.source = %s AND z.data_year = %s AND z.state = l.state
+              AND z.school_name = l.school_name AND z.school_level = l.school_level
+              AND z.school_district IS NOT DISTINCT FROM l.school_district
+            """,
+            (source, data_year),
+        )
+        print(f"Restored {cur.rowcount} links to the schools table")
+
+        # Match zones to school_data by name, one set-based UPDATE per level
+        matched = 0
+        for level in ('elementary', 'middle', 'high'):
+            cur.execute(f"""
+                UPDATE attendance_zones z
+                SET school_id = (
+                    SELECT s.id FROM school_data s
+                    WHERE s.{level}_school_name ILIKE '%%' || z.school_name || '%%'
+                    LIMIT 1
+                )
+                WHERE z.source = %s AND z.data_year = %s AND z.state = ANY(%s)
+                  AND z.school_level = %s AND z.school_id IS NULL
+            """, (source, data_year, list(states), level))
+            cur.execute(
+                "SELECT COUNT(*) FROM attendance_zones WHERE source = %s AND data_year = %s "
+                "AND state = ANY(%s) AND school_level = %s AND school_id IS NOT NULL",
+                (source, data_year, list(states), level),
+            )
+            matched += cur.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"\n{'='*60}")
+    print(f"Import Complete! ({time.time() - started:.1f}s)")
+    print(f"  Imported: {total} zones")
+    print(f"  Matched to schools: {matched} zones")
+    print(f"  Skipped: {skipped} zones")
+    print(f"{'='*60}")
+    return True
+
+def import_zones_directly_from_shapefile(shapefile_path, states=('NC', 'SC')):
     """Import zones directly from shapefile (more efficient for large files)."""
     try:
         import geopandas as gpd
@@ -136,24 +347,24 @@ def import_zones_directly_from_shapefile(shapefile_path):
         gdf = gpd.read_file(shapefile_path)
         print(f"Loaded {len(gdf)} total zones from shapefile")
         
-        # Filter for NC and SC only
+        # Filter to the requested states
         # Check available columns
         print(f"\nAvailable columns in shapefile: {list(gdf.columns)[:10]}...")  # Show first 10
         
-        # Filter for NC and SC using stAbbrev field
+        # Filter using stAbbrev field
         if 'stAbbrev' in gdf.columns or 'STABBREV' in gdf.columns:
             state_col = 'stAbbrev' if 'stAbbrev' in gdf.columns else 'STABBREV'
             original_count = len(gdf)
-            gdf = gdf[gdf[state_col].isin(['NC', 'SC'])]
+            gdf = gdf[gdf[state_col].isin(list(states))]
             print(f"Filtered from {original_count} to {len(gdf)} zones using {state_col}")
         elif 'STATEFP' in gdf.columns:
-            # State FIPS codes: 37 = NC, 45 = SC
             original_count = len(gdf)
-            gdf = gdf[gdf['STATEFP'].isin(['37', '45', 37, 45])]
+            fips = [STATE_CODE_TO_FIPS.get(st) for st in states]
+            gdf = gdf[gdf['STATEFP'].isin(fips + [int(f) for f in fips if f])]
             print(f"Filtered from {original_count} to {len(gdf)} zones using STATEFP")
         elif 'STATE' in gdf.columns:
             original_count = len(gdf)
-            gdf = gdf[gdf['STATE'].isin(['NC', 'SC'])]
+            gdf = gdf[gdf['STATE'].isin(list(states))]
             print(f"Filtered from {original_count} to {len(gdf)} zones using STATE")
         else:
             print("\n[WARNING] Could not find state field.")
@@ -161,7 +372,7 @@ def import_zones_directly_from_shapefile(shapefile_path):
             # Don't filter here, filter during import
         
         total = len(gdf)
-        print(f"Filtered to {total} zones for NC and SC")
+        print(f"Filtered to {total} zones for {', '.join(states)}")
         print(f"\nImporting {total} attendance zones...")
         
         imported = 0
@@ -249,7 +460,7 @@ def import_zones_directly_from_shapefile(shapefile_path):
                 
             if state_abbrev and pd.notna(state_abbrev):
                 state_abbrev = str(state_abbrev).upper().strip()
-                if state_abbrev in ['NC', 'SC']:
+                if state_abbrev in states:
                     state = state_abbrev
                 else:
                     state = None
@@ -369,7 +580,7 @@ def import_zones_from_geojson(geojson_path):
             )
             
             state_fips = properties.get('STATEFP') or properties.get('STATE_FIPS')
-            state = 'NC' if state_fips == '37' else 'SC' if state_fips == '45' else None
+            state = STATE_FIPS_TO_CODE.get(str(state_fips)) if state_fips else None
             
             district = properties.get('LEA_NAME') or properties.get('DISTRICT') or properties.get('district')
             
@@ -419,6 +630,14 @@ def import_zones_from_geojson(geojson_path):
 
 def main():
     """Main import function."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Import NCES SABS attendance zones')
+    parser.add_argument('--states', default='NC,SC', help='Comma-separated state abbreviations (default: NC,SC)')
+    parser.add_argument('--bbox', help='Optional read filter: minx,miny,maxx,maxy in the shapefile CRS')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per COPY chunk')
+    parser.add_argument('--legacy', action='store_true', help='Use the row-by-row ORM import')
+    args = parser.parse_args()
+
     print("NCES School Attendance Zone Import")
     print("=" * 60)
     
@@ -437,7 +656,21 @@ def main():
     # Step 3: Import zones directly from shapefile (more efficient)
     print("\nImporting zones directly from shapefile...")
     print("(This avoids large GeoJSON file issues)")
-    success = import_zones_directly_from_shapefile(shapefile_path)
+    states = tuple(st.strip().upper() for st in args.states.split(',') if st.strip())
+    if args.legacy:
+        success = import_zones_directly_from_shapefile(shapefile_path, states=states)
+    else:
+        bbox = tuple(float(v) for v in args.bbox.split(',')) if args.bbox else None
+        try:
+            success = import_zones_columnar(shapefile_path, states=states, bbox=bbox, chunk_size=args.chunk_size)
+        except ImportError as e:
+            print(f"\nColumnar import unavailable ({e}); install geopandas pyogrio shapely>=2. Using row-by-row import.")
+            success = import_zones_directly_from_shapefile(shapefile_path, states=states)
+        except Exception as e:
+            print(f"\nERROR importing zones: {e}")
+            import traceback
+            traceback.print_exc()
+            success = False
     
     if not success:
         # Fallback: Try GeoJSON if it exists
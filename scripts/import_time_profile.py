@@ -0,0 +1,111 @@
+"""
+Import-time profile of the app (or any module) built on `python -X importtime`.
+
+Runs a fresh interpreter per measurement, parses the importtime report and prints the slowest
+modules by cumulative and self time plus self time summed per top-level package, so heavy
+dependencies pulled in at import (shapely, pyproj, bs4, reportlab, ...) stand out. With
+--budget-ms the exit status is 1 when the import takes longer, for use as a startup-time check.
+
+Usage:
+    python scripts/import_time_profile.py
+    python scripts/import_time_profile.py backend.routes --top 30 --runs 5
+    python scripts/import_time_profile.py app --budget-ms 700 --output bench_results/import-time.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)')
+
+
+def measure(module: str):
+    """One cold interpreter importing `module`: (wall seconds, [(name, self_us, cumulative_us)])."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            entries.append((m.group(3), int(m.group(1)), int(m.group(2))))
+    return wall, entries
+
+
+def summarize(module: str, runs: int):
+    """Best (minimum) of `runs` measurements per module, so one slow run does not skew the report."""
+    walls, best = [], {}
+    for _ in range(runs):
+        wall, entries = measure(module)
+        walls.append(wall)
+        for name, self_us, cumulative_us in entries:
+            prev = best.get(name)
+            if prev is None or cumulative_us < prev[1]:
+                best[name] = (self_us, cumulative_us)
+    total_us = best.get(module, (0, 0))[1]
+    packages = {}
+    for name, (self_us, _) in best.items():
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms': total_us / 1000,
+        'interpreter_wall_ms': min(walls) * 1000,
+        'modules': len(best),
+        'by_cumulative': sorted(([n, v[1] / 1000, v[0] / 1000] for n, v in best.items()), key=lambda r: -r[1]),
+        'by_package': sorted(([p, us / 1000] for p, us in packages.items()), key=lambda r: -r[1]),
+    }
+
+
+def print_report(report, top: int):
+    print(f"import {report['module']}: {report['import_ms']:.0f} ms "
+          f"({report['modules']} modules; interpreter wall {report['interpreter_wall_ms']:.0f} ms, best of {report['runs']})")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, cumulative, self_ms in report['by_cumulative'][:top]:
+        print(f"{cumulative:>14.1f} {self_ms:>9.1f}  {name}")
+    print(f"\n{'self ms':>14}  top-level package")
+    for name, self_ms in report['by_package'][:top]:
+        print(f"{self_ms:>14.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile module import time with python -X importtime')
+    parser.add_argument('modules', nargs='*', default=['app'], help='Modules to import (default: app)')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per module (best run is reported)')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, help='Exit 1 if any module takes longer than this to import')
+    parser.add_argument('--output', help='Write the reports as JSON')
+    args = parser.parse_args()
+
+    reports = []
+    for i, module in enumerate(args.modules):
+        if i:
+            print('\n' + '-' * 60)
+        report = summarize(module, max(1, args.runs))
+        print_report(report, args.top)
+        reports.append(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(reports, indent=2))
+        print(f"\nWrote {args.output}")
+
+    if args.budget_ms is not None:
+        over = [r for r in reports if r['import_ms'] > args.budget_ms]
+        for r in over:
+            print(f"\nOVER BUDGET: import {r['module']} took {r['import_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        if over:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Concurrent load test for the main API endpoints, with latency percentiles and throughput per endpoint.
+
+By default everything runs locally and offline: the Flask app is served in-process (threaded
+werkzeug server) against the database seeded by scripts/seed_loadtest_db.py, with Google geocoding
+replaced by the stub provider and TIGERweb / Census pointed at the fake servers in scripts/.
+Use --base-url to drive an already running server instead (it must be seeded the same way).
+
+Endpoints (weights with --mix):
+  census-data     GET /api/census-data?limit=500&centroids=1 (city or income filter)
+  schools-address GET /api/schools/address?address=...
+  school-zones    GET /api/zips/<zip>/school-zones
+  export-report   GET /api/export/report?address=...&format=...
+
+Usage:
+  python scripts/seed_loadtest_db.py --database-url sqlite:///data/loadtest/loadtest.sqlite
+  python scripts/load_test.py --database-url sqlite:///data/loadtest/loadtest.sqlite --concurrency 16 --duration 30
+  python scripts/load_test.py --base-url http://127.0.0.1:5000 --requests 2000 --mix census-data=5 school-zones=1
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+DEFAULT_MANIFEST = Path('data/loadtest/manifest.json')
+DEFAULT_MIX = {'census-data': 4, 'schools-address': 3, 'school-zones': 2, 'export-report': 1}
+
+
+def build_requests(manifest, report_format: str):
+    """{endpoint: fn(rng) -> path} using the fixture zips and addresses."""
+    zips, zone_zips, addresses = manifest['zips'], manifest['zone_zips'], manifest['addresses']
+    cities = manifest['cities']
+
+    def census_data(rng):
+        if rng.random() < 0.5 and cities:
+            city, state = rng.choice(cities)
+            return f"/api/census-data?limit=500&centroids=1&city={quote(city)}&state={state}"
+        return f"/api/census-data?limit=500&centroids=1&min_income={rng.randrange(30000, 120000, 10000)}"
+
+    return {
+        'census-data': census_data,
+        'schools-address': lambda rng: f"/api/schools/address?address={quote(rng.choice(addresses))}",
+        'school-zones': lambda rng: f"/api/zips/{rng.choice(zone_zips)}/school-zones" + ('?by_level=1' if rng.random() < 0.5 else ''),
+        'export-report': lambda rng: f"/api/export/report?address={quote(rng.choice(addresses))}&zip_code={rng.choice(zips)}&format={report_format}",
+    }
+
+
+def start_local_stack(database_url: str, manifest, work_dir: Path):
+    """Fake TIGERweb + Census servers and the app on ephemeral ports; returns the app base URL."""
+    from scripts.fake_arcgis_server import serve as serve_arcgis
+    from scripts.fake_census_server import serve as serve_census
+
+    arcgis, census = serve_arcgis(port=0), serve_census(port=0)
+    for server in (arcgis, census):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'GEOCODE_PROVIDER': 'stub',
+        'GEOCODE_CACHE': str(work_dir / 'geocode_cache.sqlite'),
+        'ZIP_BOUNDARY_STORE': manifest['boundary_store'],
+        'TIGERWEB_BASE_URL': f"http://127.0.0.1:{arcgis.server_address[1]}/arcgis/rest/services/TIGERweb",
+        'CENSUS_API_BASE_URL': f"http://127.0.0.1:{census.server_address[1]}/data",
+        'BOUNDARY_MISS_CACHE': str(work_dir / 'boundary_misses.sqlite'),
+        'BOUNDARY_RESOLVE_DEADLINE': '2',
+        'TILE_CACHE_DIR': str(work_dir / 'tile_cache'),
+        'FLASK_DEBUG': 'false',
+    })
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app  # after the environment points at the fixtures
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run(base_url: str, paths, mix, concurrency: int, duration: float, total_requests: int, seed: int):
+    """Drive the endpoints from `concurrency` workers; returns [(endpoint, seconds, status, bytes)]."""
+    names = [n for n in mix if mix[n] > 0]
+    weights = [mix[n] for n in names]
+    samples = []
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        session = requests.Session()
+        while True:
+            with lock:
+                if (total_requests and issued[0] >= total_requests) or (deadline and time.monotonic() >= deadline):
+                    return
+                issued[0] += 1
+            name = rng.choices(names, weights)[0]
+            url = base_url + paths[name](rng)
+            started = time.perf_counter()
+            try:
+                response = session.get(url, timeout=120)
+                status, size = response.status_code, len(response.content)
+            except requests.exceptions.RequestException:
+                status, size = 0, 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append((name, elapsed, status, size))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+    return samples
+
+
+def summarize(samples, wall_seconds: float):
+    rows = []
+    for name in sorted({s[0] for s in samples}) + ['ALL']:
+        entries = [(elapsed, status, size) for n, elapsed, status, size in samples if name in ('ALL', n)]
+        latencies = sorted(e[0] for e in entries)
+        errors = sum(1 for e in entries if not 200 <= e[1] < 400)
+        rows.append({
+            'endpoint': name,
+            'requests': len(entries),
+            'errors': errors,
+            'status_codes': {str(c): sum(1 for e in entries if e[1] == c) for c in sorted({e[1] for e in entries})},
+            'throughput_rps': len(entries) / wall_seconds if wall_seconds else 0.0,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'mean_bytes': statistics.fmean(e[2] for e in entries) if entries else 0.0,
+        })
+    return rows
+
+
+def print_table(rows):
+    print(f"\n{'endpoint':<16} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for r in rows:
+        print(f"{r['endpoint']:<16} {r['requests']:>6} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+    for r in rows:
+        if r['errors'] and r['endpoint'] != 'ALL':
+            print(f"  {r['endpoint']}: status codes {r['status_codes']}")
+
+
+def parse_mix(items):
+    if not items:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test for the API with latency percentiles')
+    parser.add_argument('--base-url', help='Drive a running server instead of starting one in-process')
+    parser.add_argument('--database-url', default='sqlite:///data/loadtest/loadtest.sqlite',
+                        help='Seeded database for the in-process server')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Written by seed_loadtest_db.py')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run (ignored with --requests)')
+    parser.add_argument('--requests', type=int, default=0, help='Total requests instead of a duration')
+    parser.add_argument('--mix', nargs='+', help='endpoint=weight, e.g. census-data=5 school-zones=1')
+    parser.add_argument('--report-format', choices=['pdf', 'docx'], default='pdf')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint first')
+    parser.add_argument('--output', help='Write the summary as JSON')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    if not manifest_path.exists():
+        raise SystemExit(f"{manifest_path} not found - run scripts/seed_loadtest_db.py first")
+    manifest = json.loads(manifest_path.read_text())
+    mix = parse_mix(args.mix)
+    paths = build_requests(manifest, args.report_format)
+
+    base_url = args.base_url or start_local_stack(args.database_url, manifest, manifest_path.parent)
+    print(f"Target {base_url} | concurrency {args.concurrency} | "
+          + (f"{args.requests} requests" if args.requests else f"{args.duration:g}s") + f" | mix {mix}")
+
+    if args.warmup:
+        run(base_url, paths, mix, min(args.concurrency, 4), 0, args.warmup * len(mix), args.seed + 1000)
+
+    started = time.monotonic()
+    samples = run(base_url, paths, mix, args.concurrency, 0 if args.requests else args.duration, args.requests, args.seed)
+    wall = time.monotonic() - started
+    rows = summarize(samples, wall)
+    print_table(rows)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({
+            'base_url': base_url, 'concurrency': args.concurrency, 'wall_seconds': wall, 'mix': mix,
+            'endpoints': rows,
+        }, indent=2))
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
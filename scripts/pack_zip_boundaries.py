@@ -0,0 +1,52 @@
+"""
+Pack data/zip_boundaries/*.geojson into a single memory-mapped boundary store.
+
+The API and zone utilities read data/zip_boundaries.pack (Config.ZIP_BOUNDARY_STORE) first and
+only fall back to the per-zip files when it is missing. Re-run after downloading new boundaries.
+Zips already in the store but not in the directory are kept unless --replace is given.
+
+Usage:
+    python scripts/pack_zip_boundaries.py
+    python scripts/pack_zip_boundaries.py --boundaries-dir data/zip_boundaries --output data/zip_boundaries.pack
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from backend.boundary_store import DEFAULT_BOUNDARIES_DIR, BoundaryStore, pack_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack per-zip GeoJSON boundaries into one store file')
+    parser.add_argument('--boundaries-dir', default=DEFAULT_BOUNDARIES_DIR)
+    parser.add_argument('--output', default=Config.ZIP_BOUNDARY_STORE)
+    parser.add_argument('--no-wkb', action='store_true', help='Store GeoJSON only (skip WKB geometry records)')
+    parser.add_argument('--replace', action='store_true',
+                        help='Build the store from the directory alone (drop zips not in it)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.boundaries_dir):
+        print(f"Boundaries directory not found: {args.boundaries_dir}")
+        sys.exit(1)
+
+    start = time.time()
+    counts = pack_directory(args.boundaries_dir, args.output, include_wkb=not args.no_wkb, merge=not args.replace)
+    elapsed = time.time() - start
+
+    store = BoundaryStore(args.output)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Packed {counts['packed']} zip boundaries into {args.output} ({size_mb:.1f} MB) in {elapsed:.1f}s")
+    if counts['skipped']:
+        print(f"Skipped {counts['skipped']} file(s) (bad name or no geometry)")
+    if counts['kept']:
+        print(f"Kept {counts['kept']} zips already in the store")
+    print(f"Store opens with {len(store)} zips")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,17 @@ Assigns each unique school (by name + level) to a zip using (best to fallback):
   2. Row's zip_code (from populate_school_addresses.py reverse geocode)
   3. Nearest zip centroid
 
+Full mode resets and rewrites every census_data row. Incremental mode reads the
+school_zip_changes log (migration 20260216000000_create_school_zip_changes.sql),
+recomputes only the zips that were touched since the last run and clears the log rows it used.
+The log also names the schools (name + level) each write touched (migration 20260218000000);
+the zips of every remaining school_data row for those schools are recomputed too, because
+removing a school's first row moves it to another row's zip.
+
 Usage:
     python scripts/populate_total_schools.py
     python scripts/populate_total_schools.py --dry-run
+    python scripts/populate_total_schools.py --incremental
 """
 import os
 import re
@@ -58,186 +66,329 @@ def nearest_zip(lat: float, lng: float, centroids: List[Tuple[str, float, float]
     return best_zip
 
 
+# (total, elem, mid, high, avg_all, avg_elem, avg_mid, avg_high, top)
+ZipAggregate = Tuple[int, int, int, int, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float]]
+
+
+def load_centroids(db, bounds: bool = True) -> List[Tuple[str, float, float]]:
+    """Load zip centroids (optionally restricted to NC/SC area for speed)."""
+    centroid_sql = """
+        SELECT zip_code, latitude, longitude
+        FROM zip_code_centroids
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """
+    if bounds:
+        centroid_sql += " AND latitude BETWEEN 32 AND 38 AND longitude BETWEEN -85 AND -74"
+    centroid_sql += " ORDER BY zip_code"
+    rows = db.execute(text(centroid_sql)).fetchall()
+    return [(r[0], float(r[1]), float(r[2])) for r in rows]
+
+
+def load_unique_schools(db) -> Dict[Tuple[str, str], Tuple[float, float, float, Optional[str], Optional[str]]]:
+    """
+    Load school_data as unique (name, level) -> (lat, lng, rating, row_zip, school_addr).
+    Keeps the first row seen (ordered by id so full and incremental runs agree).
+    """
+    school_sql = """
+        SELECT id, latitude, longitude, zip_code,
+               elementary_school_name, elementary_school_rating, elementary_school_address,
+               middle_school_name, middle_school_rating, middle_school_address,
+               high_school_name, high_school_rating, high_school_address
+        FROM school_data
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+          AND (elementary_school_name IS NOT NULL OR middle_school_name IS NOT NULL OR high_school_name IS NOT NULL)
+        ORDER BY id
+    """
+    rows = db.execute(text(school_sql)).fetchall()
+
+    # school_addr is used to parse zip when available
+    school_to_data: Dict[Tuple[str, str], Tuple[float, float, float, Optional[str], Optional[str]]] = {}
+    for row in rows:
+        lat_f, lng_f = float(row[1]), float(row[2])
+        row_zip = str(row[3]).strip() if row[3] else None
+        for name, rating, school_addr, level in [
+            (row[4], row[5], row[6], "elementary"),
+            (row[7], row[8], row[9], "middle"),
+            (row[10], row[11], row[12], "high"),
+        ]:
+            if name and (n := str(name).strip()) and rating is not None:
+                try:
+                    r = float(rating)
+                    if 0 <= r <= 10:
+                        key = (n, level)
+                        if key not in school_to_data:
+                            addr = str(school_addr).strip() if school_addr else None
+                            school_to_data[key] = (lat_f, lng_f, r, row_zip, addr)
+                except (TypeError, ValueError):
+                    pass
+    return school_to_data
+
+
+def resolve_zip(lat: float, lng: float, row_zip: Optional[str], school_addr: Optional[str],
+                centroids: List[Tuple[str, float, float]]) -> Optional[str]:
+    """Best zip: from school address > row zip > nearest centroid."""
+    z = parse_zip_from_address(school_addr) if school_addr else None
+    if z:
+        return z
+    if row_zip and len(row_zip) >= 5:
+        return row_zip[:5]
+    return nearest_zip(lat, lng, centroids)
+
+
+def compute_zip_aggregates(
+    school_to_data: Dict[Tuple[str, str], Tuple[float, float, float, Optional[str], Optional[str]]],
+    centroids: List[Tuple[str, float, float]],
+    only_zips: Optional[Set[str]] = None,
+) -> Dict[str, ZipAggregate]:
+    """
+    Assign each school to a zip and build counts / average ratings per zip.
+    only_zips: if given, aggregates are built for those zips only (incremental mode).
+    """
+    zip_elem: Dict[str, Set[str]] = defaultdict(set)
+    zip_mid: Dict[str, Set[str]] = defaultdict(set)
+    zip_high: Dict[str, Set[str]] = defaultdict(set)
+    zip_elem_ratings: Dict[str, List[float]] = defaultdict(list)
+    zip_mid_ratings: Dict[str, List[float]] = defaultdict(list)
+    zip_high_ratings: Dict[str, List[float]] = defaultdict(list)
+    for (school_name, level), (lat, lng, rating, row_zip, school_addr) in school_to_data.items():
+        z = resolve_zip(lat, lng, row_zip, school_addr, centroids)
+        if not z or (only_zips is not None and z not in only_zips):
+            continue
+        if level == "elementary":
+            zip_elem[z].add(school_name)
+            zip_elem_ratings[z].append(rating)
+        elif level == "middle":
+            zip_mid[z].add(school_name)
+            zip_mid_ratings[z].append(rating)
+        else:
+            zip_high[z].add(school_name)
+            zip_high_ratings[z].append(rating)
+
+    all_zips = set(zip_elem) | set(zip_mid) | set(zip_high)
+    zip_counts: Dict[str, ZipAggregate] = {}
+    for z in all_zips:
+        e, m, h = len(zip_elem[z]), len(zip_mid[z]), len(zip_high[z])
+        tot = e + m + h
+        all_ratings = zip_elem_ratings[z] + zip_mid_ratings[z] + zip_high_ratings[z]
+        avg_elem = sum(zip_elem_ratings[z]) / len(zip_elem_ratings[z]) if zip_elem_ratings[z] else None
+        avg_mid = sum(zip_mid_ratings[z]) / len(zip_mid_ratings[z]) if zip_mid_ratings[z] else None
+        avg_high = sum(zip_high_ratings[z]) / len(zip_high_ratings[z]) if zip_high_ratings[z] else None
+        avg_all = sum(all_ratings) / len(all_ratings) if all_ratings else None
+        top = max(all_ratings) if all_ratings else None
+        zip_counts[z] = (tot, e, m, h, avg_all, avg_elem, avg_mid, avg_high, top)
+    return zip_counts
+
+
+def have_level_rating_columns(db) -> bool:
+    """True if census_data has average_elementary_school_rating etc. (migration 20260213000000)."""
+    col_check = db.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema='public' AND table_name='census_data' AND column_name='average_elementary_school_rating'
+    """)).fetchone()
+    return col_check is not None
+
+
+def have_change_log(db) -> bool:
+    """True if the school_zip_changes table exists (migration 20260216000000)."""
+    row = db.execute(text("""
+        SELECT 1 FROM information_schema.tables
+        WHERE table_schema='public' AND table_name='school_zip_changes'
+    """)).fetchone()
+    return row is not None
+
+
+def have_change_log_school_keys(db) -> bool:
+    """True if school_zip_changes logs school_name / school_level (migration 20260218000000)."""
+    row = db.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema='public' AND table_name='school_zip_changes' AND column_name='school_name'
+    """)).fetchone()
+    return row is not None
+
+
+def load_changed_zips(
+    db, centroids: List[Tuple[str, float, float]], with_school_keys: bool = False,
+) -> Tuple[Set[str], Set[Tuple[str, str]], Optional[int]]:
+    """
+    Read school_zip_changes and return (touched zips, touched (name, level) keys, max change id read).
+    Rows without a zip are resolved to the nearest centroid.
+    """
+    key_cols = "school_name, school_level" if with_school_keys else "NULL, NULL"
+    rows = db.execute(text(f"""
+        SELECT id, zip_code, latitude, longitude, {key_cols} FROM school_zip_changes ORDER BY id
+    """)).fetchall()
+    zips: Set[str] = set()
+    keys: Set[Tuple[str, str]] = set()
+    max_id = None
+    for change_id, zc, lat, lng, name, level in rows:
+        max_id = change_id
+        if name and level:
+            keys.add((str(name).strip(), str(level)))
+        elif zc and len(str(zc).strip()) >= 5:
+            zips.add(str(zc).strip()[:5])
+        elif lat is not None and lng is not None:
+            z = nearest_zip(float(lat), float(lng), centroids)
+            if z:
+                zips.add(z)
+    return zips, keys, max_id
+
+
+def zips_of_school_rows(db, keys: Set[Tuple[str, str]], centroids: List[Tuple[str, float, float]]) -> Set[str]:
+    """Resolved zip of every school_data row that lists one of the (name, level) keys."""
+    if not keys:
+        return set()
+    names = sorted({name for name, _ in keys})
+    rows = db.execute(text("""
+        SELECT latitude, longitude, zip_code,
+               elementary_school_name, elementary_school_address,
+               middle_school_name, middle_school_address,
+               high_school_name, high_school_address
+        FROM school_data
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+          AND (btrim(elementary_school_name) = ANY(:names) OR btrim(middle_school_name) = ANY(:names)
+               OR btrim(high_school_name) = ANY(:names))
+    """), {"names": names}).fetchall()
+    zips: Set[str] = set()
+    for row in rows:
+        row_zip = str(row[2]).strip() if row[2] else None
+        for name, school_addr, level in [(row[3], row[4], "elementary"), (row[5], row[6], "middle"),
+                                          (row[7], row[8], "high")]:
+            if name and (str(name).strip(), level) in keys:
+                addr = str(school_addr).strip() if school_addr else None
+                z = resolve_zip(float(row[0]), float(row[1]), row_zip, addr, centroids)
+                if z:
+                    zips.add(z)
+    return zips
+
+
+def clear_changes(db, max_id: Optional[int]) -> None:
+    """Delete consumed change-log rows (rows logged while we ran are kept for the next run)."""
+    if max_id is None:
+        return
+    db.execute(text("DELETE FROM school_zip_changes WHERE id <= :max_id"), {"max_id": max_id})
+
+
+def reset_zip_aggregates(db, have_level_ratings: bool, zips: Optional[Set[str]] = None) -> int:
+    """Reset school columns to 0 / NULL for the given zips (all rows if zips is None)."""
+    set_sql = """
+        SET total_schools = 0, elementary_schools = 0, middle_schools = 0, high_schools = 0,
+            average_school_rating = NULL, top_school_rating = NULL
+    """
+    if have_level_ratings:
+        set_sql += """,
+            average_elementary_school_rating = NULL, average_middle_school_rating = NULL,
+            average_high_school_rating = NULL
+        """
+    if zips is None:
+        r = db.execute(text(f"UPDATE census_data {set_sql}"))
+    else:
+        if not zips:
+            return 0
+        r = db.execute(text(f"UPDATE census_data {set_sql} WHERE zip_code = ANY(:zips)"), {"zips": sorted(zips)})
+    return r.rowcount
+
+
+def write_zip_aggregates(db, zip_counts: Dict[str, ZipAggregate], have_level_ratings: bool) -> int:
+    """Update census_data school columns for zips that have schools. Returns number of zips updated."""
+    updated = 0
+    if have_level_ratings:
+        update_sql = text("""
+            UPDATE census_data
+            SET total_schools = :tot, elementary_schools = :elem, middle_schools = :mid, high_schools = :high,
+                average_school_rating = :avg_all, top_school_rating = :top_r,
+                average_elementary_school_rating = :avg_e, average_middle_school_rating = :avg_m,
+                average_high_school_rating = :avg_h
+            WHERE zip_code = :zip
+        """)
+    else:
+        update_sql = text("""
+            UPDATE census_data
+            SET total_schools = :tot, elementary_schools = :elem, middle_schools = :mid, high_schools = :high,
+                average_school_rating = :avg_all, top_school_rating = :top_r
+            WHERE zip_code = :zip
+        """)
+    for zip_code, (total, elem, mid, high, avg_all, avg_e, avg_m, avg_h, top) in zip_counts.items():
+        params = {"tot": total, "elem": elem, "mid": mid, "high": high, "avg_all": avg_all, "top_r": top, "zip": zip_code}
+        if have_level_ratings:
+            params.update({"avg_e": avg_e, "avg_m": avg_m, "avg_h": avg_h})
+        r = db.execute(update_sql, params)
+        if r.rowcount > 0:
+            updated += 1
+    return updated
+
+
+def print_sample(zip_counts: Dict[str, ZipAggregate]) -> None:
+    """Print the 10 zips with the most schools (dry run)."""
+    sample = sorted(zip_counts.items(), key=lambda x: -x[1][0])[:10]
+    print("Top 10 zips (dry run): total | elem | mid | high | avg | avg_elem | avg_mid | avg_high | top")
+    for z, (tot, e, m, h, avg_all, avg_e, avg_m, avg_h, top) in sample:
+        ae = f"{avg_e:.1f}" if avg_e is not None else "-"
+        am = f"{avg_m:.1f}" if avg_m is not None else "-"
+        ah = f"{avg_h:.1f}" if avg_h is not None else "-"
+        aa = f"{avg_all:.1f}" if avg_all is not None else "-"
+        tp = f"{top:.1f}" if top is not None else "-"
+        print(f"  {z}: {tot} | elem={e} mid={m} high={h} | avg={aa} elem={ae} mid={am} high={ah} top={tp}")
+
+
 def main() -> None:
     import argparse
     parser = argparse.ArgumentParser(description="Populate census_data.total_schools")
     parser.add_argument("--dry-run", action="store_true", help="Compute but do not write to DB")
     parser.add_argument("--bounds", action="store_true", default=True,
                         help="Restrict centroids to NC/SC bounding box (default: True)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only recompute zips logged in school_zip_changes since the last run")
     args = parser.parse_args()
 
     db = SessionLocal()
     try:
-        # 1. Load zip centroids (optionally restrict to NC/SC area for speed)
-        centroid_sql = """
-            SELECT zip_code, latitude, longitude
-            FROM zip_code_centroids
-            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-        """
-        if args.bounds:
-            centroid_sql += " AND latitude BETWEEN 32 AND 38 AND longitude BETWEEN -85 AND -74"
-        centroid_sql += " ORDER BY zip_code"
-        rows = db.execute(text(centroid_sql)).fetchall()
-        centroids = [(r[0], float(r[1]), float(r[2])) for r in rows]
+        centroids = load_centroids(db, bounds=args.bounds)
         print(f"Loaded {len(centroids)} zip centroids")
 
-        # 2. Load school_data: unique (name, level) with lat/lng, rating, row zip, school address
-        school_sql = """
-            SELECT id, latitude, longitude, zip_code,
-                   elementary_school_name, elementary_school_rating, elementary_school_address,
-                   middle_school_name, middle_school_rating, middle_school_address,
-                   high_school_name, high_school_rating, high_school_address
-            FROM school_data
-            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-              AND (elementary_school_name IS NOT NULL OR middle_school_name IS NOT NULL OR high_school_name IS NOT NULL)
-        """
-        rows = db.execute(text(school_sql)).fetchall()
-
-        # For each unique (name, level), keep first (lat, lng, rating, row_zip, school_addr) we see
-        # school_addr is used to parse zip when available
-        school_to_data: Dict[Tuple[str, str], Tuple[float, float, float, Optional[str], Optional[str]]] = {}
-        for row in rows:
-            lat_f, lng_f = float(row[1]), float(row[2])
-            row_zip = str(row[3]).strip() if row[3] else None
-            for name, rating, school_addr, level in [
-                (row[4], row[5], row[6], "elementary"),
-                (row[7], row[8], row[9], "middle"),
-                (row[10], row[11], row[12], "high"),
-            ]:
-                if name and (n := str(name).strip()) and rating is not None:
-                    try:
-                        r = float(rating)
-                        if 0 <= r <= 10:
-                            key = (n, level)
-                            if key not in school_to_data:
-                                addr = str(school_addr).strip() if school_addr else None
-                                school_to_data[key] = (lat_f, lng_f, r, row_zip, addr)
-                    except (TypeError, ValueError):
-                        pass
+        # Snapshot the change log before reading school_data so nothing logged mid-run is lost
+        log_exists = have_change_log(db)
+        dirty_zips: Optional[Set[str]] = None
+        max_change_id = None
+        if log_exists:
+            changed, changed_schools, max_change_id = load_changed_zips(
+                db, centroids, with_school_keys=have_change_log_school_keys(db))
+            if args.incremental:
+                dirty_zips = changed | zips_of_school_rows(db, changed_schools, centroids)
+                print(f"{len(dirty_zips)} zips touched since last run ({len(changed_schools)} schools changed)")
+                if not dirty_zips:
+                    print("Nothing to do.")
+                    return
+        elif args.incremental:
+            print("school_zip_changes not found. Run migration 20260216000000_create_school_zip_changes.sql "
+                  "in Supabase SQL Editor, or run without --incremental for a full rebuild.")
+            return
 
+        school_to_data = load_unique_schools(db)
         print(f"Found {len(school_to_data)} unique schools with ratings")
 
-        def resolve_zip(lat: float, lng: float, row_zip: Optional[str], school_addr: Optional[str]) -> Optional[str]:
-            """Best zip: from school address > row zip > nearest centroid."""
-            z = parse_zip_from_address(school_addr) if school_addr else None
-            if z:
-                return z
-            if row_zip and len(row_zip) >= 5:
-                return row_zip[:5] if row_zip else None
-            return nearest_zip(lat, lng, centroids)
-
-        # 3. Assign each school to zip; count and collect ratings per zip by level
-        zip_elem: Dict[str, Set[str]] = defaultdict(set)
-        zip_mid: Dict[str, Set[str]] = defaultdict(set)
-        zip_high: Dict[str, Set[str]] = defaultdict(set)
-        zip_elem_ratings: Dict[str, List[float]] = defaultdict(list)
-        zip_mid_ratings: Dict[str, List[float]] = defaultdict(list)
-        zip_high_ratings: Dict[str, List[float]] = defaultdict(list)
-        for (school_name, level), (lat, lng, rating, row_zip, school_addr) in school_to_data.items():
-            z = resolve_zip(lat, lng, row_zip, school_addr)
-            if z:
-                if level == "elementary":
-                    zip_elem[z].add(school_name)
-                    zip_elem_ratings[z].append(rating)
-                elif level == "middle":
-                    zip_mid[z].add(school_name)
-                    zip_mid_ratings[z].append(rating)
-                else:
-                    zip_high[z].add(school_name)
-                    zip_high_ratings[z].append(rating)
-
-        # Build counts and average ratings per zip
-        all_zips = set(zip_elem) | set(zip_mid) | set(zip_high)
-        zip_counts: Dict[str, Tuple[int, int, int, int, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float]]] = {}
-        for z in all_zips:
-            e, m, h = len(zip_elem[z]), len(zip_mid[z]), len(zip_high[z])
-            tot = e + m + h
-            all_ratings = zip_elem_ratings[z] + zip_mid_ratings[z] + zip_high_ratings[z]
-            avg_elem = sum(zip_elem_ratings[z]) / len(zip_elem_ratings[z]) if zip_elem_ratings[z] else None
-            avg_mid = sum(zip_mid_ratings[z]) / len(zip_mid_ratings[z]) if zip_mid_ratings[z] else None
-            avg_high = sum(zip_high_ratings[z]) / len(zip_high_ratings[z]) if zip_high_ratings[z] else None
-            avg_all = sum(all_ratings) / len(all_ratings) if all_ratings else None
-            top = max(all_ratings) if all_ratings else None
-            zip_counts[z] = (tot, e, m, h, avg_all, avg_elem, avg_mid, avg_high, top)
-
+        zip_counts = compute_zip_aggregates(school_to_data, centroids, only_zips=dirty_zips)
         print(f"Assigned schools to {len(zip_counts)} zips; total schools placed: {sum(c[0] for c in zip_counts.values())}")
 
         if args.dry_run:
-            sample = sorted(zip_counts.items(), key=lambda x: -x[1][0])[:10]
-            print("Top 10 zips (dry run): total | elem | mid | high | avg | avg_elem | avg_mid | avg_high | top")
-            for z, (tot, e, m, h, avg_all, avg_e, avg_m, avg_h, top) in sample:
-                ae = f"{avg_e:.1f}" if avg_e is not None else "-"
-                am = f"{avg_m:.1f}" if avg_m is not None else "-"
-                ah = f"{avg_h:.1f}" if avg_h is not None else "-"
-                aa = f"{avg_all:.1f}" if avg_all is not None else "-"
-                tp = f"{top:.1f}" if top is not None else "-"
-                print(f"  {z}: {tot} | elem={e} mid={m} high={h} | avg={aa} elem={ae} mid={am} high={ah} top={tp}")
+            print_sample(zip_counts)
             return
 
-        # 4a. Check if level-specific rating columns exist
-        _have_level_ratings = False
-        col_check = db.execute(text("""
-            SELECT 1 FROM information_schema.columns
-            WHERE table_schema='public' AND table_name='census_data' AND column_name='average_elementary_school_rating'
-        """)).fetchone()
-        if col_check:
-            _have_level_ratings = True
-        else:
+        _have_level_ratings = have_level_rating_columns(db)
+        if not _have_level_ratings:
             print("Note: Level-specific rating columns not found. Run migration 20260213000000_add_school_rating_columns.sql in Supabase SQL Editor, then re-run this script.")
 
-        # 4b. Reset all census_data school columns to 0 / NULL
-        reset_sql = """
-            UPDATE census_data
-            SET total_schools = 0, elementary_schools = 0, middle_schools = 0, high_schools = 0,
-                average_school_rating = NULL, top_school_rating = NULL
-        """
-        if _have_level_ratings:
-            reset_sql = """
-                UPDATE census_data
-                SET total_schools = 0, elementary_schools = 0, middle_schools = 0, high_schools = 0,
-                    average_school_rating = NULL, top_school_rating = NULL,
-                    average_elementary_school_rating = NULL, average_middle_school_rating = NULL,
-                    average_high_school_rating = NULL
-            """
-        r = db.execute(text(reset_sql))
-        db.commit()
-        print(f"Reset school columns for {r.rowcount} rows")
-
-        # 5. Update census_data school columns for zips that have schools
-        updated = 0
-        if _have_level_ratings:
-            for zip_code, (total, elem, mid, high, avg_all, avg_e, avg_m, avg_h, top) in zip_counts.items():
-                r = db.execute(
-                    text("""
-                        UPDATE census_data
-                        SET total_schools = :tot, elementary_schools = :elem, middle_schools = :mid, high_schools = :high,
-                            average_school_rating = :avg_all, top_school_rating = :top_r,
-                            average_elementary_school_rating = :avg_e, average_middle_school_rating = :avg_m,
-                            average_high_school_rating = :avg_h
-                        WHERE zip_code = :zip
-                    """),
-                    {
-                        "tot": total, "elem": elem, "mid": mid, "high": high,
-                        "avg_all": avg_all, "avg_e": avg_e, "avg_m": avg_m, "avg_h": avg_h, "top_r": top,
-                        "zip": zip_code,
-                    },
-                )
-                if r.rowcount > 0:
-                    updated += 1
-        else:
-            for zip_code, (total, elem, mid, high, avg_all, avg_e, avg_m, avg_h, top) in zip_counts.items():
-                r = db.execute(
-                    text("""
-                        UPDATE census_data
-                        SET total_schools = :tot, elementary_schools = :elem, middle_schools = :mid, high_schools = :high,
-                            average_school_rating = :avg_all, top_school_rating = :top_r
-                        WHERE zip_code = :zip
-                    """),
-                    {"tot": total, "elem": elem, "mid": mid, "high": high, "avg_all": avg_all, "top_r": top, "zip": zip_code},
-                )
-                if r.rowcount > 0:
-                    updated += 1
+        # Reset school columns (all rows, or only touched zips), then write zips that have schools.
+        # Incremental writes happen in one transaction with the change-log cleanup.
+        reset = reset_zip_aggregates(db, _have_level_ratings, zips=dirty_zips)
+        if dirty_zips is None:
+            db.commit()
+        print(f"Reset school columns for {reset} rows")
+
+        updated = write_zip_aggregates(db, zip_counts, _have_level_ratings)
+        if not _have_level_ratings:
             print("Note: Run migration 20260213000000_add_school_rating_columns.sql for elem/mid/high averages")
+        if log_exists:
+            clear_changes(db, max_change_id)
         db.commit()
         print(f"Updated school counts and ratings for {updated} zip codes")
 
@@ -0,0 +1,53 @@
+"""
+Write .gz (and .br, when the brotli package is installed) next to each data/zip_boundaries/*.geojson.
+
+GET /api/zip-boundary/<zip> serves these variants to clients that accept them, so per-zip files are
+never compressed per request. Boundaries fetched at runtime get their variants on write-through;
+run this after downloading boundaries with the other scripts. Up-to-date variants are skipped.
+
+Usage:
+    python scripts/precompress_boundaries.py
+    python scripts/precompress_boundaries.py --boundaries-dir data/zip_boundaries --force
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.boundary_store import DEFAULT_BOUNDARIES_DIR
+from backend.http_caching import write_precompressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompress per-zip GeoJSON boundary files')
+    parser.add_argument('--boundaries-dir', default=DEFAULT_BOUNDARIES_DIR)
+    parser.add_argument('--force', action='store_true', help='Rewrite variants even if they are newer than the source')
+    args = parser.parse_args()
+
+    directory = Path(args.boundaries_dir)
+    if not directory.is_dir():
+        print(f"Boundaries directory not found: {directory}")
+        sys.exit(1)
+
+    start = time.time()
+    written = skipped = 0
+    raw_bytes = gz_bytes = 0
+    for path in sorted(directory.glob('*.geojson')):
+        gz = path.with_name(path.name + '.gz')
+        if not args.force and gz.exists() and gz.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            skipped += 1
+            continue
+        write_precompressed(path)
+        written += 1
+        raw_bytes += path.stat().st_size
+        gz_bytes += gz.stat().st_size
+
+    ratio = f", {raw_bytes / gz_bytes:.1f}x smaller gzipped" if gz_bytes else ''
+    print(f"Precompressed {written} boundary files ({skipped} up to date) in {time.time() - start:.1f}s{ratio}")
+
+
+if __name__ == '__main__':
+    main()
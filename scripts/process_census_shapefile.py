@@ -2,10 +2,15 @@
 Process Census ZCTA shapefile and extract boundaries for your zip codes.
 This works with a manually downloaded shapefile from Census Bureau.
 100% FREE - no API keys needed.
+
+The shapefile is read once, in chunks (bounded memory), with zip/bbox filters pushed down to the
+reader. Each chunk is encoded with vectorized Shapely operations (GeoJSON, WKB, simplified levels of
+detail) in worker processes and written straight into the packed boundary store.
 """
 import sys
 import os
-import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import zipfile
 import tempfile
@@ -35,112 +40,180 @@ def get_zip_codes_from_database():
     finally:
         db.close()
 
-def process_shapefile(shapefile_path, zip_codes=None):
+
+ZIP_COLUMNS = ('ZCTA5CE20', 'ZCTA5CE10', 'ZCTA5', 'GEOID20', 'GEOID10', 'ZIPCODE', 'ZIP_CODE')
+
+
+def zip_codes_for_states(states):
+    """All zip codes in the given states (e.g. ['NC', 'SC']), from the offline zipcodes package."""
+    import zipcodes
+    out = []
+    for state in states:
+        out.extend(z['zip_code'] for z in zipcodes.filter_by(state=state.upper()))
+    return out
+
+
+def _find_shp(shapefile_path: Path):
+    """Return (.shp path, temp dir to clean up or None). Extracts .zip archives."""
+    if shapefile_path.suffix != '.zip':
+        return shapefile_path, None
+    print(f"\nExtracting {shapefile_path.name}...")
+    extract_dir = tempfile.mkdtemp()
+    with zipfile.ZipFile(shapefile_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_dir)
+    shp_file = next(Path(extract_dir).rglob('*.shp'), None)
+    if not shp_file:
+        shutil.rmtree(extract_dir)
+        raise FileNotFoundError("Could not find .shp file in zip")
+    return shp_file, extract_dir
+
+
+def read_zcta_chunks(shp_path, zip_codes=None, bbox=None, chunk_size=5000):
+    """
+    Yield (zip codes, WGS84 geometry array) chunks from a ZCTA shapefile. Only the zip column and
+    geometry are read; the zip list and bbox are applied by the reader when pyogrio is available.
+    """
+    try:
+        import pyogrio
+    except ImportError:
+        pyogrio = None
+
+    if pyogrio is None:
+        gdf = gpd.read_file(str(shp_path), bbox=tuple(bbox) if bbox else None)
+        zip_col = next((c for c in ZIP_COLUMNS if c in gdf.columns), None)
+        if not zip_col:
+            raise ValueError(f"Could not find zip code column in shapefile (columns: {list(gdf.columns)})")
+        if zip_codes:
+            gdf = gdf[gdf[zip_col].astype(str).isin(set(zip_codes))]
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs(4326)
+        for start in range(0, len(gdf), chunk_size):
+            part = gdf.iloc[start:start + chunk_size]
+            yield part[zip_col].astype(str).tolist(), part.geometry.values
+        return
+
+    info = pyogrio.read_info(str(shp_path))
+    fields = list(info['fields'])
+    zip_col = next((c for c in ZIP_COLUMNS if c in fields), None)
+    if not zip_col:
+        raise ValueError(f"Could not find zip code column in shapefile (columns: {fields})")
+    print(f"Using column: {zip_col}")
+    where = None
+    if zip_codes:
+        where = f"{zip_col} IN ({','.join(repr(str(z)) for z in sorted(set(zip_codes)))})"
+    skip = 0
+    while True:
+        part = pyogrio.read_dataframe(
+            str(shp_path), columns=[zip_col], where=where, bbox=tuple(bbox) if bbox else None,
+            skip_features=skip, max_features=chunk_size,
+        )
+        if len(part) == 0:
+            break
+        if part.crs is not None and part.crs.to_epsg() != 4326:
+            part = part.to_crs(4326)
+        yield part[zip_col].astype(str).tolist(), part.geometry.values
+        skip += len(part)
+        if len(part) < chunk_size:
+            break
+
+
+def _encode_chunk(zips, wkbs, lods):
+    """Worker: WKB in, encoded store records out (runs in a separate process)."""
+    import shapely
+    from backend.boundary_store import encode_boundary_records
+    return encode_boundary_records(zips, shapely.from_wkb(wkbs), lods=lods)
+
+
+def process_shapefile(shapefile_path, zip_codes=None, bbox=None, store_path=None, workers=None,
+                      chunk_size=5000, write_files=False, replace=False):
     """
-    Process Census shapefile and extract boundaries.
+    Process Census shapefile and write boundaries into the packed boundary store.
     
     Args:
         shapefile_path: Path to .zip or .shp file from Census
         zip_codes: List of zip codes to extract. If None, extracts all.
+        bbox: Optional (west, south, east, north) filter
+        store_path: Output store (default Config.ZIP_BOUNDARY_STORE)
+        workers: Encoding processes (default: CPU count)
+        chunk_size: Features per chunk (bounds memory)
+        write_files: Also write data/zip_boundaries/{zip}.geojson files
+        replace: Replace the store with this run's zips. By default they are merged into the
+            existing store (zips outside this run keep their current records).
     """
     if not HAS_GEOPANDAS:
         print("\nERROR: geopandas is required.")
         print("Install with: pip install geopandas")
         return False
     
+    import shapely
+    from config.config import Config
+    from backend.boundary_store import (
+        DEFAULT_LODS, BoundaryStoreWriter, lods_meta, reset_boundary_store,
+    )
+    
     print("=" * 70)
     print("Processing Census ZCTA Shapefile")
     print("=" * 70)
     
-    shapefile_path = Path(shapefile_path)
+    store_path = store_path or Config.ZIP_BOUNDARY_STORE
+    workers = workers or os.cpu_count() or 1
+    try:
+        shp_path, extract_dir = _find_shp(Path(shapefile_path))
+    except Exception as e:
+        print(f"ERROR extracting zip: {e}")
+        return False
     
-    # Handle zip file
-    if shapefile_path.suffix == '.zip':
-        print(f"\nExtracting {shapefile_path.name}...")
-        extract_dir = tempfile.mkdtemp()
-        try:
-            with zipfile.ZipFile(shapefile_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            # Find .shp file
-            shp_file = None
-            for file in Path(extract_dir).glob('*.shp'):
-                shp_file = file
-                break
-            
-            if not shp_file:
-                print("ERROR: Could not find .shp file in zip")
-                return False
-            
-            shapefile_path = shp_file
-        except Exception as e:
-            print(f"ERROR extracting zip: {e}")
-            return False
+    print(f"\nReading shapefile: {shp_path.name}")
+    if zip_codes:
+        print(f"Filtering to {len(set(zip_codes))} requested zip codes...")
+    else:
+        print("Processing all zip codes...")
     
-    # Read shapefile
-    print(f"\nReading shapefile: {shapefile_path.name}")
+    start = time.time()
+    saved = 0
+    writer = BoundaryStoreWriter(store_path, meta={'source': str(shapefile_path), 'lods': lods_meta(DEFAULT_LODS)},
+                                 merge=not replace)
     try:
-        gdf = gpd.read_file(str(shapefile_path))
-        print(f"Found {len(gdf)} ZCTA boundaries")
-        
-        # Check column names
-        print(f"Columns: {list(gdf.columns)}")
-        
-        # Find zip code column (could be ZCTA5, ZCTA5CE10, etc.)
-        zip_col = None
-        for col in ['ZCTA5CE10', 'ZCTA5', 'ZIPCODE', 'ZIP_CODE']:
-            if col in gdf.columns:
-                zip_col = col
-                break
-        
-        if not zip_col:
-            print("ERROR: Could not find zip code column in shapefile")
-            print(f"Available columns: {list(gdf.columns)}")
-            return False
-        
-        print(f"Using column: {zip_col}")
-        
-        # Filter to requested zip codes
-        if zip_codes:
-            gdf_filtered = gdf[gdf[zip_col].isin(zip_codes)]
-            print(f"Filtering to {len(gdf_filtered)} requested zip codes...")
-        else:
-            gdf_filtered = gdf
-            print("Processing all zip codes...")
-        
-        # Save each as GeoJSON
-        saved = 0
-        for idx, row in gdf_filtered.iterrows():
-            zip_code = str(row[zip_col])
-            
-            # Create single-feature GeoJSON
-            single_gdf = gdf_filtered[[idx]]
-            geojson = json.loads(single_gdf.to_json())
-            
-            # Save
-            output_file = BOUNDARIES_DIR / f"{zip_code}.geojson"
-            with open(output_file, 'w') as f:
-                json.dump(geojson, f)
-            
-            saved += 1
-            if saved % 100 == 0:
-                print(f"Saved {saved} boundaries...")
-        
-        print(f"\n[SUCCESS] Saved {saved} zip code boundaries!")
-        print(f"Location: {BOUNDARIES_DIR}/")
-        print("\nYour app will now use these actual boundaries!")
-        
-        # Cleanup
-        if 'extract_dir' in locals():
-            shutil.rmtree(extract_dir)
-        
-        return True
-        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+
+            def _drain(limit):
+                nonlocal saved
+                # Write finished chunks in submission order; at most `limit` chunks stay in flight
+                while len(pending) > limit:
+                    encoded = pending.pop(0).result()
+                    writer.add_encoded(encoded)
+                    if write_files:
+                        for zip_code, records in encoded:
+                            full = next(data for lod, kind, data in records if lod == 0 and kind == 0)
+                            tmp = BOUNDARIES_DIR / f"{zip_code}.geojson.tmp"
+                            tmp.write_bytes(full)
+                            os.replace(tmp, BOUNDARIES_DIR / f"{zip_code}.geojson")
+                    saved += len(encoded)
+                    print(f"Saved {saved} boundaries... ({time.time() - start:.1f}s)")
+
+            for zips, geoms in read_zcta_chunks(shp_path, zip_codes=zip_codes, bbox=bbox, chunk_size=chunk_size):
+                pending.append(pool.submit(_encode_chunk, zips, shapely.to_wkb(geoms), DEFAULT_LODS))
+                _drain(workers * 2)
+            _drain(0)
+        writer.close()
     except Exception as e:
+        writer.abort()
         print(f"ERROR processing shapefile: {e}")
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        if extract_dir:
+            shutil.rmtree(extract_dir, ignore_errors=True)
+    
+    reset_boundary_store()
+    print(f"\n[SUCCESS] Saved {saved} zip code boundaries in {time.time() - start:.1f}s!")
+    if writer.kept_zips:
+        print(f"Kept {writer.kept_zips} other zips already in the store")
+    print(f"Location: {store_path}" + (f" and {BOUNDARIES_DIR}/" if write_files else ""))
+    print("\nYour app will now use these actual boundaries!")
+    return True
 
 if __name__ == '__main__':
     import argparse
@@ -160,12 +233,25 @@ if __name__ == '__main__':
     parser.add_argument(
         '--all',
         action='store_true',
-        help='Extract all zip codes from shapefile (not just from database)'
+        help='Extract all zip codes from shapefile (not just from database); replaces the store'
     )
+    parser.add_argument('--replace', action='store_true',
+                        help='Replace the store with this run\'s zips instead of merging into it')
+    parser.add_argument('--states', nargs='+', help='Only zips in these states, e.g. --states NC SC')
+    parser.add_argument('--bbox', type=float, nargs=4, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'),
+                        help='Only ZCTAs intersecting this box')
+    parser.add_argument('--output', help='Boundary store path (default: Config.ZIP_BOUNDARY_STORE)')
+    parser.add_argument('--workers', type=int, help='Encoding processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Features read and encoded per chunk')
+    parser.add_argument('--geojson-files', action='store_true',
+                        help='Also write per-zip files to data/zip_boundaries/')
     
     args = parser.parse_args()
     
-    if args.all:
+    if args.states:
+        zip_codes = zip_codes_for_states(args.states)
+        print(f"Found {len(zip_codes)} zip codes in {', '.join(args.states)}")
+    elif args.all or args.bbox:
         zip_codes = None
     elif args.zip_codes:
         zip_codes = args.zip_codes
@@ -173,5 +259,15 @@ if __name__ == '__main__':
         zip_codes = get_zip_codes_from_database()
         print(f"Found {len(zip_codes)} zip codes in your database")
     
-    process_shapefile(args.shapefile, zip_codes)
+    ok = process_shapefile(
+        args.shapefile,
+        zip_codes,
+        bbox=args.bbox,
+        store_path=args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        write_files=args.geojson_files,
+        replace=args.all or args.replace,
+    )
+    sys.exit(0 if ok else 1)
 
@@ -0,0 +1,190 @@
+"""
+Seed a local database with synthetic data for load testing (scripts/load_test.py).
+
+Creates the tables (plus the census_data columns added by Supabase migrations) in DATABASE_URL and
+fills census_data, schools, school_data and attendance_zones around Charlotte at a configurable
+scale. Zips are real NC/SC zips (so the stub geocoder and offline centroids resolve them); their
+ZCTA boundaries are synthetic blobs written to a packed boundary store. A manifest JSON lists the
+zips and addresses the load test should request.
+
+Works with Postgres or SQLite:
+  python scripts/seed_loadtest_db.py --database-url sqlite:///data/loadtest/loadtest.sqlite --zips 2000 --zones 500
+  python scripts/seed_loadtest_db.py --database-url postgresql://localhost/loadtest --zips 30000 --zones 3000 --projected
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DIR = Path('data/loadtest')
+
+# census_data columns read by /api/census-data that exist only via migrations (not on the model)
+_EXTRA_CENSUS_COLUMNS = {
+    'state': 'VARCHAR(2)',
+    'local_employment_rating': 'FLOAT',
+    'total_schools': 'INTEGER',
+    'elementary_schools': 'INTEGER',
+    'middle_schools': 'INTEGER',
+    'high_schools': 'INTEGER',
+    'average_school_rating': 'FLOAT',
+    'average_elementary_school_rating': 'FLOAT',
+    'average_middle_school_rating': 'FLOAT',
+    'average_high_school_rating': 'FLOAT',
+}
+
+
+def fixture_zips(count: int, states=('NC', 'SC')):
+    """Real zips (with offline centroids) in the given states, Charlotte-area first."""
+    import zipcodes
+    rows = [z for z in zipcodes.list_all() if z.get('state') in states and z.get('active') and z.get('lat')]
+    rows.sort(key=lambda z: (not z['zip_code'].startswith('282'), z['zip_code']))
+    return [(z['zip_code'], z['city'], z['state'], z.get('county'), float(z['lat']), float(z['long'])) for z in rows[:count]]
+
+
+def create_schema(engine):
+    from sqlalchemy import inspect, text
+    from backend.database import Base
+    from backend.models import AttendanceZone, CensusData, School, SchoolData
+    # Only the tables the load test reads (county_employers uses a Postgres-only UUID type)
+    Base.metadata.create_all(bind=engine, tables=[
+        CensusData.__table__, School.__table__, SchoolData.__table__, AttendanceZone.__table__,
+    ])
+    existing = {c['name'] for c in inspect(engine).get_columns('census_data')}
+    with engine.begin() as conn:
+        for name, sql_type in _EXTRA_CENSUS_COLUMNS.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE census_data ADD COLUMN {name} {sql_type}"))
+
+
+def reset(engine):
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        for table in ('attendance_zones', 'school_data', 'schools', 'census_data'):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+
+def _insert(conn, table: str, rows, batch: int = 1000):
+    from sqlalchemy import text
+    if not rows:
+        return
+    columns = list(rows[0])
+    sql = text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})")
+    for i in range(0, len(rows), batch):
+        conn.execute(sql, rows[i:i + batch])
+
+
+def seed(engine, zip_count: int, zone_count: int, school_rows_per_zip: int, vertices: int, projected: bool,
+         out_dir: Path, seed_value: int = 42):
+    from sqlalchemy import text
+    from backend.boundary_store import DEFAULT_LODS, BoundaryStoreWriter, encode_boundary_records, lods_meta
+    from scripts.synthetic_geo import CHARLOTTE, make_attendance_zones, make_zcta_polygon
+
+    rng = random.Random(seed_value)
+    zips = fixture_zips(zip_count)
+    zones = make_attendance_zones(zone_count, center=CHARLOTTE, vertices=vertices, projected=projected, seed=seed_value)
+    names_by_level = {}
+    for zone in zones:
+        names_by_level.setdefault(zone['school_level'], []).append(zone['school_name'])
+
+    started = time.time()
+    with engine.begin() as conn:
+        _insert(conn, 'census_data', [{
+            'zip_code': z, 'county': county, 'city': city, 'state': state,
+            'population': rng.randrange(500, 60000), 'median_age': round(rng.uniform(25, 55), 1),
+            'average_household_income': float(rng.randrange(30000, 180000)),
+            'local_employment_rating': round(rng.uniform(1, 10), 1), 'data_year': '2024',
+            'total_schools': 3, 'elementary_schools': 1, 'middle_schools': 1, 'high_schools': 1,
+            'average_school_rating': round(rng.uniform(2, 10), 1),
+            'average_elementary_school_rating': round(rng.uniform(2, 10), 1),
+            'average_middle_school_rating': round(rng.uniform(2, 10), 1),
+            'average_high_school_rating': round(rng.uniform(2, 10), 1),
+        } for z, city, state, county, _, _ in zips])
+
+        schools = []
+        for level, names in names_by_level.items():
+            for name in names:
+                schools.append({'name': name, 'level': level, 'city': 'Charlotte', 'state': 'NC',
+                                'rating': round(rng.uniform(2, 10), 1)})
+        _insert(conn, 'schools', schools)
+        school_ids = {(r[1], r[2]): r[0] for r in conn.execute(text("SELECT id, name, level FROM schools")).fetchall()}
+
+        school_data = []
+        for z, city, state, _, lat, lng in zips:
+            for i in range(school_rows_per_zip):
+                plat, plng = lat + rng.uniform(-0.02, 0.02), lng + rng.uniform(-0.02, 0.02)
+                row = {'zip_code': z, 'address': f"{100 + i} Main St, {city}, {state} {z}",
+                       'latitude': plat, 'longitude': plng, 'location_key': f"{plat:.4f},{plng:.4f}"}
+                for level in ('elementary', 'middle', 'high'):
+                    row[f'{level}_school_name'] = rng.choice(names_by_level.get(level) or ['Unknown'])
+                    row[f'{level}_school_rating'] = round(rng.uniform(2, 10), 1)
+                    row[f'{level}_school_address'] = f"{rng.randrange(1, 9999)} School Rd, {city}, {state} {z}"
+                row['blended_school_score'] = round(sum(row[f'{l}_school_rating'] for l in ('elementary', 'middle', 'high')) / 3, 2)
+                school_data.append(row)
+        # location_key is unique; drop the rare rounding collision
+        school_data = list({r['location_key']: r for r in school_data}.values())
+        _insert(conn, 'school_data', school_data)
+
+        _insert(conn, 'attendance_zones', [{
+            'school_name': zone['school_name'], 'school_level': zone['school_level'],
+            'school_district': zone['school_district'], 'state': zone['state'],
+            'zone_boundary': zone['zone_boundary'], 'source': 'synthetic', 'data_year': '2024',
+            'canonical_school_id': school_ids.get((zone['school_name'], zone['school_level'])),
+        } for zone in zones])
+    print(f"Inserted {len(zips)} census rows, {len(schools)} schools, {len(school_data)} school_data rows, "
+          f"{len(zones)} zones in {time.time() - started:.1f}s")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    store_path = out_dir / 'zip_boundaries.pack'
+    geometries = [make_zcta_polygon((lat, lng), radius_deg=0.03, vertices=600, seed=i) for i, (_, _, _, _, lat, lng) in enumerate(zips)]
+    with BoundaryStoreWriter(str(store_path), meta={'source': 'synthetic', 'lods': lods_meta(DEFAULT_LODS)}) as writer:
+        writer.add_encoded(encode_boundary_records([z[0] for z in zips], geometries, DEFAULT_LODS))
+    print(f"Wrote {len(zips)} synthetic ZCTA boundaries to {store_path}")
+
+    lat0, lng0 = CHARLOTTE
+    zone_zips = [z for z, _, _, _, lat, lng in zips if abs(lat - lat0) < 0.35 and abs(lng - lng0) < 0.35]
+    manifest = {
+        'zips': [z[0] for z in zips],
+        'zone_zips': zone_zips or [zips[0][0]],
+        'cities': sorted({(city, state) for _, city, state, _, _, _ in zips})[:200],
+        'addresses': [r['address'] for r in school_data[:2000]],
+        'boundary_store': str(store_path),
+    }
+    manifest_path = out_dir / 'manifest.json'
+    manifest_path.write_text(json.dumps(manifest))
+    print(f"Wrote {manifest_path} ({len(zone_zips)} zips inside the zone region)")
+    return manifest_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a local database with synthetic load-test fixtures')
+    parser.add_argument('--database-url', help='Target database (default: DATABASE_URL)')
+    parser.add_argument('--zips', type=int, default=2000, help='census_data rows (real NC/SC zips)')
+    parser.add_argument('--zones', type=int, default=500, help='Attendance zones across all levels')
+    parser.add_argument('--school-rows-per-zip', type=int, default=3)
+    parser.add_argument('--vertices', type=int, default=300, help='Vertices per zone polygon')
+    parser.add_argument('--projected', action='store_true', help='Store zones in EPSG:3857 like NCES SABS')
+    parser.add_argument('--out-dir', default=str(DEFAULT_DIR), help='Boundary store and manifest directory')
+    parser.add_argument('--no-reset', action='store_true', help='Keep existing rows')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        if args.database_url.startswith('sqlite:///'):
+            Path(args.database_url[len('sqlite:///'):]).parent.mkdir(parents=True, exist_ok=True)
+    from backend.database import engine  # after DATABASE_URL is set
+    print(f"Seeding {engine.url.render_as_string(hide_password=True)}")
+    create_schema(engine)
+    if not args.no_reset:
+        reset(engine)
+    seed(engine, args.zips, args.zones, args.school_rows_per_zip, args.vertices, args.projected,
+         Path(args.out_dir), args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Synthetic, deterministic geometry fixtures shaped like NCES SABS attendance zones and Census ZCTAs.
+
+Zones tile a square region around a center point: one grid per school level (elementary finest,
+high coarsest), each cell a wobbly polygon with `vertices` points along its outline, grouped into
+districts of adjacent cells. Boundaries are stored as GeoJSON strings in WGS84 or, like the SABS
+shapefiles, in Web Mercator (EPSG:3857) so zone_boundary_to_wgs84 has to reproject them.
+
+Used by scripts/benchmark_zoning.py and the load-test fixture loader.
+"""
+import json
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+CHARLOTTE = (35.2271, -80.8431)  # (lat, lng)
+LEVEL_SHARE = (('elementary', 0.6), ('middle', 0.25), ('high', 0.15))
+
+_to_3857 = None
+
+
+def _web_mercator(lng: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    global _to_3857
+    if _to_3857 is None:
+        from pyproj import Transformer
+        _to_3857 = Transformer.from_crs('EPSG:4326', 'EPSG:3857', always_xy=True)
+    return _to_3857.transform(lng, lat)
+
+
+def wobbly_ring(west: float, south: float, east: float, north: float, vertices: int, rng: random.Random,
+                jitter: float = 0.08) -> np.ndarray:
+    """Closed ring (vertices + 1, 2) of lng/lat following the box outline with noise inward/outward."""
+    per_side = max(1, vertices // 4)
+    t = np.linspace(0, 1, per_side, endpoint=False)
+    w, h = east - west, north - south
+    sides = [
+        np.column_stack([west + t * w, np.full_like(t, south)]),
+        np.column_stack([np.full_like(t, east), south + t * h]),
+        np.column_stack([east - t * w, np.full_like(t, north)]),
+        np.column_stack([np.full_like(t, west), north - t * h]),
+    ]
+    ring = np.concatenate(sides)
+    nrng = np.random.default_rng(rng.randrange(2 ** 32))
+    # Smooth noise (moving average of white noise) so edges look like streets/creeks, not spikes
+    noise = np.convolve(nrng.normal(0, 1, len(ring) + 8), np.ones(9) / 9, mode='valid')[:len(ring)]
+    cx, cy = west + w / 2, south + h / 2
+    ring = np.column_stack([cx + (ring[:, 0] - cx) * (1 + jitter * noise), cy + (ring[:, 1] - cy) * (1 + jitter * noise)])
+    return np.vstack([ring, ring[:1]])
+
+
+def _boundary_json(ring: np.ndarray, projected: bool) -> str:
+    if projected:
+        x, y = _web_mercator(ring[:, 0], ring[:, 1])
+        ring = np.column_stack([x, y])
+    return json.dumps({'type': 'Polygon', 'coordinates': [ring.round(7 if not projected else 2).tolist()]})
+
+
+def make_attendance_zones(count: int, center: Tuple[float, float] = CHARLOTTE, span_deg: float = 0.8,
+                          vertices: int = 400, projected: bool = False, state: str = 'NC',
+                          districts: int = 4, seed: int = 42) -> List[Dict]:
+    """
+    About `count` zone dicts (AttendanceZone.to_dict() shape) split across levels by LEVEL_SHARE.
+    zone_boundary is a GeoJSON string, in EPSG:3857 when projected.
+    """
+    rng = random.Random(seed)
+    lat0, lng0 = center
+    zones = []
+    for level, share in LEVEL_SHARE:
+        cells = max(1, round(count * share))
+        side = max(1, math.ceil(math.sqrt(cells)))
+        step = span_deg / side
+        west0, south0 = lng0 - span_deg / 2, lat0 - span_deg / 2
+        per_district = max(1, math.ceil(side / max(1, int(math.sqrt(districts)))))
+        for i in range(cells):
+            row, col = divmod(i, side)
+            west, south = west0 + col * step, south0 + row * step
+            ring = wobbly_ring(west, south, west + step, south + step, vertices, rng)
+            district = f"District {row // per_district * side + col // per_district:02d}"
+            zones.append({
+                'id': len(zones) + 1,
+                'school_name': f"Synthetic {level.title()} {i + 1:04d}",
+                'school_level': level,
+                'school_district': district,
+                'state': state,
+                'zone_boundary': _boundary_json(ring, projected),
+                'nces_school_id': f"37{seed:04d}{len(zones) + 1:06d}",
+            })
+    return zones
+
+
+def make_zcta_polygon(center: Tuple[float, float] = CHARLOTTE, radius_deg: float = 0.06, vertices: int = 1500,
+                      seed: int = 7):
+    """Shapely polygon shaped like a ZCTA: an irregular blob of `vertices` points around center."""
+    from shapely.geometry import Polygon
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    noise = np.convolve(rng.normal(0, 1, vertices + 24), np.ones(25) / 25, mode='valid')[:vertices]
+    r = radius_deg * (1 + 0.35 * noise / (np.abs(noise).max() or 1))
+    lat0, lng0 = center
+    return Polygon(np.column_stack([lng0 + r * np.cos(theta) / math.cos(math.radians(lat0)), lat0 + r * np.sin(theta)]))
+
+
+def random_points(n: int, center: Tuple[float, float] = CHARLOTTE, span_deg: float = 0.8,
+                  seed: Optional[int] = 3) -> List[Tuple[float, float]]:
+    """n (lat, lng) points inside the zone region."""
+    rng = random.Random(seed)
+    lat0, lng0 = center
+    return [(lat0 + (rng.random() - 0.5) * span_deg, lng0 + (rng.random() - 0.5) * span_deg) for _ in range(n)]
@@ -0,0 +1,255 @@
+"""
+Round-trip checks for the two hand-written binary formats (no database or network needed):
+
+  - the packed boundary store (backend/boundary_store.py): write synthetic zips, reopen the file
+    and compare every record byte for byte (all levels of detail and kinds), the bounding boxes,
+    the geometries, the LOD metadata and the viewport lookup;
+  - Mapbox Vector Tiles (backend/vector_tiles.py): encode a layer, decode it with the small
+    protobuf reader below and check the header fields, attributes and ring orientation
+    (exterior rings positive area, holes negative, in the y-down tile grid).
+
+Usage:
+    python scripts/test_boundary_store_and_tiles.py
+"""
+import os
+import struct
+import sys
+import tempfile
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import MultiPolygon, Point, Polygon, box
+
+from backend.boundary_store import (
+    BBOX, DEFAULT_LODS, GEOJSON, WKB, BoundaryStore, BoundaryStoreWriter, encode_boundary_records, lods_meta,
+)
+from backend import vector_tiles
+from backend.vector_tiles import EXTENT, LAYER_NAME, tile_bounds
+
+
+def _sample_geometries():
+    """A polygon with a hole, a multipolygon and a many-vertex circle (so simplification has work)."""
+    square_with_hole = Polygon(
+        [(-80.9, 35.1), (-80.7, 35.1), (-80.7, 35.3), (-80.9, 35.3)],
+        [[(-80.85, 35.15), (-80.85, 35.25), (-80.75, 35.25), (-80.75, 35.15)]],
+    )
+    islands = MultiPolygon([box(-79.9, 34.0, -79.8, 34.1), box(-79.7, 34.0, -79.6, 34.1)])
+    circle = Point(-81.0, 36.0).buffer(0.1, 256)
+    return ['28202', '29577', '27101'], [square_with_hole, islands, circle]
+
+
+def test_boundary_store(tmp_dir):
+    zips, geoms = _sample_geometries()
+    encoded = encode_boundary_records(zips, geoms, DEFAULT_LODS)
+    path = os.path.join(tmp_dir, 'test.pack')
+    with BoundaryStoreWriter(path, meta={'source': 'test', 'lods': lods_meta(DEFAULT_LODS)}) as writer:
+        writer.add_encoded(encoded)
+
+    store = BoundaryStore(path)
+    assert store.zips() == sorted(zips), store.zips()
+    assert list(store.lod_tolerances.values()) == sorted(t for _, t, _ in DEFAULT_LODS), store.lod_tolerances
+    records = 0
+    for zip_code, expected in encoded:
+        for lod, kind, data in expected:
+            stored = store.raw(zip_code, lod=lod, kind=kind)
+            assert stored is not None, f"{zip_code} lod {lod} kind {kind} missing"
+            assert bytes(stored) == data, f"{zip_code} lod {lod} kind {kind}: bytes differ"
+            records += 1
+        geojson_lods = sorted(lod for lod, kind, _ in expected if kind == GEOJSON)
+        assert store.lods(zip_code) == geojson_lods, (zip_code, store.lods(zip_code))
+        assert store.raw(zip_code, kind=WKB) is not None and store.raw(zip_code, kind=BBOX) is not None
+
+    for zip_code, geom in zip(zips, geoms):
+        bounds = store.bounds(zip_code)
+        assert all(abs(a - b) < 1e-12 for a, b in zip(bounds, geom.bounds)), (zip_code, bounds, geom.bounds)
+        assert store.geometry(zip_code).equals(geom), f"{zip_code}: WKB geometry differs"
+        fc = store.geojson(zip_code)
+        assert fc['type'] == 'FeatureCollection' and fc['features'][0]['properties']['zip_code'] == zip_code
+        for lod in store.lods(zip_code):
+            simplified = store.geometry(zip_code, lod=lod)
+            assert simplified is not None and not simplified.is_empty and simplified.is_valid, (zip_code, lod)
+    # Coarser levels never get bigger
+    sizes = [len(store.geojson_bytes('27101', lod=lod)) for lod in store.lods('27101')]
+    assert sizes == sorted(sizes, reverse=True), sizes
+
+    assert store.zips_in_bbox(-80.95, 35.05, -80.65, 35.35) == ['28202']
+    assert sorted(store.zips_in_bbox(-82, 33, -79, 37)) == sorted(zips)
+    assert store.zips_in_bbox(0, 0, 1, 1) == []
+    assert store.raw('99999') is None and '99999' not in store
+    print(f"boundary store: {records} records round-tripped for {len(zips)} zips")
+
+
+# --- minimal protobuf reader --------------------------------------------------------------
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    """Yield (field number, wire type, value) for one message (value: int, bytes or 8-byte double)."""
+    pos = 0
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        num, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire == 1:
+            value, pos = struct.unpack('<d', buf[pos:pos + 8])[0], pos + 8
+        elif wire == 2:
+            length, pos = _read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"unexpected wire type {wire}")
+        yield num, wire, value
+
+
+def _packed_varints(buf):
+    out, pos = [], 0
+    while pos < len(buf):
+        value, pos = _read_varint(buf, pos)
+        out.append(value)
+    return out
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _decode_value(buf):
+    for num, _, value in _fields(buf):
+        if num == 1:
+            return value.decode('utf-8')
+        if num == 3:
+            return value
+        if num == 6:
+            return _unzigzag(value)
+        if num == 7:
+            return bool(value)
+    raise ValueError('empty value')
+
+
+def _decode_rings(commands):
+    """Polygon command stream -> list of rings (lists of absolute tile coordinates)."""
+    rings, ring, x, y, i = [], None, 0, 0, 0
+    while i < len(commands):
+        cmd, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if cmd == 7:
+            assert ring is not None and count == 1
+            rings.append(ring)
+            ring = None
+            continue
+        assert cmd in (1, 2), f"unexpected command {cmd}"
+        assert cmd != 1 or count == 1
+        for _ in range(count):
+            x += _unzigzag(commands[i])
+            y += _unzigzag(commands[i + 1])
+            i += 2
+            if cmd == 1:
+                ring = [(x, y)]
+            else:
+                ring.append((x, y))
+    assert ring is None, 'ring not closed'
+    return rings
+
+
+def _signed_area2(ring):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]))
+
+
+def decode_tile(data):
+    layers = []
+    for num, _, layer_buf in _fields(data):
+        assert num == 3, f"unexpected Tile field {num}"
+        layer = {'features': [], 'keys': [], 'values': []}
+        for lnum, _, value in _fields(layer_buf):
+            if lnum == 15:
+                layer['version'] = value
+            elif lnum == 1:
+                layer['name'] = value.decode('utf-8')
+            elif lnum == 5:
+                layer['extent'] = value
+            elif lnum == 3:
+                layer['keys'].append(value.decode('utf-8'))
+            elif lnum == 4:
+                layer['values'].append(_decode_value(value))
+            elif lnum == 2:
+                feature = {'tags': []}
+                for fnum, _, fvalue in _fields(value):
+                    if fnum == 1:
+                        feature['id'] = fvalue
+                    elif fnum == 2:
+                        feature['tags'] = _packed_varints(fvalue)
+                    elif fnum == 3:
+                        feature['type'] = fvalue
+                    elif fnum == 4:
+                        feature['geometry'] = _packed_varints(fvalue)
+                layer['features'].append(feature)
+        layers.append(layer)
+    return layers
+
+
+def test_vector_tile():
+    z, x, y = 12, 1128, 1623  # covers central Charlotte
+    west, south, east, north = tile_bounds(z, x, y)
+    dx, dy = (east - west) / 10, (north - south) / 10
+    # A polygon with a hole, inside the tile, given counter-clockwise (lon/lat) like most GeoJSON
+    shell = [(west + dx, south + dy), (east - dx, south + dy), (east - dx, north - dy), (west + dx, north - dy)]
+    hole = [(west + 3 * dx, south + 3 * dy), (west + 3 * dx, north - 3 * dy),
+            (east - 3 * dx, north - 3 * dy), (east - 3 * dx, south + 3 * dy)]
+    polygon = Polygon(shell, [hole])
+    # Reversed input orientation must produce the same tile orientation
+    reversed_polygon = Polygon(shell[::-1], [hole[::-1]])
+
+    features = []
+    for fid, geom in ((28202, polygon), (28203, reversed_polygon)):
+        tile_geom = vector_tiles._to_tile_coords(geom, z, x, y)
+        commands = vector_tiles._encode_polygon_geometry(tile_geom)
+        features.append((fid, commands, {'zip_code': str(fid), 'population': 1234, 'average_school_rating': 7.5}))
+    layers = decode_tile(vector_tiles.encode_layer(LAYER_NAME, features))
+
+    assert len(layers) == 1
+    layer = layers[0]
+    assert layer['version'] == 2 and layer['name'] == LAYER_NAME and layer['extent'] == EXTENT, layer
+    assert [f['id'] for f in layer['features']] == [28202, 28203]
+    for feature in layer['features']:
+        assert feature['type'] == 3, 'not a POLYGON'
+        tags = feature['tags']
+        attrs = {layer['keys'][k]: layer['values'][v] for k, v in zip(tags[::2], tags[1::2])}
+        assert attrs == {'zip_code': str(feature['id']), 'population': 1234, 'average_school_rating': 7.5}, attrs
+        rings = _decode_rings(feature['geometry'])
+        assert len(rings) == 2, f"expected exterior + hole, got {len(rings)} rings"
+        exterior, interior = rings
+        assert _signed_area2(exterior) > 0, 'exterior ring must have positive area (clockwise, y down)'
+        assert _signed_area2(interior) < 0, 'interior ring must have negative area'
+        for ring in rings:
+            assert all(0 <= px <= EXTENT and 0 <= py <= EXTENT for px, py in ring), 'ring outside the tile'
+        # North is up: the exterior's top edge (small y) is near the tile top
+        assert min(py for _, py in exterior) < EXTENT * 0.15 and max(py for _, py in exterior) > EXTENT * 0.85
+    print(f"vector tile: {len(layer['features'])} features decoded, ring orientation ok")
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for test in (lambda: test_boundary_store(tmp_dir), test_vector_tile):
+            try:
+                test()
+            except AssertionError as e:
+                failures += 1
+                traceback.print_exc()
+                print(f"FAILED: {e}")
+    print('OK' if not failures else f"{failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
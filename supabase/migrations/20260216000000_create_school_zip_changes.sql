@@ -0,0 +1,77 @@
+-- Change log of zips touched by school_data / schools writes.
+-- scripts/populate_total_schools.py --incremental reads this table, recomputes
+-- census_data school aggregates for the logged zips only, then deletes the rows it consumed.
+-- Rows without a zip (no zip_code and no zip in any address) carry lat/lng so the script
+-- can resolve them to the nearest zip centroid.
+
+CREATE TABLE IF NOT EXISTS school_zip_changes (
+  id BIGSERIAL PRIMARY KEY,
+  zip_code VARCHAR(10),
+  latitude DOUBLE PRECISION,
+  longitude DOUBLE PRECISION,
+  source VARCHAR(20) NOT NULL,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_school_zip_changes_zip ON school_zip_changes(zip_code);
+
+CREATE OR REPLACE FUNCTION log_school_zip_change() RETURNS trigger AS $$
+DECLARE
+  r RECORD;
+  zips TEXT[];
+  z TEXT;
+BEGIN
+  FOR r IN
+    SELECT * FROM (SELECT 'new' AS which WHERE TG_OP IN ('INSERT', 'UPDATE')
+                   UNION ALL
+                   SELECT 'old' WHERE TG_OP IN ('UPDATE', 'DELETE')) w
+  LOOP
+    IF TG_TABLE_NAME = 'school_data' THEN
+      IF r.which = 'new' THEN
+        zips := ARRAY[NEW.zip_code,
+                      substring(NEW.elementary_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                      substring(NEW.middle_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                      substring(NEW.high_school_address FROM '\m(\d{5})(?:-\d{4})?\M')];
+      ELSE
+        zips := ARRAY[OLD.zip_code,
+                      substring(OLD.elementary_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                      substring(OLD.middle_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                      substring(OLD.high_school_address FROM '\m(\d{5})(?:-\d{4})?\M')];
+      END IF;
+    ELSE
+      IF r.which = 'new' THEN
+        zips := ARRAY[NEW.zip_code, substring(NEW.address FROM '\m(\d{5})(?:-\d{4})?\M')];
+      ELSE
+        zips := ARRAY[OLD.zip_code, substring(OLD.address FROM '\m(\d{5})(?:-\d{4})?\M')];
+      END IF;
+    END IF;
+
+    zips := ARRAY(SELECT DISTINCT left(x, 5) FROM unnest(zips) x WHERE x IS NOT NULL AND length(x) >= 5);
+    IF array_length(zips, 1) IS NULL THEN
+      -- No zip anywhere on the row: log the location so the script can use the nearest centroid
+      IF r.which = 'new' THEN
+        INSERT INTO school_zip_changes (zip_code, latitude, longitude, source)
+        VALUES (NULL, NEW.latitude, NEW.longitude, TG_TABLE_NAME);
+      ELSE
+        INSERT INTO school_zip_changes (zip_code, latitude, longitude, source)
+        VALUES (NULL, OLD.latitude, OLD.longitude, TG_TABLE_NAME);
+      END IF;
+    ELSE
+      FOREACH z IN ARRAY zips LOOP
+        INSERT INTO school_zip_changes (zip_code, source) VALUES (z, TG_TABLE_NAME);
+      END LOOP;
+    END IF;
+  END LOOP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_school_data_zip_change ON school_data;
+CREATE TRIGGER trg_school_data_zip_change
+AFTER INSERT OR UPDATE OR DELETE ON school_data
+FOR EACH ROW EXECUTE FUNCTION log_school_zip_change();
+
+DROP TRIGGER IF EXISTS trg_schools_zip_change ON schools;
+CREATE TRIGGER trg_schools_zip_change
+AFTER INSERT OR UPDATE OR DELETE ON schools
+FOR EACH ROW EXECUTE FUNCTION log_school_zip_change();
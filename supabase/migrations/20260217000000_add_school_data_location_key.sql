@@ -0,0 +1,75 @@
+-- Unique building location key for school_data so Apify imports can bulk upsert
+-- (INSERT ... ON CONFLICT (location_key)) instead of creating duplicate rows per overlapping region.
+-- Format matches backend/school_ingest.py location_key(): "lat,lng" rounded half away from zero to 4 decimals
+-- (numeric round below; the Python side rounds the same way with Decimal, not binary-float round()).
+
+ALTER TABLE school_data ADD COLUMN IF NOT EXISTS location_key VARCHAR(32);
+
+UPDATE school_data
+SET location_key = round(latitude::numeric, 4)::text || ',' || round(longitude::numeric, 4)::text
+WHERE location_key IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL;
+
+-- Merge duplicate locations into the lowest id: best-rated school per level wins
+CREATE TEMP TABLE school_data_keep AS
+SELECT location_key, MIN(id) AS keep_id
+FROM school_data
+WHERE location_key IS NOT NULL
+GROUP BY location_key
+HAVING COUNT(*) > 1;
+
+UPDATE school_data s
+SET elementary_school_name = b.elementary_school_name,
+    elementary_school_rating = b.elementary_school_rating,
+    elementary_school_address = b.elementary_school_address
+FROM (
+  SELECT DISTINCT ON (d.location_key) d.location_key, d.elementary_school_name, d.elementary_school_rating, d.elementary_school_address
+  FROM school_data d JOIN school_data_keep k ON k.location_key = d.location_key
+  WHERE d.elementary_school_name IS NOT NULL
+  ORDER BY d.location_key, d.elementary_school_rating DESC NULLS LAST, d.id
+) b, school_data_keep k
+WHERE s.id = k.keep_id AND b.location_key = k.location_key;
+
+UPDATE school_data s
+SET middle_school_name = b.middle_school_name,
+    middle_school_rating = b.middle_school_rating,
+    middle_school_address = b.middle_school_address
+FROM (
+  SELECT DISTINCT ON (d.location_key) d.location_key, d.middle_school_name, d.middle_school_rating, d.middle_school_address
+  FROM school_data d JOIN school_data_keep k ON k.location_key = d.location_key
+  WHERE d.middle_school_name IS NOT NULL
+  ORDER BY d.location_key, d.middle_school_rating DESC NULLS LAST, d.id
+) b, school_data_keep k
+WHERE s.id = k.keep_id AND b.location_key = k.location_key;
+
+UPDATE school_data s
+SET high_school_name = b.high_school_name,
+    high_school_rating = b.high_school_rating,
+    high_school_address = b.high_school_address
+FROM (
+  SELECT DISTINCT ON (d.location_key) d.location_key, d.high_school_name, d.high_school_rating, d.high_school_address
+  FROM school_data d JOIN school_data_keep k ON k.location_key = d.location_key
+  WHERE d.high_school_name IS NOT NULL
+  ORDER BY d.location_key, d.high_school_rating DESC NULLS LAST, d.id
+) b, school_data_keep k
+WHERE s.id = k.keep_id AND b.location_key = k.location_key;
+
+UPDATE school_data s
+SET blended_school_score = (
+  SELECT AVG(r) FROM (VALUES (s.elementary_school_rating), (s.middle_school_rating), (s.high_school_rating)) v(r)
+)
+FROM school_data_keep k
+WHERE s.id = k.keep_id;
+
+-- Repoint attendance zones at the surviving row, then drop the duplicates
+UPDATE attendance_zones z
+SET school_id = k.keep_id
+FROM school_data d JOIN school_data_keep k ON k.location_key = d.location_key
+WHERE z.school_id = d.id AND d.id <> k.keep_id;
+
+DELETE FROM school_data d
+USING school_data_keep k
+WHERE d.location_key = k.location_key AND d.id <> k.keep_id;
+
+DROP TABLE school_data_keep;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_school_data_location_key ON school_data(location_key);
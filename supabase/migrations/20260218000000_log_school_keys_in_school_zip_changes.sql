@@ -0,0 +1,55 @@
+-- school_zip_changes also records which schools (name + level) a school_data write touched.
+-- populate_total_schools.py assigns each (name, level) to the zip of its first school_data row by id;
+-- deleting that row (or clearing its rating) moves the school to the next row's zip, which the
+-- old row's zips do not cover. --incremental recomputes the zips of every remaining row for the
+-- logged schools as well.
+-- The schools table trigger is dropped: populate_total_schools.py never reads schools.
+
+ALTER TABLE school_zip_changes ADD COLUMN IF NOT EXISTS school_name VARCHAR(255);
+ALTER TABLE school_zip_changes ADD COLUMN IF NOT EXISTS school_level VARCHAR(20);
+
+DROP TRIGGER IF EXISTS trg_schools_zip_change ON schools;
+
+CREATE OR REPLACE FUNCTION log_school_zip_change() RETURNS trigger AS $$
+DECLARE
+  r RECORD;
+  row_data school_data%ROWTYPE;
+  zips TEXT[];
+  z TEXT;
+BEGIN
+  FOR r IN
+    SELECT * FROM (SELECT 'new' AS which WHERE TG_OP IN ('INSERT', 'UPDATE')
+                   UNION ALL
+                   SELECT 'old' WHERE TG_OP IN ('UPDATE', 'DELETE')) w
+  LOOP
+    IF r.which = 'new' THEN
+      row_data := NEW;
+    ELSE
+      row_data := OLD;
+    END IF;
+
+    zips := ARRAY[row_data.zip_code,
+                  substring(row_data.elementary_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                  substring(row_data.middle_school_address FROM '\m(\d{5})(?:-\d{4})?\M'),
+                  substring(row_data.high_school_address FROM '\m(\d{5})(?:-\d{4})?\M')];
+    zips := ARRAY(SELECT DISTINCT left(x, 5) FROM unnest(zips) x WHERE x IS NOT NULL AND length(x) >= 5);
+    IF array_length(zips, 1) IS NULL THEN
+      -- No zip anywhere on the row: log the location so the script can use the nearest centroid
+      INSERT INTO school_zip_changes (zip_code, latitude, longitude, source)
+      VALUES (NULL, row_data.latitude, row_data.longitude, TG_TABLE_NAME);
+    ELSE
+      FOREACH z IN ARRAY zips LOOP
+        INSERT INTO school_zip_changes (zip_code, source) VALUES (z, TG_TABLE_NAME);
+      END LOOP;
+    END IF;
+
+    INSERT INTO school_zip_changes (school_name, school_level, source)
+    SELECT btrim(n), l, TG_TABLE_NAME
+    FROM (VALUES (row_data.elementary_school_name, 'elementary'),
+                 (row_data.middle_school_name, 'middle'),
+                 (row_data.high_school_name, 'high')) v(n, l)
+    WHERE n IS NOT NULL AND btrim(n) <> '';
+  END LOOP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;